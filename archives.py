@@ -0,0 +1,95 @@
+"""
+Read proposal files directly out of ZIP submission bundles.
+
+A file inside an archive is referred to by a single string,
+"<path to zip>::<member name>", e.g.
+/mnt/submissions/F2D-1234.zip::F2D-1234/F2D-1234_All_forms_proposal_package.pdf
+so it can flow through the same code paths (keyword checks, proposal number,
+journal) as a plain file name.  Members are read into memory on demand;
+nothing is extracted to disk.
+"""
+import functools
+import logging
+import os
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+archive_separator = "::"
+archive_extensions = ["zip"]
+
+# ==============================================================================
+def is_archive(file_name):
+    """
+    Returns True if this is a ZIP bundle to look inside of
+    """
+    return file_name.split(".")[-1].lower() in archive_extensions
+# ==============================================================================
+def is_archive_member(file_name):
+    """
+    Returns True if this name refers to a file inside a ZIP bundle
+    """
+    return archive_separator in file_name
+# ==============================================================================
+def split_member(file_name):
+    """
+    "<zip>::<member>" -> (zip path, member name)
+    """
+    zip_path, member = file_name.rsplit(archive_separator, 1)
+    return zip_path, member
+# ==============================================================================
+def open_archive(zip_path):
+    """
+    Keep the most recently used archives open; members of the same bundle
+    are parsed one after another, so this saves re-reading the central
+    directory for every member.  A bundle replaced since it was opened
+    (new size or mtime) is opened again.
+    """
+    stat = os.stat(zip_path)
+    return open_archive_version(zip_path, stat.st_size, stat.st_mtime_ns)
+# ==============================================================================
+@functools.lru_cache(maxsize=8)
+def open_archive_version(zip_path, size, mtime):
+    """
+    open_archive()'s cache, keyed by the archive's size and mtime too
+    """
+    return zipfile.ZipFile(zip_path)
+# ==============================================================================
+def list_archive(zip_path, keywords, valid_extensions):
+    """
+    Return [(member reference, uncompressed size)] for the members of this
+    ZIP whose names have a valid extension and contain ALL the keywords,
+    i.e. the same filters main() applies to files on disk.
+    """
+    members = []
+    try:
+        archive = open_archive(zip_path)
+    except zipfile.BadZipFile as e:
+        print(f"Skipping {zip_path}: {e}")
+        return members
+
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        member_name = info.filename.split("/")[-1]
+        file_extension = member_name.split(".")[-1]
+        if ((keywords and all(x in member_name.lower() for x in keywords)) or \
+            not keywords) and \
+            file_extension.lower() in valid_extensions:
+            members.append((zip_path + archive_separator + info.filename, info.file_size))
+    logger.debug(f"{zip_path}: {len(members)} members to parse")
+    return members
+# ==============================================================================
+def member_info(file_name):
+    """
+    Return (zip path, ZipInfo) for "<zip>::<member>"
+    """
+    zip_path, member = split_member(file_name)
+    return zip_path, open_archive(zip_path).getinfo(member)
+# ==============================================================================
+def read_member(file_name):
+    """
+    Return the (decompressed) bytes of "<zip>::<member>"
+    """
+    zip_path, member = split_member(file_name)
+    return open_archive(zip_path).read(member)
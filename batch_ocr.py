@@ -0,0 +1,73 @@
+"""
+OCR many page images with one tesseract process (--ocr-backend batch).
+
+pytesseract.image_to_string() starts a tesseract process, which loads its
+language model, for every page; on pages with little text that startup is
+most of the time.  tesseract also accepts a text file listing image paths:
+it OCRs them all in one process and writes their text one after another,
+each page followed by its page separator (a form feed), so the output is
+split back into pages on "\\f".
+
+Pages are sent batch_pages at a time so progress can still be reported.
+See bench_ocr.py for a comparison of the two on a synthetic scanned corpus.
+"""
+import os
+import subprocess
+import tempfile
+
+batch_pages = 32
+page_separator = "\f"
+
+# ==============================================================================
+def tesseract_command():
+    """
+    The tesseract executable pytesseract is set up to use
+    """
+    try:
+        import pytesseract
+    except ImportError:
+        return "tesseract"
+    return pytesseract.pytesseract.tesseract_cmd
+# ==============================================================================
+def chunks(items, size=batch_pages):
+    """
+    items in lists of at most size
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+# ==============================================================================
+def ocr_files(image_paths, lang=None):
+    """
+    Return the text of each image file, in order, read by one tesseract
+    process
+    """
+    if not image_paths:
+        return []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        list_path = os.path.join(temp_dir, "pages.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("".join(os.path.abspath(x) + "\n" for x in image_paths))
+        command = [tesseract_command(), list_path, "stdout"]
+        if lang:
+            command += ["-l", lang]
+        finished = subprocess.run(command, capture_output=True)
+    if finished.returncode:
+        raise RuntimeError(f"tesseract failed: {finished.stderr.decode('utf-8', 'replace').strip()}")
+
+    texts = finished.stdout.decode("utf-8", "replace").split(page_separator)
+    # Every page, the last one too, is followed by a separator
+    if len(texts) == len(image_paths) + 1 and not texts[-1].strip():
+        texts.pop()
+    if len(texts) != len(image_paths):
+        raise RuntimeError(f"tesseract returned {len(texts)} pages for {len(image_paths)} images")
+    return texts
+# ==============================================================================
+def ocr_images(images, lang=None):
+    """
+    ocr_files() for PIL images, saved to a temporary directory first
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for image_i, image in enumerate(images):
+            paths.append(os.path.join(temp_dir, f"page_{image_i + 1}.png"))
+            image.save(paths[-1])
+        return ocr_files(paths, lang)
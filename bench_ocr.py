@@ -0,0 +1,89 @@
+"""
+Benchmark batch_ocr.ocr_files() (one tesseract process per batch of pages)
+against pytesseract.image_to_string() (one process per page).
+
+Without arguments a synthetic scanned corpus is generated: sparse MOU-like
+pages written with fitz and rasterized, the way a scanner would hand them
+over (requires pytesseract and the tesseract executable), e.g.
+python bench_ocr.py --pages 64
+python bench_ocr.py --images scans/*.png
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from batch_ocr import chunks, ocr_files
+
+mou_lines = [
+    "MEMORANDUM OF UNDERSTANDING",
+    "DAF Customer: Air Force Research Laboratory",
+    "DAF End-User: 412th Test Wing",
+    "TPOC: Jane Doe, jane.doe@example.mil",
+    "The parties agree to support the proposed effort as described.",
+    "Digitally signed by DOE.JANE",
+]
+
+# ==============================================================================
+def make_scans(directory, page_count, dpi):
+    """
+    Write page_count page images of a few lines of text each; returns
+    their paths
+    """
+    import fitz
+
+    paths = []
+    doc = fitz.open()
+    for page_i in range(page_count):
+        page = doc.new_page()
+        y = 72
+        for line in random.Random(page_i).sample(mou_lines, 4):
+            page.insert_text((72, y), line, fontsize=11)
+            y += 18 * random.Random(page_i * 7 + y).randint(1, 4)
+        paths.append(os.path.join(directory, f"scan_{page_i + 1}.png"))
+        page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).save(paths[-1])
+    return paths
+# ==============================================================================
+def per_page(paths):
+    """
+    What ocr_pdf() does by default: one tesseract process per page
+    """
+    import pytesseract
+    from PIL import Image
+    return [pytesseract.image_to_string(Image.open(path)) for path in paths]
+# ==============================================================================
+def batched(paths):
+    return [text for chunk in chunks(paths) for text in ocr_files(chunk)]
+# ==============================================================================
+def timed(function, paths):
+    start = time.perf_counter()
+    result = function(paths)
+    return time.perf_counter() - start, result
+# ==============================================================================
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--images', nargs='+', default=None, help="Page images to OCR; generated if not given")
+    parser.add_argument('--pages', type=int, default=32, help="Pages in the generated corpus")
+    parser.add_argument('--dpi', type=int, default=300, help="Resolution of the generated pages")
+    args = parser.parse_args()
+
+    paths = args.images
+    if not paths:
+        directory = tempfile.mkdtemp()
+        print(f"Generating {args.pages} scanned pages at {args.dpi} DPI in {directory}")
+        paths = make_scans(directory, args.pages, args.dpi)
+
+    per_page_time, expected = timed(per_page, paths)
+    batch_time, texts = timed(batched, paths)
+    same_text = [x.split() for x in texts] == [x.split() for x in expected]
+
+    print(f"{len(paths)} pages")
+    print(f"per page: {per_page_time:.2f} s ({len(paths)/per_page_time:.1f} pages/s)")
+    print(f"batched:  {batch_time:.2f} s ({len(paths)/batch_time:.1f} pages/s, "
+          f"{per_page_time/batch_time:.1f}x faster)")
+    print(f"Same text: {same_text}")
+# ==============================================================================
+if __name__ == "__main__":
+    main()
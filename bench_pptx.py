@@ -0,0 +1,81 @@
+"""
+Benchmark pptx_index.index_pptx() against python-pptx on a large deck.
+
+Without arguments a synthetic deck is generated (requires python-pptx), e.g.
+python bench_pptx.py --slides 400
+python bench_pptx.py --deck some_Vol2-proposal.pptx
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pptx_index import index_pptx
+
+# ==============================================================================
+def make_deck(file_name, slide_count):
+    """
+    Write a deck of slide_count title + bullet slides
+    """
+    from pptx import Presentation
+    prs = Presentation()
+    for slide_index in range(slide_count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Section {slide_index}: Technical Approach"
+        body = slide.placeholders[1].text_frame
+        for bullet in range(12):
+            body.add_paragraph().text = f"Bullet {bullet} of slide {slide_index}. " * 4
+    prs.save(file_name)
+# ==============================================================================
+def python_pptx_titles(file_name):
+    """
+    What process_ppt() used to do: load the deck with python-pptx
+    """
+    from pptx import Presentation
+    prs = Presentation(file_name)
+    slides = []
+    for slide_index, slide in enumerate(prs.slides, 1):
+        try:
+            title = slide.shapes.title.text
+        except AttributeError:
+            title = slide.shapes[0].text
+        text_length = sum(len(shape.text_frame.text) for shape in slide.shapes if shape.has_text_frame)
+        slides.append({"slide": slide_index, "title": title, "text_length": text_length})
+    return slides
+# ==============================================================================
+def best_time(function, file_name, repeat):
+    """
+    Fastest of repeat calls, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(file_name)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+# ==============================================================================
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--deck', type=str, default=None, help="Deck to index; generated if not given")
+    parser.add_argument('--slides', type=int, default=300, help="Slides in the generated deck")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs of each indexer")
+    args = parser.parse_args()
+
+    deck = args.deck
+    if not deck:
+        deck = os.path.join(tempfile.mkdtemp(), "bench_deck.pptx")
+        print(f"Generating {args.slides} slide deck {deck}")
+        make_deck(deck, args.slides)
+
+    pptx_index_time, indexed = best_time(index_pptx, deck, args.repeat)
+    python_pptx_time, expected = best_time(python_pptx_titles, deck, args.repeat)
+    same_titles = [x["title"] for x in indexed] == [x["title"] for x in expected]
+
+    print(f"{len(indexed)} slides, {os.path.getsize(deck)/1e6:.1f} MB")
+    print(f"python-pptx: {python_pptx_time:.3f} s")
+    print(f"pptx_index:  {pptx_index_time:.3f} s ({python_pptx_time/pptx_index_time:.1f}x faster)")
+    print(f"Same titles: {same_titles}")
+# ==============================================================================
+if __name__ == "__main__":
+    main()
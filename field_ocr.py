@@ -0,0 +1,95 @@
+"""
+Field-targeted OCR escalation (with -o True).
+
+When a PDF has a text layer but a few answers are still missing (e.g.
+Firm Certification Q16 in "Missing Firm Certificate Questions", or a TPOC
+block pasted in as a scan), OCR'ing the whole document to fill them is
+mostly wasted.  Instead only the pages where the missing fields should be
+are OCR'd:
+- a missing question lies between the nearest questions of the same form
+  that were found, so the pages from the one before it to the one after it;
+- the POC blocks sit on the pages where the other POC headers were found,
+  or the page after;
+- pages with no text layer at all (scans inserted into a digital PDF) are
+  always included.
+The OCR'd text replaces those pages' text, the file is parsed again by the
+same parser, and only the missing fields are taken from the new result.
+"""
+import re
+
+from roi_ocr import read_dpi, render
+from text_store import page_of_line
+
+# Missing-questions column -> the column of each question
+question_columns = {
+    "Missing Firm Certificate Questions": "Firm Certification Q{}",
+    "Missing Proposal Certificate questions": "Proposal Certification Q{}",
+}
+
+# ==============================================================================
+def question_pages(missing, found_lines, page_offsets, page_count):
+    """
+    The pages the missing question numbers should be on, given
+    {question number: line index} of the questions of the same form that
+    were found
+    """
+    pages = set()
+    for number in missing:
+        before = [q for q in found_lines if q < number]
+        after = [q for q in found_lines if q > number]
+        if not before and not after:
+            continue
+        if before:
+            first = page_of_line(page_offsets, found_lines[max(before)])
+        else:
+            first = max(page_of_line(page_offsets, found_lines[min(after)]) - 1, 0)
+        if after:
+            last = page_of_line(page_offsets, found_lines[min(after)])
+        else:
+            last = min(first + 1, page_count - 1)
+        pages.update(range(first, last + 1))
+    return pages
+# ==============================================================================
+def found_questions(question_lines, column):
+    """
+    {question number: line index} of the found questions of one form, from
+    parse_questions()' {column: line index}
+    """
+    pattern = re.compile(re.escape(column).replace(re.escape("{}"), r"(\d+)") + "$")
+    found = {}
+    for found_column, line in question_lines.items():
+        match = pattern.match(found_column)
+        if match:
+            found[int(match.group(1))] = line
+    return found
+# ==============================================================================
+def header_pages(pages, headers):
+    """
+    The pages any of the headers appear on, and the page after each
+    """
+    found = set()
+    for page_i, lines in enumerate(pages):
+        if any(header in line for line in lines for header in headers):
+            found.update([page_i, min(page_i + 1, len(pages) - 1)])
+    return found
+# ==============================================================================
+def text_less_pages(pages):
+    """
+    The pages with no text layer
+    """
+    return {page_i for page_i, lines in enumerate(pages) if not any(x.strip() for x in lines)}
+# ==============================================================================
+def ocr_pages(doc, page_numbers, batch=False):
+    """
+    OCR these pages of the open fitz doc at read_dpi.
+    Returns {page number: [lines]}
+    """
+    images = [render(doc[page_i], read_dpi) for page_i in page_numbers]
+    if batch:
+        from batch_ocr import ocr_images
+        texts = ocr_images(images)
+    else:
+        import pytesseract
+        texts = [pytesseract.image_to_string(image) for image in images]
+    return {page_i: [x.strip() for x in text.split("\n") if x.strip()]
+            for page_i, text in zip(page_numbers, texts)}
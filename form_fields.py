@@ -0,0 +1,112 @@
+"""
+Read the answers of fillable (AcroForm) all_forms packages straight from
+their form fields, instead of rebuilding them from the flattened text.
+
+Field names are mapped to the same columns parse_questions() produces through
+form_field_map: a list of (regex matched against the field name, column).
+A column containing {} gets the regex's first group, i.e. the question
+number.  Field naming differs between form versions, so the table can be
+extended or overridden with --form-map, a JSON file of {"regex": "column"}.
+"""
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+form_field_map = [
+    (r"firm.*cert\D*(\d+)", "Firm Certification Q{}"),
+    (r"prop.*cert\D*(\d+)", "Proposal Certification Q{}"),
+    (r"^(?:proposal.?)?type$", "Type"),
+    (r"^(?:proposal.?)?phase$", "Phase"),
+    (r"base.?duration", "Duration (Mo.)"),
+    (r"safety", "Safety-Related Deliverables"),
+    (r"air.?flight", "Regulatory: Does this activity involve air flight (including taxi)?"),
+    (r"human.?subject", "Regulatory: Is human subject research involved?"),
+    (r"animal", "Regulatory: Does this activity involve animals?"),
+    (r"directed.?energy", "Regulatory: Does this activity use a directed energy device (including lasers) or radio frequency radiation?"),
+    (r"explosive", "Regulatory: Does this activity use explosives, propellants, deflagrating materials, or ammunition?"),
+    (r"hazardous", "Regulatory: Does this activity involve hazardous materials?"),
+    (r"infectious", "Regulatory: Does this activity involve infectious agents & toxins, human-derived materials, or recombinant DNA?"),
+]
+default_form_field_map = list(form_field_map)
+
+yes_values = ["yes", "y", "on", "true", "1"]
+no_values = ["no", "n", "false", "0"]
+# What an unchecked box reports - no answer rather than NO
+unanswered_values = ["", "off"]
+# PDF_WIDGET_TYPE_CHECKBOX and PDF_WIDGET_TYPE_RADIOBUTTON in fitz; only
+# their states are YES/NO, text fields may hold "1" or "N" as answers
+toggle_widgets = [2, 5]
+
+# ==============================================================================
+def load_form_map(map_file):
+    """
+    Prepend the {"regex": "column"} entries of a JSON file to the default
+    table, so they take precedence.  Loading again (e.g. once per job in a
+    long-lived process) replaces the previous file's entries.
+    """
+    global form_field_map
+    with open(map_file, encoding="utf-8") as f:
+        extra = json.load(f)
+    form_field_map = list(extra.items()) + default_form_field_map
+# ==============================================================================
+def compiled_map():
+    """
+    form_field_map with its regexes compiled (case-insensitive)
+    """
+    return [(re.compile(pattern, re.IGNORECASE), column) for pattern, column in form_field_map]
+# ==============================================================================
+def normalize_value(value, toggle=True):
+    """
+    Checkbox/radio (toggle) states to YES/NO, None for unanswered fields.
+    Other fields are returned stripped.
+    """
+    if isinstance(value, bool):
+        return "YES" if value else "NO"
+    value = str(value).strip()
+    if not toggle:
+        return value or None
+    if value.lower() in unanswered_values:
+        return None
+    if value.lower() in yes_values:
+        return "YES"
+    if value.lower() in no_values:
+        return "NO"
+    return value
+# ==============================================================================
+def read_form_fields(doc):
+    """
+    Return {field name: value} for every form field in the open fitz doc,
+    in one pass over its widgets.  Radio groups share one name; the
+    selected button's value wins.
+    """
+    fields = {}
+    for page in doc:
+        for widget in page.widgets():
+            value = normalize_value(widget.field_value, widget.field_type in toggle_widgets)
+            if value is not None or widget.field_name not in fields:
+                fields[widget.field_name] = value
+    return fields
+# ==============================================================================
+def map_form_fields(fields):
+    """
+    Map {field name: value} to {column: answer} using form_field_map.
+    Unmapped fields are logged and dropped.
+    """
+    result = {}
+    table = compiled_map()
+    for field_name, value in fields.items():
+        if value is None:
+            continue
+        for pattern, column in table:
+            match = pattern.search(field_name)
+            if not match:
+                continue
+            if "{}" in column and match.groups():
+                column = column.format(int(match.group(1)))
+            result[column] = value
+            break
+        else:
+            logger.debug(f"Unmapped form field '{field_name}'='{value}'")
+    return result
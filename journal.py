@@ -0,0 +1,73 @@
+"""
+Checkpoint journal for long runs.
+
+Every parsed file is appended to the journal as one JSON line as soon as it
+finishes, e.g.
+{"file": "...\\F2D-1234_proposalBudget.pdf", "size": 1234, "prop_number": "F2D-1234", "info": {...}}
+
+With --resume, files already in the journal (with an unchanged size) are not
+parsed again; their recorded results are replayed instead, so the final
+output is the same as an uninterrupted run.
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+def default_journal_path(out_path):
+    """
+    The journal lives next to the output, e.g. proposals.csv.journal
+    """
+    return out_path + ".journal"
+# ==============================================================================
+def load_journal(journal_path):
+    """
+    Return {file name: (size, proposal number, info dict)} for every file
+    recorded in the journal.  A missing journal is simply empty; a torn last
+    line (the run died mid-write) is ignored.
+    """
+    completed = {}
+    if not os.path.exists(journal_path):
+        logger.info(f"No journal at {journal_path}, starting from scratch")
+        return completed
+
+    with open(journal_path, encoding="utf-8") as journal:
+        for line_number, line in enumerate(journal, 1):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring incomplete journal line #{line_number}")
+                continue
+            completed[entry["file"]] = (entry["size"], entry["prop_number"], entry["info"])
+    return completed
+# ==============================================================================
+def open_journal(journal_path, resume):
+    """
+    Open the journal for appending, returning a raw file descriptor.
+    A fresh (non-resumed) run truncates any old journal.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+    if not resume:
+        flags |= os.O_TRUNC
+    journal_fd = os.open(journal_path, flags, 0o644)
+
+    # Terminate a torn last line so the next entry starts on a line of its own
+    if resume and os.path.getsize(journal_path):
+        with open(journal_path, "rb") as journal:
+            journal.seek(-1, os.SEEK_END)
+            if journal.read(1) != b"\n":
+                os.write(journal_fd, b"\n")
+    return journal_fd
+# ==============================================================================
+def record_file(journal_fd, file_name, size, prop_number, info):
+    """
+    Append one completed file to the journal.
+    The whole line goes out in a single O_APPEND write and is fsync'd, so a
+    crash leaves at worst one torn line at the end, which load_journal() skips.
+    """
+    entry = {"file": file_name, "size": size, "prop_number": prop_number, "info": info}
+    line = json.dumps(entry) + "\n"
+    os.write(journal_fd, line.encode("utf-8"))
+    os.fsync(journal_fd)
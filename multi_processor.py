@@ -7,16 +7,65 @@ Parse AFWERX Proposals for the following info an aggregate it in one .csv file:
 5. Various budget line items
 """
 import argparse
+import json
 import os
+import queue
 import sys
+from itertools import chain
+import zipfile
+from xml.etree import ElementTree
 from utils import is_directory, is_filename
-
-# TODO Update with mandatory sections, then check for their presence
+from output import natural_keys, output_formats, read_results, write_results
+from sharding import in_shard, merge_shards, parse_shard, shard_out_path
+from journal import default_journal_path, load_journal, open_journal, record_file
+from archives import archive_separator, is_archive, is_archive_member, list_archive, member_info, open_archive_version, read_member
+from shared_buffers import SharedTasks, attach, detach, shared_view
+from text_store import TextStore, content_key, flatten_pages, page_of_line, split_pages
+from section_index import SectionIndex, disclaimer
+from signatures import find_signed_by_text, read_signature_fields, with_signatures
+from form_fields import load_form_map, map_form_fields, read_form_fields
+from pptx_index import index_pptx, slide_columns
+from search_index import SearchIndex
+from near_duplicates import find_clusters, minhash, write_report
+import progress
+from progress import Progress, report
+from service import default_address, job_options, request_parse, serve, portable_config
+from scheduler import deck_cost, guess_pages, imbalance, min_page_bytes, page_ranges, pdf_cost, quick_cost, schedule_groups, schedule_tiers, text_passes
+from title_index import TitleIndex
+from schema import Record, not_attempted, role_columns, to_frame
+from roi_ocr import ocr_page_regions
+from batch_ocr import chunks, ocr_files
+from field_ocr import found_questions, header_pages, ocr_pages, question_columns, question_pages, text_less_pages
+from validation import print_summary, validate
+
+# Default required sections for --check-sections
 sections = [
     "Method",
     "Approach"
 ]
 
+# Worker side: pages of split files, extracted in parallel (see run_batch())
+preloaded_pages = {}
+# Files whose pages are kept in preloaded_pages while parse_file() reads them
+shared_files = set()
+
+# With a --deadline, Type and Phase are looked for on this many pages of the
+# all_forms package first (see parse_quick_fields())
+quick_pages = 2
+
+# Required for all but Phase I proposals, see finalize_row()
+poc_headers = [
+    "Primary End-User Organization",
+    "Primary Customer Organization",
+    "Technical Points of Contact (TPOCs)"
+]
+
+# Sections copied verbatim into the results: {column: section heading}
+extracted_sections = {
+    "Safety-Related Deliverables": "Safety Related Deliverables",
+    "Commercialization Strategy": "Commercialization Strategy"
+}
+
 key_phrases = [
     "DAF Customer",
     "DAF End-User",
@@ -50,31 +99,226 @@ def lower_str(x):
     return x.lower()
 
 # ==============================================================================
-def process_ppt(file_name):
+def open_pdf(file_name):
+    """
+    Open a PDF with fitz, either from disk or, for "<zip>::<member>" names,
+    from an in-memory stream of the ZIP member.
+    Members the parent already placed in shared memory are read in place.
+    """
+    view = shared_view(file_name)
+    if view is not None:
+        return fitz.open(stream=view, filetype="pdf")
+    if is_archive_member(file_name):
+        return fitz.open(stream=read_member(file_name), filetype="pdf")
+    return fitz.open(file_name)
+# ==============================================================================
+def extract_pages(file_name, start=0, stop=None):
+    """
+    Extract the text of every page (or pages start to stop) with fitz,
+    as one list of lines per page
+    """
+    pages = []
+    with open_pdf(file_name) as doc:
+        for page_i in range(start, doc.page_count if stop is None else stop):
+            logger.debug(f"{page_i}".center(80,"-"))
+            pages.append(doc[page_i].get_text().split('\n'))
+    report(pages=len(pages))
+    return pages
+# ==============================================================================
+def store_keys(file_name):
+    """
+    Return (path id, function returning the content key) for the text store.
+    The path id changes whenever the file does, so hashing the contents
+    is only needed the first time a file is seen.
+    """
+    if is_archive_member(file_name):
+        zip_path, info = member_info(file_name)
+        stat = os.stat(zip_path)
+        path_id = f"{os.path.abspath(zip_path)}|{stat.st_mtime_ns}|{info.filename}|{info.CRC}"
+        def hash_contents():
+            view = shared_view(file_name)
+            return content_key([view if view is not None else read_member(file_name)])
+    else:
+        stat = os.stat(file_name)
+        path_id = f"{os.path.abspath(file_name)}|{stat.st_size}|{stat.st_mtime_ns}"
+        def hash_contents():
+            with open(file_name, "rb") as f:
+                return content_key(iter(lambda: f.read(1 << 20), b""))
+    return path_id, hash_contents
+# ==============================================================================
+def store_key(file_name):
+    """
+    The file's content key in the --text-store, hashing its contents only
+    if this version of the file hasn't been seen before
+    """
+    path_id, hash_contents = store_keys(file_name)
+    key = text_store.lookup_path(path_id)
+    if not key:
+        key = hash_contents()
+        text_store.record_path(path_id, key)
+    return key
+# ==============================================================================
+def stored_pages(file_name):
+    """
+    Return (content key, pages) from the --text-store.
+    pages is None if the file's text hasn't been stored yet.
+    """
+    key = store_key(file_name)
+    stored = text_store.load(key)
+    if stored:
+        logger.debug(f"Text store hit for {file_name}")
+        return key, split_pages(*stored)
+    return key, None
+# ==============================================================================
+def get_pages(file_name):
     """
-    Prints the title of every slide
+    Return the text of every page as one list of lines per page, from the
+    --text-store if possible, otherwise by extracting it with fitz
+    (and saving it to the store for next time).
+    Pages already in preloaded_pages (a large file extracted in parallel,
+    see run_batch(), or pages re-read with OCR, see parse_with_ocr()) are
+    used as is.  The pages of a file in shared_files are kept there too,
+    so the parsers and indexes of one parse_file() call extract it once.
     """
-    # Lazily load the pptx module - this will only execute once if needed at all
-    from pptx import Presentation
-    prs = Presentation(file_name)
+    pages = preloaded_pages.get(file_name)
+    if pages is not None:
+        if text_store:
+            key = store_key(file_name)
+            if not text_store.has(key):
+                text_store.save(key, *flatten_pages(pages))
+        return pages
+
+    if text_store:
+        key, pages = stored_pages(file_name)
+        if pages is None:
+            pages = extract_pages(file_name)
+            text_store.save(key, *flatten_pages(pages))
+    else:
+        pages = extract_pages(file_name)
+    if file_name in shared_files:
+        preloaded_pages[file_name] = pages
+    return pages
+# ==============================================================================
+def read_stored(file_name, name, read):
+    """
+    Return read(open fitz doc) for this PDF.  With a --text-store the result
+    is saved next to the file's text under name, so later runs don't open
+    the PDF for it.  It must be JSON serializable.
+    """
+    key = store_key(file_name) if text_store else None
+    if key:
+        facts = text_store.load_facts(key)
+        if name in facts:
+            return facts[name]
+    with open_pdf(file_name) as doc:
+        value = read(doc)
+    if key:
+        text_store.save_fact(key, name, value)
+    return value
+# ==============================================================================
+def first_pages(file_name, count):
+    """
+    The text of the first count pages.  With a --text-store the whole text
+    is stored (see get_pages()), so later runs needn't open the file.
+    """
+    if text_store or file_name in preloaded_pages:
+        return get_pages(file_name)[:count]
+    with open_pdf(file_name) as doc:
+        return [doc[page_i].get_text().split('\n') for page_i in range(min(count, doc.page_count))]
+# ==============================================================================
+def get_text_segs(file_name):
+    """
+    Return every line of text in the file, all pages back to back
+    """
+    return flatten_pages(get_pages(file_name))[1]
+# ==============================================================================
+def count_pages(file_name):
+    """
+    Number of pages, without extracting any text
+    """
+    if file_name in preloaded_pages:
+        return len(preloaded_pages[file_name])
+    if text_store:
+        _, pages = stored_pages(file_name)
+        if pages is not None:
+            return len(pages)
+    with open_pdf(file_name) as doc:
+        return doc.page_count
+# ==============================================================================
+def process_ppt(file_name, prop_number):
+    """
+    Return the slide count, and the title and text length of every slide
+    as result columns (see pptx_index.py), and the MinHash signature of a
+    Vol2 deck's text
+    """
+    if file_name.split(".")[-1].lower() != "pptx":
+        print(f"Can't index {base_name(file_name)}; only .pptx decks are supported")
+        return {}
 
-    for slide_index, slide in enumerate(prs.slides):
-        try:
-            title = slide.shapes.title.text
-        except AttributeError:
-            title = slide.shapes[0].text
-        print(f"Slide #{slide_index}: {title=}")
+    if is_archive_member(file_name):
+        import io
+        view = shared_view(file_name)
+        source = io.BytesIO(view if view is not None else read_member(file_name))
+    else:
+        source = file_name
+
+    try:
+        slides = index_pptx(source)
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+        print(f"Can't index {base_name(file_name)}: {e}")
+        return {}
+    for x in slides:
+        logger.info(f"Slide #{x['slide']}: {x['title']=}")
+    if title_index:
+        title_index.record(store_keys(file_name)[0], prop_number, file_name,
+                           [(x["slide"], x["title"]) for x in slides])
+    if search_index:
+        search_index.record(store_keys(file_name)[0], prop_number, file_name,
+                            [(x["slide"], x["text"]) for x in slides])
+    columns = slide_columns(slides)
+    # A Vol2 deck is compared with the other Vol2s too, see --dup-report
+    if args.dup_report and args.vol2_file.lower() in file_name.lower():
+        columns["_minhash"] = minhash("\n".join(x["text"] for x in slides))
+    return columns
 # ==============================================================================
 def process_pdf_page_titles(file_name):
     """
-    Prints the title of every page (intended for slides in pdf format)
+    Return [(page number, title)] for every page (intended for slides in pdf
+    format), where the title is the first line of text on the page.
+    Numbered headings within the pages (see section_index.py) are included
+    too, for documents that aren't slides.
     """
-    text = ''
-    with fitz.open(file_name) as doc:
-        for page_index, page in enumerate(doc):
-            logger.debug(f"{page_index}".center(80,"-"))
-            text = page.get_text().split('\n')[0]
-            print(f"Slide #{page_index}: {title=}")
+    titles = []
+    pages = get_pages(file_name)
+    for page_index, lines in enumerate(pages):
+        text = next((x.strip() for x in lines if x.strip()), "")
+        logger.debug(f"Slide #{page_index+1}: {text=}")
+        titles.append((page_index+1, text))
+
+    page_offsets, text_segs = flatten_pages(pages)
+    for section in SectionIndex(text_segs).sections:
+        titles.append((page_of_line(page_offsets, section["start"])+1, section["title"]))
+    return titles
+# ==============================================================================
+def index_page_titles(file_name, prop_number):
+    """
+    Add a PDF's page titles to the --title-index, unless already there
+    """
+    path_id = store_keys(file_name)[0]
+    if title_index.has_file(path_id):
+        return
+    title_index.record(path_id, prop_number, file_name, process_pdf_page_titles(file_name))
+# ==============================================================================
+def index_page_text(file_name, prop_number):
+    """
+    Add the text of every page of a PDF to the --search-index, unless already there
+    """
+    path_id = store_keys(file_name)[0]
+    if search_index.has_file(path_id):
+        return
+    pages = get_pages(file_name)
+    search_index.record(path_id, prop_number, file_name,
+                        [(page_i+1, "\n".join(lines)) for page_i, lines in enumerate(pages)])
 # ==============================================================================
 def parse_firm_certificate(seg_i, single_text, text_segs, firm_cert_questions):
     """
@@ -209,75 +453,6 @@ def parse_proposal_certification(   seg_i,
             logger.debug(str(result))
     return result
 # ==============================================================================
-
-def parse_safety(seg_i, single_text, text_segs):
-    """
-    Parse the "Safety Related Deliverables" section, returning all paragraphs
-    under that heading.
-    """
-    start_number = 0
-    result = ""
-    low_start = 0
-    disclaimer = "Use or disclosure of data contained on this page is subject to the restriction on the first page of this volume"
-    # Return immediately if that header isn't present
-    if not safety_heading.search(single_text.lower()):
-        return {}
-
-    # Header is present, search nearby for an associated number, e.g.
-    # 2.7 Safety Related Deliverables
-    for i in range(-2,1):
-        try:
-            start_number = re.match("(\d(\.\d)+)", text_segs[seg_i+i].split()[0]) #float(text_segs[seg_i+i].split()[0].rstrip('.'))
-            if start_number:
-                start_number = start_number.group()
-                low_start = i
-                break
-        except IndexError as e:
-            pass
-
-    # Low start <0 means the number was found in a
-    # text block BEFORE the key word
-    if low_start < 0:
-        for i in range(low_start,0,1):
-            result += text_segs[seg_i+i] + ' '
-        #result += '\n'
-
-    # Keep up to 100 lines that follow, searching for the next section, e.g.
-    #  the next number, e.g.
-    # 2.8 Other Deliverables
-    # 3. Next section
-    # Stop when this next section is found
-    # TODO How many lines to get?  4? 10?
-    logging.debug(f"{start_number=}")
-    for i in range(20):
-        try:
-            if bool(re.search("\d\.|^\d$|Commercialization Strategy", text_segs[seg_i+i].strip())):
-                number_str = text_segs[seg_i+i].split()[0]#.rstrip('.')
-                #new_number = float(number_str)
-                new_number = number_str
-                logger.info(f"{new_number=}")
-                """
-                delta = math.floor(new_number) - math.floor(start_number)
-                if delta >= 1:
-                    logging.debug(f"Safety, found new heading: {new_number=} {start_number=} on line '{text_segs[seg_i+i]}'")
-                    break
-                """
-                if not number_str.startswith(str(start_number)):
-                    logger.debug(f"{number_str} doesn't start with {start_number}; breaking")
-                    break
-        except ValueError as e:
-            print(f"Error: {e=}")
-            pass
-        if disclaimer != text_segs[seg_i+i]:
-            result += text_segs[seg_i+i] + '\n'
-            logger.debug(text_segs[seg_i+i])
-
-    if result:
-        logger.info(f"Safety: {result=}")
-        return {"Safety-Related Deliverables": result}
-
-    return {}
-# ==============================================================================
 def parse_type_phase(text):
     phase = ""
     p_type = ""
@@ -294,12 +469,56 @@ def parse_type_phase(text):
         p_type = "STTR"
     return p_type, phase
 # ==============================================================================
+def parse_form_questions(file_name):
+    """
+    Fast path for fillable all_forms packages: read the answers from the form
+    fields instead of the text.  Returns {} unless this is a form PDF whose
+    fields map to certification questions (see form_fields.py), in which
+    case parse_questions() falls back to the text.  The result is marked
+    with "_form_fields".
+    """
+    # None for PDFs that aren't forms
+    fields = read_stored(file_name, "form_fields",
+                         lambda doc: read_form_fields(doc) if doc.is_form_pdf else None)
+    if fields is None:
+        return {}
+    result = map_form_fields(fields)
+    if not any(k.startswith(("Firm Certification Q", "Proposal Certification Q")) for k in result):
+        logger.info(f"Form fields of {file_name} don't map to any questions, parsing text")
+        return {}
+
+    # Type and Phase are usually printed on the cover rather than filled in
+    if "Type" not in result or "Phase" not in result:
+        for page in first_pages(file_name, 2):
+            lines = [x for x in page if "Phase" in x and "Proposal" in x]
+            if lines:
+                prop_type, prop_phase = parse_type_phase(lines[0])
+                result.setdefault("Type", prop_type)
+                result.setdefault("Phase", prop_phase)
+                break
+
+    if result.get("Type") == "SBIR":
+        for key in range(19,23):
+            result.setdefault(f"Proposal Certification Q{key}", "N/A")
+    prop_missing = [q for q in range(1, 23) if f"Proposal Certification Q{q}" not in result]
+    firm_missing = [q for q in range(1, 19) if f"Firm Certification Q{q}" not in result]
+    if prop_missing:
+        result["Missing Proposal Certificate questions"] = prop_missing
+    if firm_missing:
+        result["Missing Firm Certificate Questions"] = firm_missing
+    logger.debug(f"Form fields: {result=}")
+    result["_form_fields"] = True
+    return result
+# ==============================================================================
 def parse_questions(file_name):
     """
     Parse all relevant questions from the all_forms files, e.g.
     F2D-1234_All_forms_proposal_package.pdf
     """
     #print(f"Parsing all forms: {file_name}")
+    result = parse_form_questions(file_name)
+    if result:
+        return result
 
     sbir_phase_I_prop_cert_question_1 = "Written Approval:"
     sbir_phase_II_prop_cert_question_1 = "officer:"
@@ -388,122 +607,122 @@ def parse_questions(file_name):
     duration = "Proposed Base Duration (in months)"
     prop_cert_questions = None
 
-    text_segs = []
-    safety_info_found = 0
     result = {}
+    # {column: line index} of each certification answer, see field_ocr.py
+    question_lines = {}
     answer = ""
     type_found = False
     prop_type = False
     last_answer = None
     past_regulatory_heading = False
-    with fitz.open(file_name) as doc:
-        for page_i, page in enumerate(doc):
-            logger.debug(f"{page_i}".center(80,"-"))
-            text_segs += page.get_text().split('\n')
+    text_segs = get_text_segs(file_name)
 
-        #for seg_i, (page_i, single_text) in enumerate(text_segs):
-        #    print(f"Page #{page_i}, text #: {seg_i}: '{single_text}'")
+    #for seg_i, (page_i, single_text) in enumerate(text_segs):
+    #    print(f"Page #{page_i}, text #: {seg_i}: '{single_text}'")
 
-        # Iterate over every text block in the PDF
-        for seg_i, single_text in enumerate(text_segs):
-            if not single_text:
-                continue
+    # Iterate over every text block in the PDF
+    for seg_i, single_text in enumerate(text_segs):
+        if not single_text:
+            continue
 
-            if not type_found and "Phase" in single_text and "Proposal" in single_text:
-                type_found = True
-                prop_type, prop_phase = parse_type_phase(single_text)
-                if prop_type == "SBIR":
-                    prop_cert_questions = sbir_prop_cert_questions
-                elif prop_type == "STTR":
-                    prop_cert_questions = sttr_prop_cert_questions
-                this_answer = {"Type":prop_type, "Phase": prop_phase}
-                logger.debug(f"{single_text=} parsed to {this_answer=}")
-                if this_answer["Type"] == "SBIR" and this_answer["Phase"] == "I":
-                    logger.debug("Updating SBIR Prop Q1")
-                    sbir_prop_cert_questions[1] = sbir_phase_I_prop_cert_question_1
-                result.update(this_answer)
+        if not type_found and "Phase" in single_text and "Proposal" in single_text:
+            type_found = True
+            prop_type, prop_phase = parse_type_phase(single_text)
+            if prop_type == "SBIR":
+                prop_cert_questions = sbir_prop_cert_questions
+            elif prop_type == "STTR":
+                prop_cert_questions = sttr_prop_cert_questions
+            this_answer = {"Type":prop_type, "Phase": prop_phase}
+            logger.debug(f"{single_text=} parsed to {this_answer=}")
+            if this_answer["Type"] == "SBIR" and this_answer["Phase"] == "I":
+                logger.debug("Updating SBIR Prop Q1")
+                sbir_prop_cert_questions[1] = sbir_phase_I_prop_cert_question_1
+            result.update(this_answer)
+
+        if not prop_type:
+            continue
 
-            if not prop_type:
+        single_text = single_text.strip()
+        if len(single_text.split()) == 1:
+            last_answer = single_text
+            #continue
+
+        # Remove entries from the firm_cert_questions list once found
+        if firm_cert_questions:
+            firm_cert_info = parse_firm_certificate(seg_i,
+                                                    single_text,
+                                                    text_segs,
+                                                    firm_cert_questions)
+            if firm_cert_info:
+                value, answer = firm_cert_info.popitem()
+                this_answer = {f"Firm Certification Q{value}":answer}
+                firm_cert_questions.pop(value)
+                result.update(this_answer)
+                question_lines.update(dict.fromkeys(this_answer, seg_i))
                 continue
 
-            single_text = single_text.strip()
-            if len(single_text.split()) == 1:
-                last_answer = single_text
-                #continue
-
-            # Remove entries from the firm_cert_questions list once found
-            if firm_cert_questions:
-                firm_cert_info = parse_firm_certificate(seg_i,
-                                                        single_text,
-                                                        text_segs,
-                                                        firm_cert_questions)
-                if firm_cert_info:
-                    value, answer = firm_cert_info.popitem()
-                    this_answer = {f"Firm Certification Q{value}":answer}
-                    firm_cert_questions.pop(value)
-                    result.update(this_answer)
-                    continue
-
-            # Remove entries from the prop_cert_questions list once found
-            if prop_cert_questions:
-                prop_cert_info = parse_proposal_certification(  seg_i,
-                                                                single_text,
-                                                                text_segs,
-                                                                prop_cert_questions,
-                                                                prop_type,
-                                                                last_answer)
-                if prop_cert_info:
-                    value, answer = prop_cert_info.popitem()
-                    this_answer = {f"Proposal Certification Q{value}":answer}
-                    prop_cert_questions.pop(value)
-                    result.update(this_answer)
-                    if result['Type'] == "SBIR" and 19 in prop_cert_questions:
-                        for key in range(19,23):
-                            result[f"Proposal Certification Q{key}"] = prop_cert_questions.pop(key)
-                    continue
-
-            # This safety info appears twice, once in the table of contents
-            #and once in the body
-            if safety_info_found < 2:
-                safety_info = parse_safety(seg_i, single_text, text_segs)
-                if safety_info:
-                    safety_info_found +=1
-                    result.update(safety_info)
-                    continue
-
-            # Parse the regulatory info
-            # Assume it also oappears
-            if "compliance and regulatory activities" in single_text.lower():
-                past_regulatory_heading = True
+        # Remove entries from the prop_cert_questions list once found
+        if prop_cert_questions:
+            prop_cert_info = parse_proposal_certification(  seg_i,
+                                                            single_text,
+                                                            text_segs,
+                                                            prop_cert_questions,
+                                                            prop_type,
+                                                            last_answer)
+            if prop_cert_info:
+                value, answer = prop_cert_info.popitem()
+                this_answer = {f"Proposal Certification Q{value}":answer}
+                prop_cert_questions.pop(value)
+                result.update(this_answer)
+                question_lines.update(dict.fromkeys(this_answer, seg_i))
+                if result['Type'] == "SBIR" and 19 in prop_cert_questions:
+                    for key in range(19,23):
+                        result[f"Proposal Certification Q{key}"] = prop_cert_questions.pop(key)
+                continue
 
-            if past_regulatory_heading and regulatory_questions:
-                q_to_delete = set()
-                for question in regulatory_questions:
-                    if question.lower() in single_text.lower():
-                        logger.debug(f"Found reg question: {single_text}")
+        # Parse the regulatory info
+        # Assume it also oappears
+        if "compliance and regulatory activities" in single_text.lower():
+            past_regulatory_heading = True
+
+        if past_regulatory_heading and regulatory_questions:
+            q_to_delete = set()
+            for question in regulatory_questions:
+                if question.lower() in single_text.lower():
+                    logger.debug(f"Found reg question: {single_text}")
+                    answer = single_text.split()[-1].lower()
+                    if answer in ["yes", "no"]:
+                        result[f"Regulatory: {question}"] = single_text.split()[-1]
+                        q_to_delete.add(question)
+                    break
+                else:
+                    partial_q = re.sub("Does this activity", "", question)
+                    if partial_q[:20].lower() in single_text.lower():
+                        single_text += " " + text_segs[seg_i+1]
+                        logger.debug((f"Found partial reg question: {single_text}"))
                         answer = single_text.split()[-1].lower()
                         if answer in ["yes", "no"]:
                             result[f"Regulatory: {question}"] = single_text.split()[-1]
                             q_to_delete.add(question)
-                        break
-                    else:
-                        partial_q = re.sub("Does this activity", "", question)
-                        if partial_q[:20].lower() in single_text.lower():
-                            single_text += " " + text_segs[seg_i+1]
-                            logger.debug((f"Found partial reg question: {single_text}"))
-                            answer = single_text.split()[-1].lower()
-                            if answer in ["yes", "no"]:
-                                result[f"Regulatory: {question}"] = single_text.split()[-1]
-                                q_to_delete.add(question)
-                                break
-
-                for q in q_to_delete:
-                    logger.debug(f"Removing {q} from list of requlatory questions")
-                    regulatory_questions.remove(q)
-
-            if duration and duration.lower() in single_text.lower():
-                result["Duration (Mo.)"] = single_text.split()[-1].strip()
-                duration = False
+                            break
+
+            for q in q_to_delete:
+                logger.debug(f"Removing {q} from list of requlatory questions")
+                regulatory_questions.remove(q)
+
+        if duration and duration.lower() in single_text.lower():
+            result["Duration (Mo.)"] = single_text.split()[-1].strip()
+            duration = False
+
+    # Sections like Safety Related Deliverables appear twice, once in the
+    # table of contents and once in the body; the index returns the body
+    if prop_type:
+        section_index = SectionIndex(text_segs, extracted_sections.values())
+        for column, heading in extracted_sections.items():
+            section_text = section_index.section_text(heading)
+            if section_text:
+                logger.info(f"{column}: {section_text=}")
+                result[column] = section_text
 
     #for prop_cert_question in prop_cert_questions:
     logger.debug(f"{result=}")
@@ -514,6 +733,8 @@ def parse_questions(file_name):
         print(f"Couldn't find Proposal Certificate questions:")
         pprint.pprint(firm_cert_questions)
         result["Missing Firm Certificate Questions"] = list(firm_cert_questions)
+    if question_lines:
+        result["_question_lines"] = question_lines
     return result
 # ==============================================================================
 def parse_budget(file_name,
@@ -539,37 +760,34 @@ def parse_budget(file_name,
         "Total Direct Labor (TDL)",
     ]
     total_heading = "Total Dollar Amount for this Proposal"
-    text_segs = []
     total_proposal_cost = 0
     unique_costs = set()
     result = {}
-    with fitz.open(file_name ) as doc:
-        for page in doc:
-            text_segs += page.get_text().split('\n')
+    text_segs = get_text_segs(file_name)
 
-        for seg_i, single_text in enumerate(text_segs):
-            logger.debug(single_text)
-            logger.debug(f"{keyphrase} {type(keyphrase)}")
+    for seg_i, single_text in enumerate(text_segs):
+        logger.debug(single_text)
+        logger.debug(f"{keyphrase} {type(keyphrase)}")
 
-            for heading in sumable_headings:
-                if heading.lower() in single_text.lower():
-                    cost_str = text_segs[seg_i+1]
-                    cost_float = float(cost_str.lstrip('$').replace(",",""))
-                    if not cost_float or cost_float not in unique_costs:
-                        unique_costs.add(cost_float)
-                        summed_costs[heading] += cost_float
+        for heading in sumable_headings:
+            if heading.lower() in single_text.lower():
+                cost_str = text_segs[seg_i+1]
+                cost_float = float(cost_str.lstrip('$').replace(",",""))
+                if not cost_float or cost_float not in unique_costs:
+                    unique_costs.add(cost_float)
+                    summed_costs[heading] += cost_float
 
-            if total_heading and total_heading.lower() in single_text.lower():
-                logger.debug(single_text)
-                budget_str = text_segs[seg_i+1]
-                logger.debug(budget_str)
-                total_proposal_cost = float(budget_str.lstrip('$').replace(",",""))
-                result["Total"] = total_proposal_cost
-                logger.debug(result)
-                if total_proposal_cost > max_value:
-                    print(f"WARNING! Proposed budget exceeds ${max_value}!")
-                total_heading = False
-                continue
+        if total_heading and total_heading.lower() in single_text.lower():
+            logger.debug(single_text)
+            budget_str = text_segs[seg_i+1]
+            logger.debug(budget_str)
+            total_proposal_cost = float(budget_str.lstrip('$').replace(",",""))
+            result["Total"] = total_proposal_cost
+            logger.debug(result)
+            if total_proposal_cost > max_value:
+                print(f"WARNING! Proposed budget exceeds ${max_value}!")
+            total_heading = False
+            continue
 
     #pprint.pprint(summed_costs)
     result.update(summed_costs)
@@ -584,7 +802,7 @@ def get_total_budget(file_name,
     """
     budget_float = -1.0
     threshold = "$"+str(max_value/1000000)+"M"
-    with fitz.open(file_name ) as doc:
+    with open_pdf(file_name) as doc:
         for page in doc:
             logger.debug(f"{page_count}".center(80,"-"))
             text_segs = page.get_text().split('\n')
@@ -604,7 +822,9 @@ def get_total_budget(file_name,
 # ==============================================================================
 def process_pdf_sigs_fitz(file_name):
     """
-    Collect POC info, returning immediately once all 3 POCs found
+    Collect POC info, returning immediately once all 3 POCs found.
+    Digital signatures are read from the PDF's signature fields; the text is
+    only searched for "Digitally signed by" if there are none.
     """
     got_text = False
     result = defaultdict(str)
@@ -613,49 +833,52 @@ def process_pdf_sigs_fitz(file_name):
         "Primary Customer Organization",
         "Technical Points of Contact (TPOCs)"
     ]
-    with fitz.open(file_name) as doc:
+    # Saved with the text in the --text-store, like form fields
+    signatures = read_stored(file_name, "signature_fields", read_signature_fields)
+    scan_signatures = not signatures
+
+    # Iterate over every page in the doc
+    for pi, text_segs in enumerate(get_pages(file_name)):
+        #text_segs = [text.strip() for text in text_segs if text.strip()]
+        if not text_segs:
+            continue
 
-        # Iterate over every page in the doc
-        for pi, page in enumerate(doc):
-            text_segs = page.get_text().split('\n')
-            #text_segs = [text.strip() for text in text_segs if text.strip()]
-            if not text_segs:
-                continue
+        got_text = True
+        logger.debug(text_segs)
+        if scan_signatures:
+            signatures += find_signed_by_text(pi, text_segs)
+        # Iterate over every text field
+        for seg_i, single_text in enumerate(text_segs):
+            logger.debug(f"Page #{pi}, text #: {seg_i}: '{single_text}'")
+            for key_phrase in headers:
+                if key_phrase not in single_text:
+                    continue
 
-            got_text = True
-            logger.debug(text_segs)
-            # Iterate over every text field
-            for seg_i, single_text in enumerate(text_segs):
-                logger.debug(f"Page #{pi}, text #: {seg_i}: '{single_text}'")
-                for key_phrase in headers:
-                    if key_phrase not in single_text:
-                        continue
+                count = 0
+                index = 0
+                # Sometimes there are blank newlines
+                # Skip over them, grabbing the next two lines with text
+                while index < 10:
+                    try:
+                        x = text_segs[seg_i+index]
+                    except IndexError as e:
+                        break
+                    if x.strip():
+                        count += 1
+                        result[key_phrase] += x + '\n'
+                        logger.debug(x)
 
-                    count = 0
-                    index = 0
-                    # Sometimes there are blank newlines
-                    # Skip over them, grabbing the next two lines with text
-                    while index < 10:
-                        try:
-                            x = text_segs[seg_i+index]
-                        except IndexError as e:
-                            break
-                        if x.strip():
-                            count += 1
-                            result[key_phrase] += x + '\n'
-                            logger.debug(x)
-
-                        index +=1
-                        if x.rstrip().endswith(","):
-                            continue
-                        if count > 2 or index > 10:
-                            break
+                    index +=1
+                    if x.rstrip().endswith(","):
+                        continue
+                    if count > 2 or index > 10:
+                        break
 
-                    headers.remove(key_phrase)
-                    if not headers:
-                        return result
-                    continue
-    return result
+                headers.remove(key_phrase)
+                if not headers and not scan_signatures:
+                    return with_signatures(result, signatures)
+                continue
+    return with_signatures(result, signatures)
 # ==============================================================================
 def ocr_cleanup(open_file_handle, open_file_name, files_to_remove):
     """
@@ -676,12 +899,26 @@ def ocr_pdf(file_name):
 
     Use optical character recognition to parse scanned PDFs
     https://www.geeksforgeeks.org/python-reading-contents-of-pdf-using-ocr-optical-character-recognition/
+
+    With --ocr-mode roi only the regions around the key phrases are read,
+    see roi_ocr.py
     """
     print(f"OCR'ing {file_name}.  This could take a minute.")
+    if args.ocr_mode == "roi":
+        with open_pdf(file_name) as doc:
+            report(state="OCR", file=file_name, ocr_pending=doc.page_count)
+            for page_i, page in enumerate(doc):
+                show_key_phrases(ocr_page_regions(page, key_phrases))
+                report(pages=1, ocr_pending=doc.page_count - page_i - 1)
+        return
     # Counter to store images of each page of PDF to image
     image_counter = 1
     files_to_remove = []
-    pages = convert_from_path(file_name, 500)
+    if is_archive_member(file_name):
+        pages = convert_from_bytes(read_member(file_name), 500)
+    else:
+        pages = convert_from_path(file_name, 500)
+    report(state="OCR", file=file_name, ocr_pending=len(pages))
     # Iterate through all the pages stored above
     for page in pages:
         filename = "page_"+str(image_counter)+".jpg"
@@ -698,10 +935,16 @@ def ocr_pdf(file_name):
     # All contents of all images are added to the same file
     f = open(outfile, "a")
 
+    # Recognize the text as string in image using pytesserct, one process
+    # per page, or many pages per process (see batch_ocr.py)
+    if args.ocr_backend == "batch":
+        texts = (text for chunk in chunks(files_to_remove) for text in ocr_files(chunk))
+    else:
+        texts = (str(pytesseract.image_to_string(Image.open(filename))) for filename in files_to_remove)
+
     # Iterate from 1 to total number of pages
-    for filename in files_to_remove:
-        # Recognize the text as string in image using pytesserct
-        text = str(((pytesseract.image_to_string(Image.open(filename)))))
+    for page_i, (filename, text) in enumerate(zip(files_to_remove, texts)):
+        report(pages=1, ocr_pending=len(files_to_remove) - page_i - 1)
         # Finally, write the processed text to the file.
         f.write(text)
         print(f"Page {filename}")
@@ -710,208 +953,809 @@ def ocr_pdf(file_name):
         # text = text.replace('-\n', '')
         text_segs = text.split("\n")
         text_segs = [x.strip() for x in text_segs if x]
-        # Iterate over every text field
-        for seg_i,_  in enumerate(text_segs):
-            single_text = text_segs[seg_i]
-            for key_phrase in key_phrases:
-                if key_phrase in single_text:
-                    print(f"Segment {seg_i}".center(80, "*"))
-                    for x in text_segs[seg_i-2:seg_i+5]:
-                        print(x)
-                    print("*"*80)
-                    logger.debug(single_text.strip())
-                    #ocr_cleanup(f, outfile, files_to_remove)
-                    #return[0]
-            logger.debug(text)
+        show_key_phrases(text_segs)
+        logger.debug(text)
     ocr_cleanup(f, outfile, files_to_remove)
 # ==============================================================================
+def parse_with_ocr(file_name, pages, page_numbers, parser):
+    """
+    Run parser(file_name) again with these pages' text replaced by OCR
+    (see field_ocr.py).  Returns its result.
+    """
+    report(state="OCR (missing fields)", file=file_name, ocr_pending=len(page_numbers))
+    with open_pdf(file_name) as doc:
+        ocr_text = ocr_pages(doc, sorted(page_numbers), args.ocr_backend == "batch")
+    report(pages=len(page_numbers), ocr_pending=0)
+    logger.info(f"OCR'd pages {sorted(x+1 for x in page_numbers)} of {base_name(file_name)} for missing fields")
+
+    previous = preloaded_pages.get(file_name)
+    preloaded_pages[file_name] = [ocr_text.get(page_i, lines) for page_i, lines in enumerate(pages)]
+    try:
+        return parser(file_name)
+    finally:
+        if previous is None:
+            preloaded_pages.pop(file_name)
+        else:
+            preloaded_pages[file_name] = previous
+# ==============================================================================
+def ocr_missing_questions(file_name, result, question_lines):
+    """
+    Fill in the certification questions parse_questions() missed by OCR'ing
+    only the pages they should be on.  Updates result in place.
+    """
+    pages = get_pages(file_name)
+    page_offsets = flatten_pages(pages)[0]
+    targets = text_less_pages(pages)
+    for missing_column, column in question_columns.items():
+        targets |= question_pages(result.get(missing_column, []),
+                                  found_questions(question_lines, column),
+                                  page_offsets, len(pages))
+    if not targets:
+        logger.info(f"No pages of {base_name(file_name)} to OCR for the missing questions")
+        return
+    ocr_result = parse_with_ocr(file_name, pages, targets, parse_questions)
+
+    for missing_column, column in question_columns.items():
+        still_missing = []
+        for number in result.get(missing_column, []):
+            answer = ocr_result.get(column.format(number))
+            if answer:
+                result[column.format(number)] = answer
+            else:
+                still_missing.append(number)
+        if still_missing:
+            result[missing_column] = still_missing
+        else:
+            result.pop(missing_column, None)
+# ==============================================================================
+def ocr_missing_pocs(file_name, poc_info):
+    """
+    Look for the POC blocks process_pdf_sigs_fitz() missed by OCR'ing only
+    the pages they should be on.  Updates poc_info in place.
+    """
+    pages = get_pages(file_name)
+    found = [x for x in poc_headers if x in poc_info]
+    targets = text_less_pages(pages) | header_pages(pages, found)
+    if not targets:
+        logger.info(f"No pages of {base_name(file_name)} to OCR for the missing POCs")
+        return
+    ocr_info = parse_with_ocr(file_name, pages, targets, process_pdf_sigs_fitz)
+    for header in poc_headers:
+        if header not in poc_info and ocr_info.get(header):
+            poc_info[header] = ocr_info[header]
+# ==============================================================================
+def show_key_phrases(text_segs):
+    """
+    Print the OCR'd lines around every key phrase
+    """
+    # Iterate over every text field
+    for seg_i,_  in enumerate(text_segs):
+        single_text = text_segs[seg_i]
+        for key_phrase in key_phrases:
+            if key_phrase in single_text:
+                print(f"Segment {seg_i}".center(80, "*"))
+                for x in text_segs[seg_i-2:seg_i+5]:
+                    print(x)
+                print("*"*80)
+                logger.debug(single_text.strip())
+# ==============================================================================
 def parse_file(file_name, prop_number, ocr_flag):
     """
     Called by main(): this is the top level function for processing any file.
     Having one top-level function in this fashion allows for easy
-    parallelization with a multiprocessing Pool later, once all other
-    optimizations are complete.
-    # TODO Call this in parallel.
+    parallelization with a multiprocessing Pool (see parse_task()).
     """
     logger.debug("-"*80)
     file_info = {}
     temp_info = {}#{"Phase":'?'}
     poc_info = {}
     file_extension = file_name.split(".")[-1]
-    short_name = file_name.split("\\")[-1]
+    short_name = base_name(file_name)
     # Process PowerPoint files
     if file_extension in ppt_extensions:
-        process_ppt(file_name)
+        file_info.update(process_ppt(file_name, prop_number))
         #total_files +=1
 
     # All others are PDFs
     else:
-        #process_pdf_page_titles(file_name)
-        #if any(keyword in file_name.lower() for keyword in args.questions_file):
-        if args.questions_file.lower() in file_name.lower():
-            logger.info(f"Parsing {short_name} for questions")
-            temp_info.update(parse_questions(file_name))
-            file_info.update(temp_info)
-            if not temp_info:
-                if not file_info and ocr_flag:
-                    ocr_pdf(file_name)
-                else:
-                    print(f"Can't parse {short_name}; Consider enabling OCR with -o True")
-        #if "budget" in file_name:
-
-        if args.budget_file.lower() in file_name.lower():
-            logger.info(f"Parsing {short_name} for budget info")
-            temp_info.update(parse_budget(file_name, args.max_value))
-            file_info.update(temp_info)
-            #file_info.update(get_total_budget(file_name))
-            if not temp_info:
-                if not file_info and ocr_flag:
-                    ocr_pdf(file_name)
-                else:
-                    print(f"Can't parse {short_name}; Consider enabling OCR with -o True")
-
-        # Try to get signatures and TPOC data from this PDF
-        # If all 3 POCs haven't yet been found, search this file for them
-        if args.sig_file.lower() in file_name.lower():
-            logger.info(f"Parsing {short_name} for signatures")
-            poc_info = process_pdf_sigs_fitz(file_name)
-            if poc_info:
-                logger.info(f"Found POC info in {short_name}")
-                file_info.update(poc_info)
-
-        # Count number of pages/slides in the proposal document
-        # If all 3 POCs haven't yet been found, search this file for them
-        if args.vol2_file.lower() in file_name.lower():
-            logger.info(f"Counting slides/pages in {short_name}")
-            page_i = 0
-            with fitz.open(file_name) as doc:
-                for page_i, page in enumerate(doc):
-                    pass
-            file_info["Page Count"] = page_i
-
-    for k in file_info.keys():
+        # The parsers and indexes below all read the same text, so keep it
+        # once it's extracted (see get_pages())
+        share_pages = file_name not in preloaded_pages
+        if share_pages:
+            shared_files.add(file_name)
         try:
-            file_info[k] = file_info[k].strip()
-        except AttributeError:
-            pass
+            #process_pdf_page_titles(file_name)
+            #if any(keyword in file_name.lower() for keyword in args.questions_file):
+            if args.questions_file.lower() in file_name.lower():
+                logger.info(f"Parsing {short_name} for questions")
+                temp_info.update(parse_questions(file_name))
+                question_lines = temp_info.pop("_question_lines", {})
+                # Answers missing from the form fields aren't in the text for
+                # OCR to find either
+                from_form = temp_info.pop("_form_fields", False)
+                if ocr_flag and not from_form and any(x in temp_info for x in question_columns):
+                    ocr_missing_questions(file_name, temp_info, question_lines)
+                file_info.update(temp_info)
+                if not temp_info:
+                    if not file_info and ocr_flag:
+                        ocr_pdf(file_name)
+                    else:
+                        print(f"Can't parse {short_name}; Consider enabling OCR with -o True")
+            #if "budget" in file_name:
+
+            if args.budget_file.lower() in file_name.lower():
+                logger.info(f"Parsing {short_name} for budget info")
+                temp_info.update(parse_budget(file_name, args.max_value))
+                file_info.update(temp_info)
+                #file_info.update(get_total_budget(file_name))
+                if not temp_info:
+                    if not file_info and ocr_flag:
+                        ocr_pdf(file_name)
+                    else:
+                        print(f"Can't parse {short_name}; Consider enabling OCR with -o True")
+
+            # Try to get signatures and TPOC data from this PDF
+            # If all 3 POCs haven't yet been found, search this file for them
+            if args.sig_file.lower() in file_name.lower():
+                logger.info(f"Parsing {short_name} for signatures")
+                poc_info = process_pdf_sigs_fitz(file_name)
+                if ocr_flag and any(x not in poc_info for x in poc_headers):
+                    ocr_missing_pocs(file_name, poc_info)
+                if poc_info:
+                    logger.info(f"Found POC info in {short_name}")
+                    file_info.update(poc_info)
+
+            # Count number of pages/slides in the proposal document
+            # If all 3 POCs haven't yet been found, search this file for them
+            if args.vol2_file.lower() in file_name.lower():
+                logger.info(f"Counting slides/pages in {short_name}")
+                # Reported as the index of the last page
+                file_info["Page Count"] = max(count_pages(file_name) - 1, 0)
+                if title_index:
+                    index_page_titles(file_name, prop_number)
+                # Only the signature goes back to the parent, see --dup-report
+                if args.dup_report:
+                    text = "\n".join(x for x in get_text_segs(file_name) if x != disclaimer)
+                    file_info["_minhash"] = minhash(text)
+
+            if search_index:
+                index_page_text(file_name, prop_number)
+        finally:
+            if share_pages:
+                shared_files.discard(file_name)
+                preloaded_pages.pop(file_name, None)
+
+    # Text values are stripped as they're merged into the row (see schema.py)
     return file_info
 # ==============================================================================
-#https://www.tutorialspoint.com/
-# How-to-correctly-sort-a-string-with-a-number-inside-in-Python
-def atoi(text):
+def base_name(file_name):
     """
-    Helper function for sorting strings with numbers within them
+    Return the file name without its directories, whether the path was
+    written with Windows or Linux separators, or the zip it's in for a
+    "<zip>::<member>" at the root of the archive.
     """
-    return int(text) if text.isdigit() else text
+    return re.split(r"[\\/]|" + re.escape(archive_separator), file_name)[-1]
 #==============================================================================
-#https://www.tutorialspoint.com/
-# How-to-correctly-sort-a-string-with-a-number-inside-in-Python
-def natural_keys(text):
+def get_prop_number(file_name):
     """
-    Helper function #2 for sorting strings with numbers within them
+    Proposal number is the start of the file name, e.g.
+    F2D-1234_All_forms_proposal_package.pdf -> F2D-1234
     """
-    return [atoi(c) for c in re.split('(\d+)', text)]
+    return base_name(file_name).split("_")[0]
+#==============================================================================
+def make_config(**options):
+    """
+    Config for the library API: the command line defaults, with any option
+    overridden by keyword, e.g. make_config(workers=4, text_store="text_store")
+    """
+    config = build_parser().parse_args([])
+    for option, value in options.items():
+        if not hasattr(config, option):
+            raise TypeError(f"Unknown option '{option}'")
+        setattr(config, option, value)
+    return config
+# ==============================================================================
+def configure(config):
+    """
+    Set up the globals the parse functions rely on from config, importing
+    fitz (and the OCR modules, if enabled) on first use.  Called by
+    iter_proposals(), and by init_worker() in spawned workers.
+    """
+    global args, logger, fitz, re, pprint, time, logging, defaultdict
+    global some_digits, ppt_extensions, valid_extensions, text_store, title_index, search_index
+    global convert_from_bytes, convert_from_path, Image, pytesseract
+
+    args = config
+    import time
+    import pprint
+    import re
+    import logging
+    from collections import defaultdict
+    import fitz
+    if args.ocr:
+        from pdf2image import convert_from_bytes, convert_from_path
+        from PIL import Image
+        import pytesseract
+        # If you don't have tesseract executable in your PATH, include the following:
+        #pytesseract.pytesseract.tesseract_cmd = r'C:\\Program Files\\Tesseract-OCR\\tesseract'
+
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    logger = logging.getLogger(__name__)
+    logger.setLevel(args.log_level)
+
+    # Pre-compile re expressions
+    some_digits = re.compile(r'\d{5,}')
+
+    ppt_extensions = ["ppt", "pptx"]
+    valid_extensions = ppt_extensions + ["pdf"]
+
+    # Cache of extracted text, so parsers can be re-run without fitz
+    text_store = TextStore(args.text_store) if args.text_store else None
+    if args.form_map:
+        load_form_map(args.form_map)
+
+    # Slide/page titles of every deck and Vol2, for --check-sections
+    args.check_sections = args.check_sections or bool(args.required_section)
+    title_index = TitleIndex(args.title_index) if args.check_sections else None
+
+    # Text of every page, for the search subcommand
+    search_index = SearchIndex(args.search_index) if args.search_index else None
+# ==============================================================================
+def init_worker(worker_args, status_queue):
+    """
+    Pool initializer.  Forked workers (Linux) inherit every module and global
+    set up by configure(); spawned workers (Windows) start from nothing, so
+    configure them again.
+    Progress updates go to the parent over status_queue.
+    """
+    progress.status_queue = status_queue
+    progress.current = None
+    # Archives the parent had open share its file offset; reopen them here
+    open_archive_version.cache_clear()
+    if "fitz" in globals():
+        return
+    configure(worker_args)
+#==============================================================================
+def parse_task(task):
+    """
+    Pool worker: parse one file, mapping it from shared memory first if the
+    parent shared it.  depth is "full", or with a --deadline "quick" (just
+    parse_quick_fields()) or "deep" (the rest, after every quick task).
+    Returns (file name, size, proposal number, depth, file info)
+    """
+    file_name, size, prop_number, ocr_flag, shared_ref, depth = task
+    report(state="parsing", file=file_name)
+    block = attach(file_name, shared_ref) if shared_ref else None
+    try:
+        if depth == "quick":
+            return file_name, size, prop_number, depth, parse_quick_fields(file_name)
+        return file_name, size, prop_number, depth, parse_file(file_name, prop_number, ocr_flag)
+    finally:
+        if block:
+            detach(file_name, block)
+        report(state="idle", ocr_pending=0)
+#==============================================================================
+def parse_quick_fields(file_name):
+    """
+    --deadline: the cheap, high-value fields of a PDF, i.e. its Vol2 page
+    count, and Type and Phase from the first quick_pages pages of an
+    all_forms package
+    """
+    roles = file_roles(file_name)
+    info = {}
+    if "vol2" in roles:
+        info["Page Count"] = max(count_pages(file_name) - 1, 0)
+    if "questions" in roles:
+        with open_pdf(file_name) as doc:
+            stop = min(doc.page_count, quick_pages)
+        for lines in extract_pages(file_name, 0, stop):
+            found = [x for x in lines if "Phase" in x and "Proposal" in x]
+            if found:
+                info["Type"], info["Phase"] = parse_type_phase(found[0])
+                break
+    return info
+#==============================================================================
+def until_deadline(results, deadline):
+    """
+    Yield from results (a pool's imap iterator, or a map) until the deadline,
+    a time.time(), passes.  None means no deadline.  A pool's results are
+    waited for only until the deadline; a map's are checked between files.
+    """
+    from multiprocessing import TimeoutError
+    while True:
+        timeout = None if deadline is None else deadline - time.time()
+        if timeout is not None and timeout <= 0:
+            return
+        try:
+            result = results.next(timeout) if hasattr(results, "next") else next(results)
+        except (StopIteration, TimeoutError):
+            return
+        yield result
+#==============================================================================
+def run_batch(batch):
+    """
+    Pool worker: run one unit of scheduled work (see scheduler.py), one of
+    ("parse", [tasks])              parse a batch of files
+    ("pages", (file, start, stop))  extract one page range of a large file
+    ("preloaded", (task, pages))    parse a large file whose pages were
+                                    extracted by "pages" batches
+    Returns (worker pid, seconds busy, kind, results) where results is the
+    [parse_task() result per task], or (file, start, pages) for "pages".
+    """
+    start_time = time.perf_counter()
+    kind, payload = batch
+    if kind == "pages":
+        file_name, start, stop = payload
+        report(state=f"extracting pages {start+1}-{stop} of", file=file_name)
+        results = (file_name, start, extract_pages(file_name, start, stop))
+        report(state="idle")
+    elif kind == "preloaded":
+        task, pages = payload
+        preloaded_pages[task[0]] = pages
+        try:
+            results = [parse_task(task)]
+        finally:
+            preloaded_pages.pop(task[0])
+    else:
+        results = [parse_task(task) for task in payload]
+    return os.getpid(), time.perf_counter() - start_time, kind, results
+#==============================================================================
+def task_stream(batches, stitched, count):
+    """
+    Pool input: the scheduled batches, then the "preloaded" batch of each of
+    the count split files as soon as the parent has stitched its pages
+    together (stitched is a queue; None stops the stream early).
+    """
+    yield from batches
+    for _ in range(count):
+        batch = stitched.get()
+        if batch is None:
+            return
+        yield batch
+#==============================================================================
+def file_roles(file_name):
+    """
+    Which of parse_file()'s parsers (and indexes) will read this PDF's text
+    """
+    lower_name = file_name.lower()
+    roles = []
+    if args.questions_file.lower() in lower_name:
+        roles.append("questions")
+    if args.budget_file.lower() in lower_name:
+        roles.append("budget")
+    if args.sig_file.lower() in lower_name:
+        roles.append("signatures")
+    if args.vol2_file.lower() in lower_name:
+        roles.append("vol2")
+        if title_index:
+            roles.append("titles")
+        if args.dup_report:
+            roles.append("duplicates")
+    if search_index:
+        roles.append("search")
+    return roles
+#==============================================================================
+def probe_pdf(file_name):
+    """
+    Return (page count, whether the first page has a text layer), reading as
+    little as possible.  The text layer is only checked if OCR is enabled.
+    """
+    with open_pdf(file_name) as doc:
+        has_text = True
+        if args.ocr and doc.page_count:
+            has_text = bool(doc[0].get_text().strip())
+        return doc.page_count, has_text
+#==============================================================================
+def estimate_cost(task):
+    """
+    Estimated seconds to parse one task's file (see scheduler.py).
+    Returns (cost, page ranges to extract in parallel or None)
+    """
+    file_name, size = task[0], task[1]
+    if file_name.split(".")[-1].lower() in ppt_extensions:
+        return deck_cost(size), None
+    roles = file_roles(file_name)
+    if not text_passes(roles) and not args.ocr:
+        return pdf_cost(0, roles, False), None
+
+    # Huge files' text is extracted by several workers at once, unless
+    # there's no text to extract or it's already in the --text-store
+    split_candidate = args.split_pages and text_passes(roles) and \
+        size >= args.split_pages * min_page_bytes and \
+        not (text_store and text_store.has(store_key(file_name)))
+    # Other files are only opened to check for a text layer, and ZIP members
+    # (which would have to be decompressed) not even then
+    if not split_candidate and not (args.ocr and not is_archive_member(file_name)):
+        return pdf_cost(guess_pages(size), roles, False), None
+    try:
+        pages, has_text = probe_pdf(file_name)
+    except Exception as e:
+        logger.info(f"Can't probe {base_name(file_name)} ({e}); guessing its cost from its size")
+        return pdf_cost(guess_pages(size), roles, False), None
+
+    ranges = None
+    if split_candidate and pages >= args.split_pages and has_text:
+        ranges = page_ranges(pages, args.split_pages, args.workers)
+    return pdf_cost(pages, roles, not has_text), ranges
 #==============================================================================
 def done_gathering_info(info):
     # TODO
     pass
 #==============================================================================
-def main():
+def find_files(paths, config):
     """
-    Create a list of files as provided by -f and -d flags.
-    Will recursively traverse all -d directories keeping files whose names
-    include all terms specified by the -k options.
-
-    Write results to args.out
+    Return {(file name, size)} of every pdf/ppt/pptx to parse in paths.
+    Directories are searched recursively, keeping files whose names include
+    all the config.keyword terms; ZIP bundles are listed, not extracted.
     """
     target_files = set()
-    dirs = []
-    prop_status = defaultdict(str)
-    all_info = defaultdict(dict)
-    poc_headers = [
-        "Primary End-User Organization",
-        "Primary Customer Organization",
-        "Technical Points of Contact (TPOCs)"
-    ]
-
-    if not args.directory:
-        args.directory = set()
-    if not args.file:
-        args.file = set()
-    for directory in args.directory:
-        dirs.append(directory)
-
-    for file_name in args.file:
-        file_extension = file_name.split(".")[-1]
-        if file_extension in valid_extensions:
-            target_files.add(file_name)
-        else:
-            print(f"Skipping {file_name} with extension {file_extension}")
+    for path in paths:
+        if not os.path.isdir(path):
+            file_extension = path.split(".")[-1]
+            if file_extension in valid_extensions:
+                target_files.add((path, os.path.getsize(path)))
+            elif is_archive(path):
+                target_files.update(list_archive(path, config.keyword, valid_extensions))
+            else:
+                print(f"Skipping {path} with extension {file_extension}")
+            continue
 
-    # Count the total number of files to be parsed by recursively walking
-    # all provided directories.
-    for source_dir in dirs:
-        for (root, _, files) in os.walk(source_dir):
+        for (root, _, files) in os.walk(path):
             for file_name in files:
                 file_extension = file_name.split(".")[-1]
-                if ((args.keyword and all(x in file_name.lower() for x in args.keyword)) or \
-                    not args.keyword) and \
+                # Look inside ZIP bundles rather than extracting them to disk
+                if is_archive(file_name):
+                    target_files.update(list_archive(os.path.join(root, file_name),
+                                                     config.keyword,
+                                                     valid_extensions))
+                elif ((config.keyword and all(x in file_name.lower() for x in config.keyword)) or \
+                    not config.keyword) and \
                     file_extension.lower() in valid_extensions:
-                    target_files.add((root+'\\'+file_name, os.path.getsize(root+'/'+file_name)))
+                    full_name = os.path.join(root, file_name)
+                    target_files.add((full_name, os.path.getsize(full_name)))
+    return target_files
+# ==============================================================================
+def deadline_batches(tasks):
+    """
+    --deadline: give the PDFs that have both quick and deep fields a quick
+    task (see parse_quick_fields()) and a deep one, and return all the tasks
+    as batches, quick fields first (see scheduler.schedule_tiers())
+    """
+    expanded = []
+    costs = []
+    tiers = []
+    for task in tasks:
+        file_name = task[0]
+        cost, _ = estimate_cost(task)
+        roles = file_roles(file_name)
+        is_deck = file_name.split(".")[-1].lower() in ppt_extensions
+        if not is_deck and ("questions" in roles or ("vol2" in roles and text_passes(roles))):
+            # Quick tasks read members themselves, the deep one gets the
+            # shared memory block
+            expanded += [task[:4] + (False, "quick"), task[:5] + ("deep",)]
+            costs += [pdf_cost(quick_pages, ["questions"], False), cost]
+            tiers += [0, 1]
+            continue
+        quick = is_deck or "budget" in roles or "vol2" in roles
+        expanded.append(task)
+        costs.append(cost)
+        tiers.append(0 if quick and cost < quick_cost else 1)
+    return schedule_tiers(expanded, costs, tiers)
+# ==============================================================================
+def mark_not_attempted(info, file_names):
+    """
+    --deadline: mark the columns of these unfinished files that are still
+    empty in the proposal's row (see schema.role_columns)
+    """
+    for file_name in file_names:
+        if file_name.split(".")[-1].lower() in ppt_extensions:
+            roles = ["deck"]
+        else:
+            roles = file_roles(file_name)
+        for role in roles:
+            for column in role_columns.get(role, []):
+                if column not in info:
+                    info[column] = not_attempted
+# ==============================================================================
+def finalize_row(prop_number, info):
+    """
+    Post-process one proposal's merged results (a schema.Record) into its
+    output row
+    """
+    # All 3 POC (Tech POC, customer, end user)
+    # are required for all but Phase I proposals
+    # If any are missing for other Phases, annotate as "NOT FOUND"
+    for poc_header in poc_headers:
+        if poc_header not in info:
+            # Phase unknown: a --deadline stopped the run first
+            if info.get('Phase') == not_attempted:
+                info[poc_header] = not_attempted
+            elif info.get('Phase') != "I":
+                info[poc_header]="NOT FOUND"
+            else:
+                info[poc_header]="N/A"
+    # The TPOCs come out as "Primary Technical Points of Contact (TPOCs)",
+    # next to the other POC columns (see schema.aliases)
+
+    if title_index and info.get("Missing Sections") != not_attempted:
+        missing = title_index.missing_sections(prop_number, args.required_section or sections,
+                                               args.section_match)
+        info["Missing Sections"] = ", ".join(missing)
+    return info
+# ==============================================================================
+def start_pool(config):
+    """
+    Return (pool, progress update queue) of config.workers processes set up
+    by init_worker()
+    """
+    import multiprocessing
+    updates = multiprocessing.Queue()
+    pool = multiprocessing.Pool(config.workers, initializer=init_worker, initargs=(config, updates))
+    return pool, updates
+# ==============================================================================
+def iter_proposals(paths, config=None, pool=None):
+    """
+    Library API: parse every proposal file in paths (files, directories or
+    ZIP bundles) and yield (proposal number, row) as each proposal's files
+    are all parsed, e.g.
+
+        from multi_processor import iter_proposals, make_config
+        for prop_number, row in iter_proposals(["proposals"], make_config(workers=4)):
+            print(prop_number, row["Phase"])
+
+    config is a make_config() (or command line) namespace.  Completed files
+    are journaled only if config.journal is set.
+    pool is a start_pool() to reuse (e.g. by the serve subcommand); otherwise
+    one is started for this call if config.workers > 1 or there's a deadline.
+    """
+    configure(config or make_config())
+    target_files = find_files(paths, args)
+
+    prop_status = defaultdict(str)
+    all_info = defaultdict(Record)
+    signatures = {}
+
+    # Keep only the proposals owned by this shard, if sharding
+    if args.shard:
+        target_files = {(file_name, size) for file_name, size in target_files
+                        if in_shard(get_prop_number(file_name), args.shard)}
+        print(f"Shard {args.shard[0]}/{args.shard[1]}")
+
+    # Every finished file is journaled so a crashed run can be resumed
+    completed = load_journal(args.journal) if args.journal and args.resume else {}
+    journal_fd = open_journal(args.journal, args.resume) if args.journal else None
 
     print(f"Parsing {len(target_files)} files. This could take a few seconds.")
-    # Reset the counter.  It will be incremented as each file is parsed.
-    #total_files = 0
 
-    # Here is the serial (non-parallel) approach.  Slow, but it works.
+    # Files are parsed serially unless --workers > 1
     start = time.time()
-    # TODO Parallelize
-    target_files = sorted(target_files, key=lambda x:x[1], reverse=True)
 
-    for file_name, _ in sorted(target_files):
-        prop_number = file_name.split("\\")[-1].split("_")[0]#re.search(four_digits, file_name)
-        if not prop_number or prop_status[prop_number]:
+    # Each proposal's files, in file name order.  Results are merged in that
+    # order whatever order the files are parsed in, and files already in the
+    # journal keep their place, so rows come out exactly as in a serial run.
+    prop_files = defaultdict(list)
+    prop_tasks = defaultdict(list)
+    for file_name, size in sorted(target_files):
+        prop_number = get_prop_number(file_name)
+        if not prop_number:
             continue
-        #prop_number = prop_number.group(1)
-        logger.debug(f"Proposal: {prop_number}")
-        temp_info = parse_file(file_name, prop_number, args.ocr)
-        if done_gathering_info(temp_info):
-            prop_status[prop_number] = True
-        if temp_info:
-            all_info[prop_number].update(temp_info)
-
-    # All 3 POC (Tech POC, customer, end user)
-    # are required for all but Phase I proposals
-    # If any are missing for other Phases, annotate as "NOT FOUND"
-    for k,v in all_info.items():
-        for poc_header in poc_headers:
-            if poc_header not in v:
-                if v['Phase'] != "I":
-                    v[poc_header]="NOT FOUND"
-                    pass
-                else:
-                    v[poc_header]="N/A"
-        # I want all the POC info adjecent in the final dataframe/csv, so
-        # I make the change below so they're adjecent when sorted
-        new_name = "Primary Technical Points of Contact (TPOCs)"
-        v[new_name] = v.pop("Technical Points of Contact (TPOCs)")
-
+        if file_name in completed and completed[file_name][0] == size:
+            prop_files[prop_number].append((file_name, completed[file_name][2]))
+        else:
+            prop_files[prop_number].append((file_name, None))
+            # ZIP members are handed to workers in shared memory
+            shared = args.workers > 1 and is_archive_member(file_name)
+            prop_tasks[prop_number].append((file_name, size, prop_number, args.ocr, shared, "full"))
+    tasks = [task for group in prop_tasks.values() for task in group]
+    # A proposal's row is yielded as soon as its last file is parsed
+    files_left = {prop_number: len(group) for prop_number, group in prop_tasks.items()}
+
+    # A --deadline needs a pool even with one worker, so a slow file can be
+    # abandoned rather than finished (see until_deadline())
+    own_pool = not pool and (args.workers > 1 or bool(args.deadline))
+    shared_tasks = None
+    run_progress = None
+    try:
+        if own_pool:
+            pool = start_pool(args)
+        pool, updates = pool or (None, None)
+        # Split files: file name -> [task, ranges still out, {page_start: pages}]
+        split_files = {}
+        stitched = queue.Queue()
+        if args.deadline:
+            # Quick, high-value fields of every proposal first (see scheduler.py)
+            batches = [("parse", batch) for batch in deadline_batches(tasks)]
+            logger.info(f"{len(tasks)} files in {len(batches)} batches, quick fields first")
+        if pool and args.deadline:
+            shared_tasks = SharedTasks(batches, limit=max(2*args.workers, 2*max((len(x) for _, x in batches), default=0)))
+            results = pool.imap_unordered(run_batch, shared_tasks)
+        elif pool:
+            # Work is grouped by proposal so each proposal finishes early; most
+            # expensive first, tiny files batched (see scheduler.py)
+            groups = []
+            range_batches = []
+            for group in prop_tasks.values():
+                costs = []
+                unsplit = []
+                for task in group:
+                    cost, ranges = estimate_cost(task)
+                    if ranges and len(ranges) > 1:
+                        # Huge files: pages extracted by several workers first,
+                        # parsed once stitched back together
+                        split_files[task[0]] = [task, len(ranges), {}]
+                        range_batches += [("pages", (task[0], page_start, page_stop))
+                                          for page_start, page_stop in ranges]
+                        continue
+                    unsplit.append(task)
+                    costs.append(cost)
+                groups.append((unsplit, costs))
+            batches = [("parse", batch) for batch in schedule_groups(groups)]
+            logger.info(f"{len(tasks)} files in {len(batches)} batches, "
+                        f"{len(split_files)} files split into {len(range_batches)} page ranges")
+            shared_tasks = SharedTasks(task_stream(range_batches + batches, stitched, len(split_files)),
+                                       limit=max(2*args.workers, 2*max((len(x) for _, x in batches), default=0)))
+            results = pool.imap_unordered(run_batch, shared_tasks)
+        else:
+            results = map(run_batch, (("parse", [task]) for task in tasks))
+
+        # Progress line every --progress-interval seconds, and --metrics snapshot
+        run_progress = Progress(len(tasks), sum(task[1] for task in tasks),
+                                args.progress_interval, args.metrics, updates)
+        progress.current = run_progress
+        run_progress.start_reporting()
+
+        resumed = 0
+        finished = {}
+        # --deadline: quick fields of files whose deep task hasn't finished
+        quick_info = {}
+        deadline = start + args.deadline * 60 if args.deadline else None
+        busy_seconds = defaultdict(float)
+        # Proposals whose files were all resumed from the journal are ready at once
+        ready = [prop_number for prop_number in prop_files if prop_number not in files_left]
+        # The empty results first and last let the proposals resumed from the
+        # journal, and those left when a --deadline passes, be written too
+        for worker_pid, seconds, kind, batch_results in chain([(None, 0, "parse", [])],
+                                                              until_deadline(results, deadline),
+                                                              [(None, 0, "parse", [])]):
+            if kind == "pages":
+                # Once all its ranges are in, a split file is parsed whole
+                file_name, page_start, pages = batch_results
+                split_file = split_files[file_name]
+                split_file[1] -= 1
+                split_file[2][page_start] = pages
+                if not split_file[1]:
+                    task, _, ranges = split_files.pop(file_name)
+                    stitched.put(("preloaded", (task, [page for page_start in sorted(ranges)
+                                                       for page in ranges[page_start]])))
+                batch_results = []
+            for file_name, size, prop_number, depth, temp_info in batch_results:
+                if depth == "quick":
+                    quick_info[file_name] = temp_info
+                    continue
+                quick_info.pop(file_name, None)
+                if pool:
+                    shared_tasks.done(file_name)
+                if journal_fd is not None:
+                    record_file(journal_fd, file_name, size, prop_number, temp_info)
+                run_progress.file_done(size)
+                finished[file_name] = temp_info
+                files_left[prop_number] -= 1
+                if not files_left[prop_number]:
+                    ready.append(prop_number)
+            if worker_pid:
+                busy_seconds[worker_pid] += seconds
+
+            # Once the deadline passes, every proposal left is written with
+            # what it has
+            if deadline and time.time() >= deadline and prop_files:
+                ready = list(prop_files)
+                print(f"Deadline reached: {sum(files_left.values())} files not finished; "
+                      f"their fields are marked {not_attempted}")
+
+            for prop_number in ready:
+                logger.debug(f"Proposal: {prop_number}")
+                cut_short = []
+                for file_name, temp_info in prop_files.pop(prop_number):
+                    if temp_info is None and file_name not in finished:
+                        cut_short.append(file_name)
+                        temp_info = quick_info.pop(file_name, {})
+                    elif temp_info is None:
+                        temp_info = finished.pop(file_name)
+                    else:
+                        resumed += 1
+                    # Vol2 MinHash signature, kept for the --dup-report only
+                    signature = temp_info.pop("_minhash", None) if temp_info else None
+                    if signature:
+                        signatures[prop_number] = signature
+                    if prop_status[prop_number]:
+                        continue
+                    if done_gathering_info(temp_info):
+                        prop_status[prop_number] = True
+                    if temp_info:
+                        all_info[prop_number].update(temp_info)
+                if cut_short:
+                    mark_not_attempted(all_info[prop_number], cut_short)
+                if prop_number in all_info:
+                    yield prop_number, finalize_row(prop_number, all_info.pop(prop_number))
+            ready = []
+    finally:
+        if run_progress:
+            run_progress.stop_reporting()
+        if shared_tasks:
+            stitched.put(None)
+            shared_tasks.close()
+        if own_pool and pool:
+            pool.terminate()
+        if journal_fd is not None:
+            os.close(journal_fd)
+
+    run_progress.show(finished=True)
+    if pool and tasks:
+        print(f"Load balance: {imbalance(busy_seconds, args.workers)}")
+    if args.resume:
+        print(f"Resumed {resumed} files from {args.journal}")
+
+    if args.dup_report:
+        clusters = find_clusters(signatures, args.dup_threshold)
+        write_report(clusters, args.dup_report)
+        print(f"{sum(len(x) for x in clusters)} of {len(signatures)} Vol2s are near-duplicates "
+              f"({len(clusters)} clusters), see {args.dup_report}")
 
     end = time.time()
     print(f"{len(target_files)} files in {end-start} seconds")
+# ==============================================================================
+def main():
+    """
+    Parse the files given by the -f and -d flags (see iter_proposals())
+    and write results to args.out
+    """
+    import pandas as pd
+    pd.set_option('display.width', 80)
+    pd.set_option('display.max_colwidth', 80)
 
-    results = pd.DataFrame.from_dict(all_info, orient="index")
+    paths = (args.directory or []) + (args.file or [])
+    out_path = shard_out_path(args.out, args.shard)
+    args.journal = args.journal or default_journal_path(out_path)
+    args.metrics = args.metrics or out_path + ".metrics.json"
+
+    # Hand the job to a warm parse service if one is running (see serve_main())
+    rows = None
+    if args.service != "none" and not args.resume and not args.deadline:
+        rows = request_parse(args.service, paths, args)
+    if rows is None:
+        rows = iter_proposals(paths, args)
+
+    # Rows arrive as each proposal completes; --stream makes them available
+    # to reviewers straight away
+    all_info = {}
+    stream = open(args.stream, "w", encoding="utf-8") if args.stream else None
+    try:
+        for prop_number, row in rows:
+            logger.info(f"Proposal {prop_number} complete")
+            # The service sends rows back as plain dicts
+            if not isinstance(row, Record):
+                row = Record.from_dict(row)
+            all_info[prop_number] = row
+            if stream:
+                stream.write(json.dumps({"Proposal ID": prop_number, **row}) + "\n")
+                stream.flush()
+    finally:
+        if stream:
+            stream.close()
+    all_info = dict(sorted(all_info.items(), key=lambda x: natural_keys(x[0])))
+
+    # Columns come out in the declared schema's order
+    results = to_frame(all_info)
     if not any(results):
         logger.critical("Something went wrong, results is empty")
 
-    sorted_cols = results.columns.tolist()
-    sorted_cols.sort(key=natural_keys)
-    logger.debug("Sorted columns:")
-    logger.debug(sorted_cols)
-    results = results[['Type', 'Phase', 'Page Count']+ [c for c in sorted_cols if c not in ['Type', 'Phase', 'Page Count']]]
-    # Sort columns in dataframe by name (alphanumerically)
-    # results = results[sorted_cols]
+    logger.debug("Columns:")
+    logger.debug(results.columns.tolist())
     results.index.name = "Proposal ID"
+    # Flag columns and a summary of the checks in validation.py
+    if args.validate:
+        results, summary = validate(results, args)
+        print_summary(summary, len(results))
     # https://btechgeeks.com/python-pandas-how-to-display-full-dataframe-i-e-print-all-rows-columns-without-truncation/
     # Print and save resulting table
     #pd.set_option('display.max_rows', None)
@@ -919,12 +1763,198 @@ def main():
     #pd.set_option('display.width', None)
     #pd.set_option('display.max_colwidth', -1)
     pprint.pprint(results)
-    results.to_csv(args.out)
+    write_results(results, out_path, args.out_format)
     return len(results)
 # ==============================================================================
-if __name__ == "__main__":
+def merge_main(argv):
+    """
+    Entry point for the merge subcommand:
+    python multi_processor.py merge proposals.shard*of4.csv --out proposals.csv
+    """
+    merge_parser = argparse.ArgumentParser(
+        prog="multi_processor.py merge",
+        description="Combine the outputs of --shard runs into one table",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    merge_parser.add_argument('shards',
+                              nargs='+',
+                              type=is_filename,
+                              help="Shard outputs to combine (csv/parquet/feather)")
+    merge_parser.add_argument('--out',
+                              type=str,
+                              default="proposals.csv",
+                              help="Save merged results to this file")
+    merge_parser.add_argument('--out-format',
+                              type=lower_str,
+                              choices=output_formats,
+                              default=None,
+                              help="Output format. Inferred from --out if not given")
+    merge_args = merge_parser.parse_args(argv)
+    number_props = merge_shards(merge_args.shards, merge_args.out, merge_args.out_format)
+    print(f"Merged {len(merge_args.shards)} shards: {number_props} proposals written to {merge_args.out}")
+# ==============================================================================
+def validate_main(argv):
+    """
+    Entry point for the validate subcommand: re-run the checks in
+    validation.py over an existing output, without reparsing.
+    python multi_processor.py validate proposals.csv --max-value 1000000
+    """
+    validate_parser = argparse.ArgumentParser(
+        prog="multi_processor.py validate",
+        description="Add the validation flag columns to an existing output",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    validate_parser.add_argument('results',
+                                 type=is_filename,
+                                 help="Output of a previous run (csv/parquet/feather)")
+    validate_parser.add_argument('--out',
+                                 type=str,
+                                 default=None,
+                                 help="Save the flagged results to this file (default: overwrite the input)")
+    validate_parser.add_argument('--out-format',
+                                 type=lower_str,
+                                 choices=output_formats,
+                                 default=None,
+                                 help="Output format. Inferred from --out if not given")
+    validate_parser.add_argument('--max-value',
+                                 '-m',
+                                 type=int,
+                                 default=1250000,
+                                 help="Max dollar value for proposals")
+    validate_args = validate_parser.parse_args(argv)
+    results, summary = validate(read_results(validate_args.results), validate_args)
+    print_summary(summary, len(results))
+    out_path = validate_args.out or validate_args.results
+    write_results(results, out_path, validate_args.out_format)
+    print(f"Flagged results written to {out_path}")
+# ==============================================================================
+def sections_main(argv):
+    """
+    Entry point for the sections subcommand: re-check required sections
+    against an existing --title-index without reading any proposal files.
+    python multi_processor.py sections title_index.db -r Method -r Approach
+    """
+    sections_parser = argparse.ArgumentParser(
+        prog="multi_processor.py sections",
+        description="Check required sections against a title index built by --check-sections",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    sections_parser.add_argument('index',
+                                 type=is_filename,
+                                 help="Title index (sqlite) built by a previous run")
+    sections_parser.add_argument('--required-section',
+                                 '-r',
+                                 action='append',
+                                 help=f"Section every proposal must have (default: {sections})")
+    sections_parser.add_argument('--section-match',
+                                 type=float,
+                                 default=0.8,
+                                 help="Minimum similarity (0-1) for a fuzzy title match")
+    sections_args = sections_parser.parse_args(argv)
+
+    title_index = TitleIndex(sections_args.index)
+    required = sections_args.required_section or sections
+    for prop_number in title_index.proposals():
+        missing = title_index.missing_sections(prop_number, required, sections_args.section_match)
+        print(f"{prop_number}: {', '.join(missing) if missing else 'OK'}")
+# ==============================================================================
+def search_main(argv):
+    """
+    Entry point for the search subcommand: ranked full-text search of an
+    index built with --search-index, e.g.
+    python multi_processor.py search search_index.db "wright patterson"
+    """
+    search_parser = argparse.ArgumentParser(
+        prog="multi_processor.py search",
+        description="Search the page text of every proposal indexed with --search-index",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    search_parser.add_argument('index',
+                               type=is_filename,
+                               help="Search index (sqlite) built by a previous run")
+    search_parser.add_argument('query',
+                               nargs='+',
+                               help="Words that must all appear on the page")
+    search_parser.add_argument('--limit',
+                               '-n',
+                               type=int,
+                               default=20,
+                               help="Maximum hits to show")
+    search_parser.add_argument('--proposal',
+                               '-p',
+                               type=str,
+                               default=None,
+                               help="Only search this proposal, e.g. F2D-1234")
+    search_parser.add_argument('--raw',
+                               type=str2bool,
+                               nargs='?',
+                               const=True,
+                               default=False,
+                               help="Pass the query as FTS5 syntax (OR, NEAR, \"phrases\", prefix*)")
+    search_args = search_parser.parse_args(argv)
+    import sqlite3
+    import time
 
-    # Create the parser and add arguments
+    search_index = SearchIndex(search_args.index)
+    start_time = time.perf_counter()
+    try:
+        hits = search_index.search(" ".join(search_args.query), search_args.limit,
+                                   search_args.proposal, search_args.raw)
+    except sqlite3.OperationalError as e:
+        print(f"Bad query: {e}")
+        sys.exit(1)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+    for hit in hits:
+        print(f"{hit['prop_number']}  {base_name(hit['file'])}  p.{hit['page']}: {hit['snippet']}")
+    print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+# ==============================================================================
+class ParseService:
+    """
+    The serve subcommand's parser: configured once, with a persistent pool
+    """
+    def __init__(self, config, pool):
+        self.config = config
+        self.pool = pool
+        self.jobs = 0
+
+    def status(self):
+        return {"pid": os.getpid(),
+                "workers": self.config.workers,
+                "jobs": self.jobs,
+                "config": portable_config(self.config)}
+
+    def parse(self, paths, options):
+        import copy
+        config = copy.copy(self.config)
+        # Options taken from each job; the rest are the service's own
+        for option in job_options:
+            setattr(config, option, options.get(option))
+        self.jobs += 1
+        return [(prop_number, dict(row)) for prop_number, row in iter_proposals(paths, config, self.pool)]
+# ==============================================================================
+def serve_main(argv):
+    """
+    Entry point for the serve subcommand: keep fitz loaded and a pool of
+    workers running, parsing jobs sent by the command line (see service.py)
+    python multi_processor.py serve -w 4 --text-store text_store
+    """
+    serve_parser = build_parser()
+    serve_parser.prog = "multi_processor.py serve"
+    serve_parser.description = f"Parse jobs sent by the command line, at --service (default {default_address})"
+    serve_args = serve_parser.parse_args(argv)
+    serve_args.journal = None
+    serve_args.metrics = None
+
+    configure(serve_args)
+    pool = start_pool(serve_args) if serve_args.workers > 1 else None
+    try:
+        serve(serve_args.service, ParseService(serve_args, pool))
+    finally:
+        if pool:
+            pool[0].terminate()
+# ==============================================================================
+def build_parser():
+    """
+    Command line options.  They double as the config of the library API
+    (see make_config())
+    """
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
@@ -962,7 +1992,7 @@ if __name__ == "__main__":
                         '-f',
                         action='append',
                         type=is_filename,
-                        help="Files to parse.  Must be pdf/ppt/pptx")
+                        help="Files to parse.  Must be pdf/ppt/pptx, or a zip of them")
 
     parser.add_argument('--directory',
                         '-d',
@@ -984,10 +2014,28 @@ if __name__ == "__main__":
                         help="Use OCR (Slower, but can parse scanned PDFs)"
                         )
 
+    parser.add_argument('--ocr-mode',
+                        type=lower_str,
+                        choices=["full", "roi"],
+                        default="full",
+                        help="With OCR on: 'full' reads whole pages at 500 DPI; 'roi' finds the key phrases at low DPI and reads only the regions around them at high DPI (much faster, see roi_ocr.py)"
+                        )
+    parser.add_argument('--ocr-backend',
+                        type=lower_str,
+                        choices=["page", "batch"],
+                        default="page",
+                        help="With --ocr-mode full: start tesseract once per page, or once per batch of pages (less process startup, see batch_ocr.py)"
+                        )
     parser.add_argument('--out',
                         type=str,
                         default="proposals.csv",
-                        help="Save results to this file (will be a csv.)"
+                        help="Save results to this file (csv unless --out-format or the extension says otherwise)"
+                        )
+    parser.add_argument('--out-format',
+                        type=lower_str,
+                        choices=output_formats,
+                        default=None,
+                        help="Output format. Parquet/feather store typed, categorical columns (requires pyarrow). Inferred from --out if not given"
                         )
     parser.add_argument('--max-value',
                         '-m',
@@ -995,13 +2043,142 @@ if __name__ == "__main__":
                         default=1250000,
                         help="Max dollar value for proposals.  Will print warning if value is exceeded"
                         )
+    parser.add_argument('--validate',
+                        type=str2bool,
+                        nargs='?',
+                        const=True,
+                        default=False,
+                        help="Add Flag: columns for proposals failing the checks in validation.py (budget over --max-value or not adding up, missing TPOCs, non YES/NO answers, duration out of range) and print a summary"
+                        )
+    parser.add_argument('--shard',
+                        type=parse_shard,
+                        default=None,
+                        help="Parse only shard i of N (e.g. 2/4), split by proposal number. Combine the outputs with the merge subcommand"
+                        )
+    parser.add_argument('--workers',
+                        '-w',
+                        type=int,
+                        default=1,
+                        help="Number of processes parsing files in parallel"
+                        )
+    parser.add_argument('--split-pages',
+                        type=int,
+                        default=100,
+                        help="With --workers > 1, extract the text of PDFs with at least this many pages with several workers at once; 0 to never split"
+                        )
+    parser.add_argument('--text-store',
+                        type=str,
+                        default=None,
+                        help="Directory caching the text extracted from every PDF. Later runs parse the cached text instead of re-extracting it"
+                        )
+    parser.add_argument('--form-map',
+                        type=is_filename,
+                        default=None,
+                        help="JSON file of {regex: column} mapping form field names of fillable all_forms packages to result columns"
+                        )
+    parser.add_argument('--check-sections',
+                        type=str2bool,
+                        nargs='?',
+                        const=True,
+                        default=False,
+                        help=f"Add a Missing Sections column, checking slide/page titles for the required sections (default: {sections})"
+                        )
+    parser.add_argument('--required-section',
+                        '-r',
+                        action='append',
+                        help="Section every proposal must have. Implies --check-sections"
+                        )
+    parser.add_argument('--section-match',
+                        type=float,
+                        default=0.8,
+                        help="Minimum similarity (0-1) for a fuzzy section title match"
+                        )
+    parser.add_argument('--title-index',
+                        type=str,
+                        default="title_index.db",
+                        help="Where --check-sections keeps the slide/page titles of every deck and Vol2"
+                        )
+    parser.add_argument('--search-index',
+                        type=str,
+                        default=None,
+                        help="Also index the text of every page in this sqlite file, for the search subcommand"
+                        )
+    parser.add_argument('--dup-report',
+                        type=str,
+                        default=None,
+                        help="Write clusters of proposals with near-duplicate Vol2 text to this csv"
+                        )
+    parser.add_argument('--dup-threshold',
+                        type=float,
+                        default=0.8,
+                        help="Minimum estimated (Jaccard) similarity of Vol2 text for --dup-report"
+                        )
+    parser.add_argument('--progress-interval',
+                        type=float,
+                        default=5.0,
+                        help="Seconds between progress lines (files done, pages/s, MB/s, OCR pages pending, ETA)"
+                        )
+    parser.add_argument('--metrics',
+                        type=str,
+                        default=None,
+                        help="JSON snapshot of the progress, rewritten in place every --progress-interval (default: <out>.metrics.json)"
+                        )
+    parser.add_argument('--service',
+                        type=str,
+                        default=default_address,
+                        help="Hand the job to the parse service at this URL if one is running (see the serve subcommand); 'none' to always parse locally"
+                        )
+    parser.add_argument('--deadline',
+                        type=float,
+                        default=None,
+                        help="Minutes to run for: parse every proposal's quick fields (Type, Phase, Total, page counts) first, the rest after, and when time is up write what's done, marking the fields not attempted as NOT ATTEMPTED"
+                        )
+    parser.add_argument('--stream',
+                        type=str,
+                        default=None,
+                        help="Append each proposal's row to this JSON lines file as soon as all its files are parsed"
+                        )
+    parser.add_argument('--resume',
+                        type=str2bool,
+                        nargs='?',
+                        const=True,
+                        default=False,
+                        help="Skip files already recorded in the journal by a previous (crashed) run"
+                        )
+    parser.add_argument('--journal',
+                        type=str,
+                        default=None,
+                        help="Journal of completed files used by --resume. Defaults to the output file name + .journal"
+                        )
     parser.add_argument('--log-level',
                         '-l',
                         type=int,
                         default=50,
                         help="log level (0-50) 50 is the default"
                         )
-    args = parser.parse_args()
+    return parser
+# ==============================================================================
+if __name__ == "__main__":
+    # base_name() needs re, subcommands included
+    import re
+
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        merge_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "validate":
+        validate_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "sections":
+        sections_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        search_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve_main(sys.argv[2:])
+        sys.exit(0)
+
+    args = build_parser().parse_args()
 
     if not args.file and not args.directory:
         print("Must provide at least one pdf file or directory (will recurse over all directory files.)")
@@ -1011,49 +2188,13 @@ if __name__ == "__main__":
     # Otherwise you force the user to wait for them to load,
     # then tell them the invocation is incorrect, what a waste of time.
 
-    print("Invocation correct, loading standard modules")
+    print("Invocation correct, loading modules")
     import time
     start = time.time()
-    import pprint
-    import re
-    import math
-    import logging
-
-    print("Loading pandas and collections modules")
-    import pandas as pd
-    from collections import defaultdict
-
-    # Note: the PPT module is lazily loaded in main()
-
-    print("Loading fitz (pdf module)")
-    import fitz
-    if args.ocr:
-        print("Loading OCR modules...")
-        from pdf2image import convert_from_path
-        from PIL import Image
-        import pytesseract
-
+    configure(args)
     print("Done loading modules")
-
-    # Configure the logger
-    logging.basicConfig(level=args.log_level, format='%(message)s')
-    logger = logging.getLogger(__name__)
-    logger.setLevel(args.log_level)
-
-    # Pre-compile re expressions
-    safety_heading = re.compile("safety.*related.*deliverables")
-    some_digits = re.compile('\d{5,}')
-    four_digits = re.compile(r"(\d{4})")
-
-    pd.set_option('display.width', 80)
-    pd.set_option('display.max_colwidth', 80)
-    # If you don't have tesseract executable in your PATH, include the following:
-    #pytesseract.pytesseract.tesseract_cmd = r'C:\\Program Files\\Tesseract-OCR\\tesseract'
     pprint.pprint(args)
 
-    ppt_extensions = ["ppt", "pptx"]
-    valid_extensions = ppt_extensions + ["pdf"]
-
     # args is global so no need to pass it
     number_props = main()
     end = time.time()
@@ -0,0 +1,154 @@
+"""
+Find near-duplicate technical volumes (resubmissions, copy-pasted text)
+without comparing every pair of proposals.
+
+1. Each Vol2's text is cut into overlapping word shingles ("five words in a
+   row") and summarized by a MinHash signature: for each of num_perm hash
+   functions, the smallest hash of any shingle.  Two signatures agree at a
+   position with probability equal to the Jaccard similarity of the shingle
+   sets, so signatures can be compared instead of the text.  Signatures are
+   computed in the workers, as part of parsing.
+2. LSH banding: each signature is cut into bands of rows, and proposals that
+   share any whole band land in the same bucket.  Only proposals sharing a
+   bucket are compared, so the work grows with the number of proposals rather
+   than the number of pairs.  Bands and rows are chosen so pairs above the
+   threshold are very likely to share a bucket.
+3. Candidate pairs at or above the threshold are joined into clusters.
+"""
+import csv
+import functools
+import logging
+import re
+import zlib
+
+logger = logging.getLogger(__name__)
+
+num_perm = 128
+shingle_size = 5
+# Mersenne prime for the (a*x + b) % prime hash family
+mersenne_prime = (1 << 61) - 1
+max_hash = (1 << 32) - 1
+word = re.compile(r"[a-z0-9]+")
+
+report_header = ["Cluster", "Proposal ID", "Most Similar", "Estimated Similarity"]
+
+# ==============================================================================
+@functools.lru_cache(maxsize=None)
+def permutations():
+    """
+    The (a, b) parameters of the num_perm hash functions.  Fixed seed, so
+    signatures from different runs (or a resumed run) can be compared.
+    """
+    import numpy as np
+    generator = np.random.RandomState(1)
+    a = generator.randint(1, mersenne_prime, size=num_perm, dtype=np.uint64)
+    b = generator.randint(0, mersenne_prime, size=num_perm, dtype=np.uint64)
+    return a, b
+# ==============================================================================
+def shingles(text, size=shingle_size):
+    """
+    Set of 32 bit hashes of every run of size consecutive words, ignoring
+    case and punctuation
+    """
+    words = word.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {zlib.crc32(" ".join(words[i:i+size]).encode())
+            for i in range(len(words) - size + 1)}
+# ==============================================================================
+def minhash(text):
+    """
+    Return the MinHash signature of text as a list of num_perm ints
+    (a plain list so it pickles and journals cheaply), or None if the text
+    has no words, e.g. a scanned PDF.
+    """
+    import numpy as np
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    a, b = permutations()
+    values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    # uint64 arithmetic wraps; that's fine, it's still a fixed hash function
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(values, a) + b) % np.uint64(mersenne_prime) & np.uint64(max_hash)
+    return permuted.min(axis=0).tolist()
+# ==============================================================================
+def choose_bands(threshold):
+    """
+    Return (bands, rows) with bands*rows == num_perm whose S-curve
+    (1/bands)**(1/rows) is closest to the threshold, erring low so
+    pairs just above the threshold are still found.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)
+               if num_perm % rows == 0]
+    below = [x for x in options if (1 / x[0]) ** (1 / x[1]) <= threshold]
+    return max(below or options[:1], key=lambda x: (1 / x[0]) ** (1 / x[1]))
+# ==============================================================================
+def similarity(first, second):
+    """
+    Estimated Jaccard similarity of two signatures
+    """
+    return sum(x == y for x, y in zip(first, second)) / num_perm
+# ==============================================================================
+def candidate_pairs(signatures, bands, rows):
+    """
+    Return the set of (proposal, proposal) pairs sharing at least one band
+    """
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        for prop_number, signature in signatures.items():
+            key = tuple(signature[band*rows:(band+1)*rows])
+            buckets.setdefault(key, []).append(prop_number)
+        for bucket in buckets.values():
+            bucket.sort()
+            for i, first in enumerate(bucket):
+                for second in bucket[i+1:]:
+                    pairs.add((first, second))
+    return pairs
+# ==============================================================================
+def find_root(parents, x):
+    while parents[x] != x:
+        parents[x] = parents[parents[x]]
+        x = parents[x]
+    return x
+# ==============================================================================
+def find_clusters(signatures, threshold):
+    """
+    Group proposals whose Vol2s are at least threshold similar.
+    signatures is {proposal number: signature}.
+    Returns a list of clusters, largest first, each a list of
+    (proposal number, most similar other proposal, its similarity).
+    """
+    bands, rows = choose_bands(threshold)
+    pairs = candidate_pairs(signatures, bands, rows)
+    logger.info(f"{len(pairs)} candidate pairs from {bands} bands of {rows} rows")
+
+    parents = {}
+    best = {}
+    for first, second in sorted(pairs):
+        score = similarity(signatures[first], signatures[second])
+        if score < threshold:
+            continue
+        for x, other in [(first, second), (second, first)]:
+            parents.setdefault(x, x)
+            if score > best.get(x, (None, -1))[1]:
+                best[x] = (other, score)
+        parents[find_root(parents, first)] = find_root(parents, second)
+
+    clusters = {}
+    for x in parents:
+        clusters.setdefault(find_root(parents, x), []).append(x)
+    return sorted(([(x, *best[x]) for x in sorted(members)] for members in clusters.values()),
+                  key=lambda members: (-len(members), members[0][0]))
+# ==============================================================================
+def write_report(clusters, report_path):
+    """
+    One row per proposal that has a near-duplicate, grouped by cluster
+    """
+    with open(report_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(report_header)
+        for cluster_i, members in enumerate(clusters, 1):
+            for prop_number, other, score in members:
+                writer.writerow([cluster_i, prop_number, other, f"{score:.2f}"])
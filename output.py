@@ -0,0 +1,157 @@
+"""
+Write the aggregated proposal table to disk.
+
+CSV remains the default.  Parquet and Feather (Arrow IPC) are also supported;
+for those a declared schema is applied first so the review dashboards load
+typed, compact columns instead of re-parsing strings:
+1. YES/NO certification & regulatory answers -> categorical
+2. Type and Phase -> categorical
+3. Budget fields -> float64
+4. Page Count and Duration -> (nullable) integers
+A --deadline run's NOT ATTEMPTED marks can't be kept in the numeric columns,
+so each row's are listed in a "Not Attempted" column instead.
+"""
+import os
+import re
+
+from schema import column_index, not_attempted
+
+output_formats = ["csv", "parquet", "feather"]
+
+categorical_columns = ["Type", "Phase"]
+integer_columns = ["Page Count", "Duration (Mo.)", "Slide Count"]
+yes_no_prefixes = (
+    "Firm Certification Q",
+    "Proposal Certification Q",
+    "Regulatory: "
+)
+yes_no_categories = ["YES", "NO"]
+budget_column = re.compile(r"^Total$|\((TDL|TDM|TDT|TSC|TDS|TDE|TODC)\)$")
+not_attempted_column = "Not Attempted"
+
+# ==============================================================================
+#https://www.tutorialspoint.com/
+# How-to-correctly-sort-a-string-with-a-number-inside-in-Python
+def atoi(text):
+    """
+    Helper function for sorting strings with numbers within them
+    """
+    return int(text) if text.isdigit() else text
+#==============================================================================
+#https://www.tutorialspoint.com/
+# How-to-correctly-sort-a-string-with-a-number-inside-in-Python
+def natural_keys(text):
+    """
+    Helper function #2 for sorting strings with numbers within them
+    """
+    return [atoi(c) for c in re.split(r'(\d+)', text)]
+# ==============================================================================
+def order_columns(results):
+    """
+    Return the results DataFrame (e.g. merged shards) with its columns in
+    the declared schema's order, then any others as they were (see schema.py)
+    """
+    known = sorted((c for c in results.columns if c in column_index), key=column_index.get)
+    return results[known + [c for c in results.columns if c not in column_index]]
+# ==============================================================================
+def infer_format(out_path, out_format=None):
+    """
+    Return the output format to use for out_path.
+    An explicit out_format always wins, otherwise use the file extension,
+    falling back to csv.
+    """
+    if out_format:
+        return out_format
+    extension = os.path.splitext(out_path)[1].lower().lstrip(".")
+    if extension in ["parquet", "pq"]:
+        return "parquet"
+    if extension in ["feather", "arrow"]:
+        return "feather"
+    return "csv"
+# ==============================================================================
+def is_yes_no_column(column):
+    """
+    Returns True if this column is one that holds YES/NO answers.
+    """
+    # Some certification questions are free text (e.g. number of employees,
+    # the [X] checkbox questions) so the values are checked in apply_schema()
+    return column.startswith(yes_no_prefixes)
+# ==============================================================================
+def apply_schema(results):
+    """
+    Given the results DataFrame, return a copy with the declared schema
+    applied (see module docstring).  Columns not covered by the schema are
+    left as they are.
+    """
+    import pandas as pd
+
+    results = results.copy()
+    numeric_columns = [column for column in results.columns
+                       if column in integer_columns or budget_column.search(column)]
+    marked = results[numeric_columns].eq(not_attempted)
+    if marked.any().any():
+        results[not_attempted_column] = [", ".join(row.index[row]) or None
+                                         for _, row in marked.iterrows()]
+
+    for column in results.columns:
+        values = results[column]
+        if column in categorical_columns:
+            results[column] = values.astype("category")
+
+        elif column in integer_columns:
+            results[column] = pd.to_numeric(values, errors="coerce").astype("Int64")
+
+        elif budget_column.search(column):
+            results[column] = pd.to_numeric(values, errors="coerce").astype("float64")
+
+        elif is_yes_no_column(column):
+            answers = values.dropna()
+            if answers.map(lambda x: isinstance(x, str) and x.upper() in yes_no_categories).all():
+                results[column] = values.str.upper().astype(
+                    pd.CategoricalDtype(yes_no_categories))
+    return results
+# ==============================================================================
+def write_results(results, out_path, out_format=None):
+    """
+    Save the results DataFrame to out_path as csv, parquet or feather.
+    Returns the format that was written.
+    """
+    out_format = infer_format(out_path, out_format)
+    if out_format == "csv":
+        results.to_csv(out_path)
+        return out_format
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise SystemExit(f"Writing {out_format} requires pyarrow: pip install pyarrow")
+
+    typed_results = apply_schema(results)
+    if out_format == "parquet":
+        typed_results.to_parquet(out_path, engine="pyarrow")
+    elif out_format == "feather":
+        # Feather can't store a named index, so keep the Proposal ID as a column
+        typed_results.reset_index().to_feather(out_path)
+    else:
+        raise ValueError(f"Unknown output format '{out_format}'")
+    return out_format
+# ==============================================================================
+def read_results(in_path, in_format=None):
+    """
+    Load a table previously saved by write_results(), indexed by Proposal ID.
+    CSV cells are kept as the exact strings that were written, so that
+    merging shards doesn't turn e.g. "N/A" into an empty cell.
+    """
+    import pandas as pd
+
+    in_format = infer_format(in_path, in_format)
+    if in_format == "csv":
+        results = pd.read_csv(in_path, index_col=0, dtype=str, keep_default_na=False)
+    elif in_format == "parquet":
+        results = pd.read_parquet(in_path)
+    elif in_format == "feather":
+        results = pd.read_feather(in_path).set_index("Proposal ID")
+    else:
+        raise ValueError(f"Unknown output format '{in_format}'")
+    results.index.name = "Proposal ID"
+    return results
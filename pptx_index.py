@@ -0,0 +1,96 @@
+"""
+Index PowerPoint (.pptx) decks without python-pptx.
+
+A .pptx is a zip of XML parts.  To list slide titles and text lengths only
+three kinds of part are needed: ppt/presentation.xml (slide order), its
+relationships (which slide part is which) and the slide parts themselves.
+Reading just those with ElementTree skips building python-pptx's full object
+model (masters, layouts, themes, images...), which dominates the time spent
+on large decks.  See bench_pptx.py for a comparison.
+"""
+import logging
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+namespaces = {
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+relationship_id = "{%s}id" % namespaces["r"]
+title_placeholders = ["title", "ctrTitle"]
+
+# ==============================================================================
+def slide_parts(deck):
+    """
+    Return the zip part names of the slides, in presentation order
+    """
+    rels = ElementTree.fromstring(deck.read("ppt/_rels/presentation.xml.rels"))
+    targets = {}
+    for rel in rels.findall("rel:Relationship", namespaces):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join("ppt", target))
+        targets[rel.get("Id")] = target
+
+    presentation = ElementTree.fromstring(deck.read("ppt/presentation.xml"))
+    return [targets[slide_id.get(relationship_id)]
+            for slide_id in presentation.findall("p:sldIdLst/p:sldId", namespaces)]
+# ==============================================================================
+def shape_text(shape):
+    """
+    Text of one shape, a line per paragraph (as python-pptx's shape.text)
+    """
+    paragraphs = shape.findall("p:txBody/a:p", namespaces)
+    return "\n".join("".join(t.text or "" for t in paragraph.iter("{%s}t" % namespaces["a"]))
+                     for paragraph in paragraphs)
+# ==============================================================================
+def index_slide(xml):
+    """
+    Return (title, text length, text) of one slide's XML.
+    The title is the title placeholder's text, else the first shape's text.
+    """
+    slide = ElementTree.fromstring(xml)
+    title = None
+    first_text = None
+    for shape in slide.iterfind("p:cSld/p:spTree/p:sp", namespaces):
+        placeholder = shape.find("p:nvSpPr/p:nvPr/p:ph", namespaces)
+        if placeholder is not None and placeholder.get("type") in title_placeholders:
+            title = shape_text(shape)
+            break
+        if first_text is None:
+            first_text = shape_text(shape)
+    if title is None:
+        title = first_text or ""
+
+    runs = [t.text or "" for t in slide.iter("{%s}t" % namespaces["a"])]
+    return title, sum(len(x) for x in runs), " ".join(runs)
+# ==============================================================================
+def index_pptx(source):
+    """
+    Index a .pptx given as a path or binary file object.
+    Returns [{"slide": 1, "title": "...", "text_length": 1234, "text": "..."}, ...]
+    """
+    slides = []
+    with zipfile.ZipFile(source) as deck:
+        for slide_number, part in enumerate(slide_parts(deck), 1):
+            title, text_length, text = index_slide(deck.read(part))
+            slides.append({"slide": slide_number, "title": title,
+                           "text_length": text_length, "text": text})
+    return slides
+# ==============================================================================
+def slide_columns(slides):
+    """
+    Flatten the index of one deck into result columns
+    """
+    return {
+        "Slide Count": len(slides),
+        "Slide Titles": "\n".join(f"#{x['slide']}: {' '.join(x['title'].split())}" for x in slides),
+        "Slide Text Lengths": ", ".join(str(x["text_length"]) for x in slides),
+    }
@@ -0,0 +1,172 @@
+"""
+Live progress of a run: files done, pages/s, MB/s, OCR pages pending, what
+each worker is doing, and an ETA.
+
+Workers (and the parent, in serial runs) describe what they're doing with
+report(); pool workers send those updates to the parent over a queue.  The
+parent prints a progress line every interval seconds, from a reporter thread
+so the line keeps coming while a long file is parsed, and, with --metrics,
+rewrites a JSON snapshot of the same numbers in place (temp file + rename, so
+readers never see half a file), e.g. to watch a run from another terminal:
+watch -n 5 cat proposals.metrics.json
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from text_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Set in pool workers by init_worker(); None in the parent
+status_queue = None
+# The parent's Progress, fed directly in serial runs
+current = None
+
+# ==============================================================================
+def report(**update):
+    """
+    Update this process's state, e.g.
+    report(state="parsing", file=file_name)
+    report(pages=12)           # pages of text extracted (fitz or OCR)
+    report(ocr_pending=30)     # OCR pages this process still has to do
+    """
+    update["pid"] = os.getpid()
+    if status_queue is not None:
+        status_queue.put(update)
+    elif current is not None:
+        current.update_worker(update)
+# ==============================================================================
+def format_seconds(seconds):
+    """
+    3725 -> "1:02:05"
+    """
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+# ==============================================================================
+class Progress:
+    """
+    See module docstring.  total_files and total_bytes cover the files this
+    run has to parse (not those resumed from the journal).
+    """
+    def __init__(self, total_files, total_bytes, interval=5.0, metrics_path=None, updates=None):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.metrics_path = metrics_path
+        self.updates = updates
+        self.start = time.time()
+        self.files_done = 0
+        self.bytes_done = 0
+        self.pages = 0
+        self.workers = {}
+        # The reporter thread and the parent share the counters
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.reporter = None
+
+    def start_reporting(self):
+        """
+        Show progress every interval seconds until stop_reporting().  With no
+        interval, it's shown after every file instead.
+        """
+        if self.interval > 0:
+            self.reporter = threading.Thread(target=self.report_every_interval, daemon=True)
+            self.reporter.start()
+
+    def report_every_interval(self):
+        while not self.stopped.wait(self.interval):
+            self.show()
+
+    def stop_reporting(self):
+        self.stopped.set()
+        if self.reporter is not None:
+            self.reporter.join()
+            self.reporter = None
+
+    def update_worker(self, update):
+        with self.lock:
+            worker = self.workers.setdefault(update["pid"], {"state": "idle", "file": None,
+                                                             "since": time.time(), "ocr_pending": 0})
+            self.pages += update.get("pages", 0)
+            if "ocr_pending" in update:
+                worker["ocr_pending"] = update["ocr_pending"]
+            if "state" in update:
+                worker["state"] = update["state"]
+                worker["file"] = update.get("file")
+                worker["since"] = time.time()
+
+    def drain(self):
+        """
+        Apply every update the workers have sent so far
+        """
+        if self.updates is None:
+            return
+        while True:
+            try:
+                self.update_worker(self.updates.get_nowait())
+            except queue.Empty:
+                return
+
+    def file_done(self, size):
+        with self.lock:
+            self.files_done += 1
+            self.bytes_done += size
+        if self.reporter is None:
+            self.show()
+
+    def snapshot(self, finished=False):
+        now = time.time()
+        elapsed = max(now - self.start, 1e-9)
+        bytes_per_s = self.bytes_done / elapsed
+        eta = None
+        if finished:
+            eta = 0
+        elif bytes_per_s > 0:
+            eta = (self.total_bytes - self.bytes_done) / bytes_per_s
+        return {
+            "time": now,
+            "elapsed_s": round(elapsed, 1),
+            "finished": finished,
+            "files_done": self.files_done,
+            "files_total": self.total_files,
+            "mb_done": round(self.bytes_done / 1e6, 2),
+            "mb_total": round(self.total_bytes / 1e6, 2),
+            "pages": self.pages,
+            "pages_per_s": round(self.pages / elapsed, 2),
+            "mb_per_s": round(bytes_per_s / 1e6, 3),
+            "ocr_pages_pending": sum(x["ocr_pending"] for x in self.workers.values()),
+            "eta_s": None if eta is None else round(eta, 1),
+            "workers": {str(pid): {"state": x["state"],
+                                   "file": x["file"],
+                                   "for_s": round(now - x["since"], 1)}
+                        for pid, x in sorted(self.workers.items())},
+        }
+
+    def show(self, finished=False):
+        """
+        Print a progress line (and one per busy worker) and write the
+        --metrics snapshot
+        """
+        with self.lock:
+            self.drain()
+            snapshot = self.snapshot(finished)
+        percent = 100 * self.files_done / self.total_files if self.total_files else 100
+        print(f"{snapshot['files_done']}/{snapshot['files_total']} files ({percent:.0f}%), "
+              f"{snapshot['pages_per_s']} pages/s, {snapshot['mb_per_s']} MB/s, "
+              f"{snapshot['ocr_pages_pending']} OCR pages pending, "
+              f"ETA {format_seconds(snapshot['eta_s'])}")
+        if not finished:
+            for pid, worker in snapshot["workers"].items():
+                if worker["state"] != "idle":
+                    print(f"    worker {pid}: {worker['state']} {os.path.basename(worker['file'] or '')} "
+                          f"({worker['for_s']} s)")
+        if self.metrics_path:
+            atomic_write(os.path.abspath(self.metrics_path),
+                         json.dumps(snapshot, indent=1).encode("utf-8"))
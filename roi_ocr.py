@@ -0,0 +1,114 @@
+"""
+Region-of-interest OCR for scanned PDFs (--ocr-mode roi).
+
+Full-page OCR at 500 DPI spends nearly all its time on text nobody reads;
+only the areas around the key phrases ("DAF Customer", "TPOC:"...) matter.
+So each page is OCR'd in two passes:
+1. locate: render the whole page at locate_dpi and OCR it with word boxes,
+   which is fast and good enough to find the lines holding a key phrase;
+2. read: re-render only a band around each of those lines (the line itself
+   and region_below points under it, the full page width) at read_dpi, and
+   OCR that.  If the band's mean word confidence is under min_confidence it
+   is rendered and read again at escalate_dpi, keeping the better reading.
+Pages are rendered straight from the PDF with fitz (clip=...), so no
+temporary image files are written.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+locate_dpi = 100
+read_dpi = 300
+escalate_dpi = 500
+# Mean tesseract word confidence (0-100) below which a band is re-read
+min_confidence = 70
+# Points above a key phrase's line, and below it, read with the line
+region_above = 6
+region_below = 90
+
+# ==============================================================================
+def render(page, dpi, clip=None):
+    """
+    The page (or the clip rectangle of it, in points) as a PIL image
+    """
+    from PIL import Image
+
+    pixmap = page.get_pixmap(dpi=dpi, clip=clip)
+    return Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
+# ==============================================================================
+def ocr_lines(image):
+    """
+    OCR an image, returning [(text, (left, top, right, bottom) in pixels,
+    [word confidences])] per line of text
+    """
+    import pytesseract
+
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        box = (data["left"][i], data["top"][i],
+               data["left"][i] + data["width"][i], data["top"][i] + data["height"][i])
+        if key not in lines:
+            lines[key] = [[], box, []]
+        line = lines[key]
+        line[0].append(word)
+        line[1] = (min(line[1][0], box[0]), min(line[1][1], box[1]),
+                   max(line[1][2], box[2]), max(line[1][3], box[3]))
+        if float(data["conf"][i]) >= 0:
+            line[2].append(float(data["conf"][i]))
+    return [(" ".join(words), box, confidences) for words, box, confidences in lines.values()]
+# ==============================================================================
+def locate(page, key_phrases):
+    """
+    Return the bands of the page (top, bottom in points, merged where they
+    overlap) around every line the low-DPI pass finds a key phrase on
+    """
+    scale = 72 / locate_dpi
+    phrases = [x.lower() for x in key_phrases]
+    bands = []
+    for text, box, _ in ocr_lines(render(page, locate_dpi)):
+        if any(phrase in text.lower() for phrase in phrases):
+            bands.append((max(box[1] * scale - region_above, 0),
+                          min(box[3] * scale + region_below, page.rect.height)))
+    merged = []
+    for top, bottom in sorted(bands):
+        if merged and top <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], bottom))
+        else:
+            merged.append((top, bottom))
+    return merged
+# ==============================================================================
+def read_band(page, top, bottom):
+    """
+    OCR one band of the page at read_dpi, escalating to escalate_dpi if the
+    reading's confidence is low.  Returns (lines of text, mean confidence)
+    """
+    import fitz
+
+    clip = fitz.Rect(page.rect.x0, top, page.rect.x1, bottom)
+    best = None
+    for dpi in [read_dpi, escalate_dpi]:
+        lines = ocr_lines(render(page, dpi, clip))
+        confidences = [x for _, _, line_confidences in lines for x in line_confidences]
+        confidence = sum(confidences) / len(confidences) if confidences else 0
+        if best is None or confidence > best[1]:
+            best = ([text for text, _, _ in lines], confidence)
+        if confidence >= min_confidence:
+            break
+        logger.info(f"Page {page.number + 1}: confidence {confidence:.0f} at {dpi} DPI, re-reading")
+    return best
+# ==============================================================================
+def ocr_page_regions(page, key_phrases):
+    """
+    OCR only the regions of the page around the key phrases.
+    Returns the lines read, top to bottom ([] if no key phrase was found).
+    """
+    lines = []
+    for top, bottom in locate(page, key_phrases):
+        band_lines, confidence = read_band(page, top, bottom)
+        logger.debug(f"Page {page.number + 1} {top:.0f}-{bottom:.0f} pt: confidence {confidence:.0f}")
+        lines += band_lines
+    return lines
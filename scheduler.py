@@ -0,0 +1,170 @@
+"""
+Order parallel work by estimated cost rather than file size.
+
+A file's cost is estimated from its page count, whether it has a text layer
+(a scanned PDF that has to be OCR'd costs orders of magnitude more than a
+text PDF of the same size) and its role, i.e. whether its text is extracted
+at all: the all_forms package, budget and MOU are parsed, a Vol2 is only
+counted unless titles, search or duplicate detection need its text, and
+other PDFs are skipped.  The text is extracted once however many parsers
+and indexes read it.  Opening every file to count its pages would read them
+all serially in the parent (and decompress every ZIP member twice, once
+more for the workers), so only files that might be split, or that OCR might
+be needed for, are opened; the others' page counts are guessed from their
+size (for ZIP members, the uncompressed size in the archive's directory).
+
+Work is grouped by proposal, so each proposal's files are parsed together
+and its row can be finished early, instead of every proposal waiting for the
+end of the run.  Proposals, and the files within them, are dispatched longest
+first, so the expensive ones don't start last and leave every other worker
+idle at the end of the run (the greedy "longest processing time" schedule).
+Files much cheaper than the cost of dispatching a task are batched together.
+
+With a --deadline the aim is a complete, if partial, table in time rather
+than the shortest total run, so the schedule changes: the cheap, high-value
+fields of every proposal (Type and Phase from the first pages of the
+all_forms package, the budget Total, page and slide counts) are parsed
+first, and the deep ones (certifications, safety text, POCs, title/search
+indexes, OCR) after them.  Within each tier the cheapest tasks go first, so
+as many fields as possible are in when the deadline hits.
+
+A file with at least --split-pages pages (a 1000 page Vol2, say) would still
+keep one worker busy long after the others are done, so its text is
+extracted in page ranges by several workers at once; each opens its own
+fitz document.  The parent stitches the ranges back together in page order
+and hands the whole text to one worker to parse, so the parsers see exactly
+the lines (and line offsets) a single extraction would give.
+"""
+import math
+import statistics
+
+# Rough seconds per unit of work, measured on typical proposals
+seconds_per_file = 0.003
+seconds_per_page = {"text": 0.004, "ocr": 4.0}
+seconds_per_deck_mb = 0.05
+# Page counts guessed from file sizes, for files not worth opening to count:
+# a typical page, and the smallest a page could plausibly be (so a file
+# under split_pages * min_page_bytes can't have split_pages pages)
+typical_page_bytes = 50000
+min_page_bytes = 1000
+
+# Parsers (and indexes) reading a file's text for each of its roles
+role_passes = {
+    "questions": 1,
+    "budget": 1,
+    "signatures": 1,
+    "vol2": 0,
+    "titles": 1,
+    "search": 1,
+    "duplicates": 1,
+}
+# Roles whose parser falls back to OCR when the text layer is missing
+ocr_roles = ["questions", "budget"]
+
+# Files estimated under tiny_cost are batched, up to batch_cost (or
+# max_batch files) per task
+tiny_cost = 0.02
+batch_cost = 0.1
+max_batch = 16
+# With a --deadline, files estimated over quick_cost (e.g. ones needing OCR)
+# are left for the deep tier whatever their role
+quick_cost = 1.0
+
+# ==============================================================================
+def text_passes(roles):
+    return sum(role_passes.get(role, 0) for role in roles)
+# ==============================================================================
+def guess_pages(size):
+    return max(size // typical_page_bytes, 1)
+# ==============================================================================
+def pdf_cost(pages, roles, needs_ocr):
+    """
+    Estimated seconds to parse a PDF with this many pages and these roles
+    """
+    cost = seconds_per_file + pages * seconds_per_page["text"] * min(text_passes(roles), 1)
+    if needs_ocr and any(role in ocr_roles for role in roles):
+        cost += pages * seconds_per_page["ocr"]
+    return cost
+# ==============================================================================
+def deck_cost(size):
+    """
+    Estimated seconds to index a pptx deck of size bytes
+    """
+    return seconds_per_file + size / 1e6 * seconds_per_deck_mb
+# ==============================================================================
+def schedule(tasks, costs):
+    """
+    Return the tasks as a list of batches (lists of tasks), most expensive
+    first.  Tiny tasks are grouped so each batch is worth dispatching.
+    """
+    ordered = sorted(zip(costs, range(len(tasks))), key=lambda x: (-x[0], x[1]))
+    batches = []
+    tiny = []
+    tiny_total = 0
+    for cost, task_i in ordered:
+        if cost >= tiny_cost:
+            batches.append([tasks[task_i]])
+            continue
+        tiny.append(tasks[task_i])
+        tiny_total += cost
+        if tiny_total >= batch_cost or len(tiny) >= max_batch:
+            batches.append(tiny)
+            tiny = []
+            tiny_total = 0
+    if tiny:
+        batches.append(tiny)
+    return batches
+# ==============================================================================
+def imbalance(busy_seconds, workers):
+    """
+    Summarize how evenly the work was spread, given {worker: busy seconds}.
+    Workers that never got a task count as 0 s busy.
+    """
+    busy = sorted(busy_seconds.values(), reverse=True)
+    busy += [0.0] * max(workers - len(busy), 0)
+    if not busy or not max(busy):
+        return "no work was done"
+    mean = statistics.mean(busy)
+    return (f"worker busy time {min(busy):.2f}-{max(busy):.2f} s (mean {mean:.2f} s), "
+            f"imbalance {100 * (max(busy) / mean - 1):.0f}% "
+            "(the slowest worker's time above the mean)")
+# ==============================================================================
+def schedule_groups(groups):
+    """
+    groups is [(tasks, costs)], one per proposal.  Return the batches of
+    every group, most expensive group first, each group's batches together.
+    """
+    ordered = sorted(range(len(groups)), key=lambda i: (-sum(groups[i][1]), i))
+    return [batch for i in ordered for batch in schedule(*groups[i])]
+# ==============================================================================
+def page_ranges(pages, split_pages, workers):
+    """
+    Split a file of this many pages into [(start, stop)] ranges for
+    parallel extraction: one per worker, but no smaller than split_pages // 2
+    """
+    size = max(split_pages // 2, math.ceil(pages / max(workers, 1)), 1)
+    return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+# ==============================================================================
+def schedule_tiers(tasks, costs, tiers):
+    """
+    --deadline: return the tasks as batches, tier 0 before tier 1 and the
+    cheapest first within a tier.  Tiny tasks are batched as in schedule().
+    """
+    ordered = sorted(range(len(tasks)), key=lambda i: (tiers[i], costs[i], i))
+    batches = []
+    tiny = []
+    tiny_total = 0
+    for position, task_i in enumerate(ordered):
+        if costs[task_i] >= tiny_cost:
+            batches.append([tasks[task_i]])
+            continue
+        tiny.append(tasks[task_i])
+        tiny_total += costs[task_i]
+        # Cheapest first, so the tiny tasks of a tier all come before its others
+        next_i = ordered[position + 1] if position + 1 < len(ordered) else None
+        last_tiny = next_i is None or tiers[next_i] != tiers[task_i] or costs[next_i] >= tiny_cost
+        if tiny_total >= batch_cost or len(tiny) >= max_batch or last_tiny:
+            batches.append(tiny)
+            tiny = []
+            tiny_total = 0
+    return batches
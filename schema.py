@@ -0,0 +1,178 @@
+"""
+The declared schema of the results table: every column the parsers produce,
+in output order (Type, Phase, Page Count, then the rest alphanumerically).
+
+Each proposal's row is a Record holding one value per declared column in a
+list, filled by column index as its files' results are merged, instead of a
+dict per proposal whose columns are only discovered, and sorted, when the
+table is built.  Columns outside the schema (e.g. from a custom --form-map)
+are still kept, after the declared ones, in the order they were first seen.
+"""
+firm_cert_count = 18
+prop_cert_count = 22
+
+regulatory_questions = [
+    "Does this activity involve air flight (including taxi)?",
+    "Does this activity involve animals?",
+    "Does this activity involve hazardous materials?",
+    "Does this activity involve infectious agents & toxins, human-derived materials, or recombinant DNA?",
+    "Does this activity use a directed energy device (including lasers) or radio frequency radiation?",
+    "Does this activity use explosives, propellants, deflagrating materials, or ammunition?",
+    "Is human subject research involved?",
+]
+
+budget_headings = [
+    "Total Direct Equipment Costs (TDE)",
+    "Total Direct Labor (TDL)",
+    "Total Direct Material Costs (TDM)",
+    "Total Direct Supplies Costs (TDS)",
+    "Total Direct Travel Costs (TDT)",
+    "Total Other Direct Costs (TODC)",
+    "Total Subcontractor Costs (TSC)",
+]
+
+columns = [
+    "Type",
+    "Phase",
+    "Page Count",
+    "Commercialization Strategy",
+    "Digital Signatures",
+    "Duration (Mo.)",
+    *[f"Firm Certification Q{i}" for i in range(1, firm_cert_count + 1)],
+    "Missing Firm Certificate Questions",
+    "Missing Proposal Certificate questions",
+    "Missing Sections",
+    "Primary Customer Organization",
+    "Primary End-User Organization",
+    "Primary Technical Points of Contact (TPOCs)",
+    *[f"Proposal Certification Q{i}" for i in range(1, prop_cert_count + 1)],
+    *[f"Regulatory: {question}" for question in regulatory_questions],
+    "Safety-Related Deliverables",
+    "Slide Count",
+    "Slide Text Lengths",
+    "Slide Titles",
+    "Total",
+    *budget_headings,
+]
+
+# Names the parsers use for a column other than its output name
+aliases = {
+    "Technical Points of Contact (TPOCs)": "Primary Technical Points of Contact (TPOCs)",
+}
+
+# The columns each kind of file fills.  When a --deadline stops a run before
+# a file is (fully) parsed, those of its columns still empty are marked
+# not_attempted, so they aren't mistaken for answers that weren't found.
+not_attempted = "NOT ATTEMPTED"
+role_columns = {
+    "questions": [
+        "Type",
+        "Phase",
+        "Duration (Mo.)",
+        "Commercialization Strategy",
+        "Safety-Related Deliverables",
+        *[f"Firm Certification Q{i}" for i in range(1, firm_cert_count + 1)],
+        *[f"Proposal Certification Q{i}" for i in range(1, prop_cert_count + 1)],
+        *[f"Regulatory: {question}" for question in regulatory_questions],
+        "Missing Firm Certificate Questions",
+        "Missing Proposal Certificate questions",
+    ],
+    "budget": ["Total", *budget_headings],
+    "signatures": [
+        "Primary Customer Organization",
+        "Primary End-User Organization",
+        "Primary Technical Points of Contact (TPOCs)",
+    ],
+    "vol2": ["Page Count"],
+    "titles": ["Missing Sections"],
+    "deck": ["Slide Count", "Slide Titles", "Slide Text Lengths"],
+}
+
+column_index = {column: i for i, column in enumerate(columns)}
+column_index.update({alias: column_index[column] for alias, column in aliases.items()})
+
+# ==============================================================================
+class Record:
+    """
+    One proposal's row.  Reads like a dict of its filled columns (row["Phase"],
+    "Total" in row, dict(row)), in schema order; None means not found.
+    """
+    __slots__ = ("values", "extra")
+
+    def __init__(self):
+        self.values = [None] * len(columns)
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, info):
+        record = cls()
+        record.update(info)
+        return record
+
+    def __setitem__(self, column, value):
+        i = column_index.get(column)
+        if i is not None:
+            self.values[i] = value
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[column] = value
+
+    def __getitem__(self, column):
+        value = self.get(column)
+        if value is None:
+            raise KeyError(column)
+        return value
+
+    def __contains__(self, column):
+        return self.get(column) is not None
+
+    def get(self, column, default=None):
+        i = column_index.get(column)
+        if i is not None:
+            value = self.values[i]
+        else:
+            value = self.extra.get(column) if self.extra else None
+        return default if value is None else value
+
+    def update(self, info):
+        """
+        Fill in one file's {column: value} results, stripping text values
+        """
+        for column, value in info.items():
+            if isinstance(value, str):
+                value = value.strip()
+            self[column] = value
+
+    def keys(self):
+        return [column for column, value in zip(columns, self.values) if value is not None] + \
+               [column for column, value in (self.extra or {}).items() if value is not None]
+
+    def items(self):
+        return [(column, self[column]) for column in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"Record({dict(self.items())})"
+# ==============================================================================
+def to_frame(rows):
+    """
+    Build the results DataFrame from {proposal number: Record}, keeping the
+    rows' order and the schema's column order.  Columns no row filled are left
+    out.
+    """
+    import pandas as pd
+
+    extra_columns = {}
+    for record in rows.values():
+        if record.extra:
+            extra_columns.update(dict.fromkeys(record.extra))
+    table = [record.values + [record.get(column) for column in extra_columns]
+             for record in rows.values()]
+    results = pd.DataFrame(table, index=list(rows), columns=columns + list(extra_columns))
+    return results.loc[:, results.notna().any()]
@@ -0,0 +1,115 @@
+"""
+Full-text search over the text of every page in the corpus.
+
+Pages are stored in a SQLite FTS5 table keyed by proposal number, file and
+page (slide number for decks), so "which proposals mention X" is an indexed
+query answered in milliseconds instead of a re-run with -k:
+python multi_processor.py search search_index.db "hypersonic wind tunnel"
+
+Like the title index, files already indexed (same path, size and mtime) aren't
+read again, and the parent and pool workers each open their own connection.
+The FTS5 rowids of each file's pages are kept in page_rows, since looking
+pages up by an UNINDEXED column scans the whole table.
+"""
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path_id TEXT PRIMARY KEY,
+    prop_number TEXT,
+    file TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5 (
+    text,
+    path_id UNINDEXED,
+    prop_number UNINDEXED,
+    file UNINDEXED,
+    page UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+CREATE INDEX IF NOT EXISTS files_file ON files (file);
+CREATE TABLE IF NOT EXISTS page_rows (
+    path_id TEXT,
+    page_row INTEGER
+);
+CREATE INDEX IF NOT EXISTS page_rows_path_id ON page_rows (path_id);
+"""
+
+# ==============================================================================
+def quote_query(query):
+    """
+    Turn plain words into an FTS5 query matching pages that contain all of
+    them, so punctuation in the words (e.g. "F2D-1000", "AFRL/RQ") isn't read
+    as query syntax.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+# ==============================================================================
+class SearchIndex:
+    """
+    See module docstring.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.pid = None
+
+    def connect(self):
+        if self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(schema)
+            self.pid = os.getpid()
+        return self.connection
+
+    def has_file(self, path_id):
+        row = self.connect().execute(
+            "SELECT 1 FROM files WHERE path_id = ?", (path_id,)).fetchone()
+        return row is not None
+
+    def record(self, path_id, prop_number, file_name, pages):
+        """
+        Store [(page number, text)] for one file, replacing any entries
+        from an older version of it.
+        """
+        connection = self.connect()
+        with connection:
+            old_ids = [row[0] for row in connection.execute(
+                "SELECT path_id FROM files WHERE file = ? OR path_id = ?", (file_name, path_id))]
+            for old_id in old_ids:
+                page_rows = connection.execute(
+                    "SELECT page_row FROM page_rows WHERE path_id = ?", (old_id,)).fetchall()
+                connection.executemany("DELETE FROM pages WHERE rowid = ?", page_rows)
+                connection.execute("DELETE FROM page_rows WHERE path_id = ?", (old_id,))
+                connection.execute("DELETE FROM files WHERE path_id = ?", (old_id,))
+            connection.execute("INSERT INTO files VALUES (?, ?, ?)",
+                               (path_id, prop_number, file_name))
+            page_rows = []
+            for number, text in pages:
+                if text.strip():
+                    cursor = connection.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?)",
+                                                (text, path_id, prop_number, file_name, number))
+                    page_rows.append((path_id, cursor.lastrowid))
+            connection.executemany("INSERT INTO page_rows VALUES (?, ?)", page_rows)
+
+    def search(self, query, limit=20, prop_number=None, raw=False):
+        """
+        Return the best matching pages, best first, as
+        [{"prop_number":..., "file":..., "page":..., "snippet":..., "score":...}]
+        Set raw to pass FTS5 query syntax (OR, NEAR, "phrases", prefix*) through.
+        """
+        sql = """SELECT prop_number, file, page,
+                        snippet(pages, 0, '[', ']', '...', 12), bm25(pages)
+                 FROM pages WHERE pages MATCH ?"""
+        params = [query if raw else quote_query(query)]
+        if prop_number:
+            sql += " AND prop_number = ?"
+            params.append(prop_number)
+        sql += " ORDER BY bm25(pages) LIMIT ?"
+        params.append(limit)
+        rows = self.connect().execute(sql, params)
+        return [{"prop_number": row[0], "file": row[1], "page": row[2],
+                 "snippet": " ".join(row[3].split()), "score": row[4]} for row in rows]
@@ -0,0 +1,177 @@
+"""
+Index the numbered headings of a document once, so any section's text is a
+dictionary lookup instead of a scan of every line, e.g.
+
+    2.7 Safety Related Deliverables    lines 410-418
+    2.8 Other Deliverables             lines 418-431
+    3 Commercialization Strategy       lines 431-502
+
+A line counts as a heading if it starts with a section number that plausibly
+follows the previous heading (the next sibling, a first child, a step back up
+to the parent level, or a restart at 1 as between the table of contents and
+the body).  This keeps stray numbers in the text (answers like "12", dollar
+amounts, years) from being mistaken for headings.
+
+Extracted text often has gaps in the numbering (a heading lost to a page
+break, a document that starts at 2), so the titles of the sections the
+caller asks for (anchors) are headings wherever they appear, numbered or
+not.  The numbering check then only decides where such a section ends.
+"""
+import re
+
+heading_line = re.compile(r"^(\d+(?:\.\d+)*)\.?(?:\s+(.*))?$")
+toc_leader = re.compile(r"[\s.]*\d*$")
+not_alnum = re.compile(r"[^a-z0-9]+")
+
+# Headings that are sometimes unnumbered, but still end the previous section
+unnumbered_headings = [
+    "Commercialization Strategy",
+    "Compliance and Regulatory Activities"
+]
+
+disclaimer = "Use or disclosure of data contained on this page is subject to the restriction on the first page of this volume"
+
+# ==============================================================================
+def normalize_title(title):
+    """
+    "Safety-Related Deliverables ...... 12" -> "safety related deliverables"
+    """
+    title = toc_leader.sub("", title)
+    return not_alnum.sub(" ", title.lower()).strip()
+# ==============================================================================
+def follows(previous, number):
+    """
+    Returns True if section number (a tuple, e.g. (2, 8)) can plausibly come
+    after the previous heading's number, allowing for some skipped numbers.
+    The first heading (and any restart) must be 1 or 1.1.
+    """
+    if number in [(1,), (1, 1)]:
+        return True
+    if previous is None:
+        return False
+    # First child, e.g. 2.7 -> 2.7.1
+    if number[:-1] == previous and number[-1] == 1:
+        return True
+    # Next sibling at this level or a parent's level, e.g. 2.7 -> 2.8 or 2.7.3 -> 3
+    # A matching parent number (the 2 in 2.8) is good evidence on its own, so
+    # subsections may skip ahead further than top level sections
+    level = len(number) - 1
+    max_step = 9 if level else 2
+    return len(number) <= len(previous) and \
+        number[:level] == previous[:level] and \
+        1 <= number[level] - previous[level] <= max_step
+# ==============================================================================
+def looks_like_title(title):
+    """
+    Weed out numbered lines that are really answers or questions
+    """
+    return bool(title) and title[0].isalpha() and len(title) < 120 and \
+        not title.rstrip().endswith(("?", ":"))
+# ==============================================================================
+class SectionIndex:
+    """
+    Numbered-heading tree of one document's lines (text_segs), with the
+    sections titled anchors (e.g. ["Safety Related Deliverables"]) always
+    taken as headings.
+    Each section is a dict:
+    {"number": "2.7", "title": "Safety Related Deliverables", "start": 410, "end": 418}
+    where start is the heading's line and end is one past the section's last line.
+    """
+    def __init__(self, text_segs, anchors=()):
+        self.text_segs = text_segs
+        self.anchors = [normalize_title(title) for title in anchors]
+        self.build()
+
+    def anchor_of(self, title):
+        """
+        The (normalized) anchor this title starts with, or None
+        """
+        title = normalize_title(title)
+        for anchor in self.anchors:
+            if title == anchor or title.startswith(anchor + " "):
+                return anchor
+        return None
+
+    def build(self):
+        self.sections = []
+        self.by_title = {}
+        previous = None
+        stops = {normalize_title(title) for title in unnumbered_headings}
+        line_count = len(self.text_segs)
+        title_i = None
+        for seg_i, single_text in enumerate(self.text_segs):
+            single_text = single_text.strip()
+            # Already taken as the title of the heading before it
+            if seg_i == title_i:
+                continue
+            if normalize_title(single_text) in stops:
+                self.add(None, single_text, seg_i)
+                continue
+
+            match = heading_line.match(single_text)
+            if not match:
+                anchor = self.anchor_of(single_text)
+                if anchor and looks_like_title(single_text):
+                    self.add(None, single_text, seg_i, anchor)
+                continue
+            number = tuple(int(x) for x in match.group(1).split("."))
+
+            # The number and title are sometimes separate lines
+            title = match.group(2)
+            next_i = None
+            if not title:
+                next_i = seg_i + 1
+                while next_i < line_count and not self.text_segs[next_i].strip():
+                    next_i += 1
+                title = self.text_segs[next_i].strip() if next_i < line_count else ""
+            anchor = self.anchor_of(title)
+            if not anchor and not follows(previous, number):
+                continue
+            if not looks_like_title(title):
+                continue
+
+            previous = number
+            title_i = next_i
+            self.add(match.group(1), title, seg_i, anchor)
+
+        # Each section runs until the next heading that isn't one of its
+        # subsections
+        for i, section in enumerate(self.sections):
+            section["end"] = line_count
+            for later in self.sections[i+1:]:
+                if not (section["number"] and later["number"] and
+                        later["number"].startswith(section["number"] + ".")):
+                    section["end"] = later["start"]
+                    break
+
+    def add(self, number, title, start, anchor=None):
+        section = {"number": number, "title": title, "start": start, "end": None}
+        self.sections.append(section)
+        self.by_title.setdefault(normalize_title(title), []).append(section)
+        # Found by its anchor too, e.g. "Safety Related Deliverables (if any)"
+        if anchor and anchor != normalize_title(title):
+            self.by_title.setdefault(anchor, []).append(section)
+
+    def find(self, title):
+        """
+        Return the last section with this (normalized) title, or None.
+        The last one is used because the table of contents comes first.
+        A title that isn't an anchor yet is made one (see build()).
+        """
+        key = normalize_title(title)
+        if key not in self.by_title and key not in self.anchors:
+            self.anchors.append(key)
+            self.build()
+        matches = self.by_title.get(key)
+        return matches[-1] if matches else None
+
+    def section_text(self, title):
+        """
+        Return the heading and body of the named section, one line per line,
+        without the per-page disclaimer.  Empty string if there's no such section.
+        """
+        section = self.find(title)
+        if not section:
+            return ""
+        lines = self.text_segs[section["start"]:section["end"]]
+        return "\n".join(line for line in lines if line != disclaimer)
@@ -0,0 +1,170 @@
+"""
+Keep a warm parser running for quick, repeated runs on a few proposals.
+
+python multi_processor.py serve -w 4 --text-store text_store
+starts a localhost HTTP service holding fitz (and OCR modules) loaded and a
+persistent worker pool.  Later runs of the command line
+(python multi_processor.py -d proposals -k 1234) hand their job to the service
+if one is listening at --service, and only write the results themselves.
+
+Options that change what the workers do (OCR, text store, indexes, file
+roles...) must match the ones the service was started with; if they don't,
+or no service is running, the command line parses locally as usual.
+
+GET  /status    {"pid":..., "workers":..., "jobs":..., "config": {...}}
+POST /parse     {"paths": [...], "config": {...}} -> {"rows": [[proposal, row], ...]}
+POST /shutdown
+"""
+import json
+import logging
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+default_address = "http://127.0.0.1:8765"
+# Seconds to wait for a service to answer /status before parsing locally
+probe_timeout = 0.5
+
+# Options a job sets for itself: the service applies them to that job only
+job_options = ["keyword", "shard", "required_section", "section_match", "dup_threshold", "split_pages"]
+# Options only the command line uses (what to parse, where to write it...)
+client_options = [
+    "directory", "file", "out", "out_format", "resume", "journal", "metrics", "progress_interval",
+    "workers", "log_level", "service", "stream", "validate",
+]
+# Every other option is used by the workers, so must match the service's
+# Options naming files, made absolute so client and service agree
+path_options = ["text_store", "form_map", "title_index", "search_index", "dup_report"]
+
+# ==============================================================================
+def portable_config(config):
+    """
+    The config namespace as a JSON-ready dict, with paths made absolute
+    """
+    options = dict(vars(config))
+    # The title index is only used with --check-sections
+    if not options.get("check_sections"):
+        options["title_index"] = None
+    for option in path_options:
+        if options.get(option):
+            options[option] = os.path.abspath(options[option])
+    return json.loads(json.dumps(options))
+# ==============================================================================
+def config_mismatch(service_options, job_options_given):
+    """
+    Return the names of worker options that differ between the service and a job
+    """
+    return sorted(option for option in set(service_options) | set(job_options_given)
+                  if option not in job_options and option not in client_options and
+                  service_options.get(option) != job_options_given.get(option))
+# ==============================================================================
+def call(url, path, payload=None, timeout=None):
+    """
+    GET (payload None) or POST JSON to the service, returning its JSON answer
+    """
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url.rstrip("/") + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+# ==============================================================================
+def request_parse(url, paths, config):
+    """
+    Have the service at url parse paths.
+    Returns [(proposal number, row)], or None if there's no service or it
+    can't take this job, in which case the caller parses locally.
+    """
+    try:
+        status = call(url, "/status", timeout=probe_timeout)
+    except (OSError, ValueError):
+        logger.debug(f"No parse service at {url}")
+        return None
+
+    if not isinstance(status, dict) or "config" not in status:
+        print(f"{url} isn't a parse service; parsing locally")
+        return None
+
+    options = portable_config(config)
+    mismatch = config_mismatch(status["config"], options)
+    if mismatch:
+        print(f"Parse service at {url} was started with different {', '.join(mismatch)}; parsing locally")
+        return None
+
+    print(f"Parsing with the service at {url} (pid {status.get('pid')}, {status.get('workers')} workers)")
+    try:
+        answer = call(url, "/parse", {"paths": [os.path.abspath(x) for x in paths],
+                                      "config": options})
+    except urllib.error.HTTPError as e:
+        print(f"Parse service failed ({e.code}: {e.read().decode('utf-8', 'replace')}); parsing locally")
+        return None
+    except OSError as e:
+        print(f"Parse service failed ({e}); parsing locally")
+        return None
+    return [tuple(x) for x in answer["rows"]]
+# ==============================================================================
+def make_handler(service):
+    """
+    Request handler class answering for service, an object with
+    status() -> dict and parse(paths, options) -> [(proposal number, row)]
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/status":
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            self.send_json(200, service.status())
+
+        def do_POST(self):
+            if self.path == "/shutdown":
+                self.send_json(200, {"stopping": True})
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            if self.path != "/parse":
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            job = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            mismatch = config_mismatch(service.status()["config"], job["config"])
+            if mismatch:
+                self.send_json(409, {"error": f"Different {', '.join(mismatch)}"})
+                return
+            try:
+                rows = service.parse(job["paths"], job["config"])
+            except Exception as e:
+                logger.exception("Parse job failed")
+                self.send_json(500, {"error": repr(e)})
+                return
+            self.send_json(200, {"rows": rows})
+
+        def log_message(self, format, *log_args):
+            logger.info(format % log_args)
+    return Handler
+# ==============================================================================
+def serve(url, service):
+    """
+    Answer requests at url (host and port) until /shutdown or Ctrl-C.
+    Jobs run one at a time; each one uses the whole worker pool.
+    Port 0 picks a free port, printed once listening.
+    """
+    address = urlparse(url)
+    server = HTTPServer((address.hostname, address.port), make_handler(service))
+    print(f"Parse service listening at http://{address.hostname}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
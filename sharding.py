@@ -0,0 +1,85 @@
+"""
+Split one run across several machines (or processes) and merge the results.
+
+Each shard is given as "i/N" (1 <= i <= N).  Proposals are assigned to shards
+by a stable hash of the proposal number, so every file belonging to a
+proposal is parsed by the same shard, and every machine agrees on the split
+without having to talk to the others.
+"""
+import argparse
+import hashlib
+import logging
+import os
+
+from output import order_columns, read_results, write_results, natural_keys
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+def parse_shard(shard:str):
+    """
+    Validates a "--shard i/N" argparse argument, returning (i, N)
+    """
+    try:
+        index, count = (int(x) for x in shard.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard '{shard}' must look like i/N, e.g. 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard '{shard}' must satisfy 1 <= i <= N")
+    return index, count
+# ==============================================================================
+def shard_of(prop_number, count):
+    """
+    Return the (1-based) shard that owns this proposal number.
+    Python's hash() is salted per process, so use md5 instead to get the same
+    answer on every machine.
+    """
+    digest = hashlib.md5(prop_number.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+# ==============================================================================
+def in_shard(prop_number, shard):
+    """
+    Returns True if this proposal belongs to shard (i, N).
+    No shard means everything is in scope.
+    """
+    if not shard:
+        return True
+    index, count = shard
+    return shard_of(prop_number, count) == index
+# ==============================================================================
+def shard_out_path(out_path, shard):
+    """
+    Insert the shard into the output file name, e.g.
+    proposals.csv -> proposals.shard1of4.csv
+    so that shards writing to a shared mount don't overwrite each other.
+    """
+    if not shard:
+        return out_path
+    root, extension = os.path.splitext(out_path)
+    index, count = shard
+    return f"{root}.shard{index}of{count}{extension}"
+# ==============================================================================
+def merge_shards(shard_paths, out_path, out_format=None):
+    """
+    Combine the outputs of several shards into one table, ordered the same way
+    main() orders a single run.  Returns the number of proposals written.
+    """
+    import pandas as pd
+
+    tables = []
+    for shard_path in shard_paths:
+        logger.info(f"Reading shard {shard_path}")
+        tables.append(read_results(shard_path))
+    results = pd.concat(tables)
+
+    duplicated = results.index[results.index.duplicated()].unique().tolist()
+    if duplicated:
+        # Shouldn't happen unless shards overlap (e.g. the same shard run twice)
+        print(f"WARNING! {len(duplicated)} proposals appear in more than one shard: {duplicated}")
+        results = results[~results.index.duplicated(keep="first")]
+
+    results = results.loc[sorted(results.index, key=natural_keys)]
+    results = order_columns(results)
+    results.index.name = "Proposal ID"
+    write_results(results, out_path, out_format)
+    return len(results)
@@ -0,0 +1,128 @@
+"""
+Hand file contents to pool workers through shared memory instead of pickling.
+
+When the parent process has to produce a file's bytes itself (e.g. a member
+of a ZIP bundle), it decompresses them straight into a SharedMemory block and
+sends the workers only the block's name and size.  The worker maps the block
+and opens it with fitz.open(stream=memoryview), which MuPDF reads in place,
+so a 100 MB Vol2 is never copied through the pool's pipes.
+
+Files on disk don't need any of this: workers open them by path.
+"""
+import logging
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+from archives import open_archive, split_member
+
+logger = logging.getLogger(__name__)
+
+# Worker side: file name -> memoryview of the shared block currently mapped
+attached_views = {}
+
+# ==============================================================================
+def share_member(file_name, size):
+    """
+    Decompress "<zip>::<member>" into a new shared memory block.
+    Returns the block, which the parent must release() once the worker is done.
+    """
+    zip_path, member = split_member(file_name)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    offset = 0
+    with open_archive(zip_path).open(member) as member_file:
+        while offset < size:
+            read = member_file.readinto(block.buf[offset:size])
+            if not read:
+                break
+            offset += read
+    logger.debug(f"Shared {offset} bytes of {file_name} as {block.name}")
+    return block
+# ==============================================================================
+def release(block):
+    """
+    Parent side: free a block created by share_member()
+    """
+    block.close()
+    block.unlink()
+# ==============================================================================
+def attach(file_name, shared_ref):
+    """
+    Worker side: map the block described by shared_ref = (name, size) and
+    register it so open_pdf() reads file_name from it.
+    Returns the block; pass it to detach() when done.
+    """
+    name, size = shared_ref
+    block = shared_memory.SharedMemory(name=name)
+    # The parent owns (and unlinks) the block; stop this process's resource
+    # tracker from also claiming it
+    resource_tracker.unregister(block._name, "shared_memory")
+    attached_views[file_name] = block.buf[:size]
+    return block
+# ==============================================================================
+def detach(file_name, block):
+    """
+    Worker side: drop the mapping created by attach()
+    """
+    attached_views.pop(file_name).release()
+    block.close()
+# ==============================================================================
+def shared_view(file_name):
+    """
+    The memoryview for file_name if the parent shared it, else None
+    """
+    return attached_views.get(file_name)
+# ==============================================================================
+class SharedTasks:
+    """
+    Wraps the stream of (kind, payload) batches handed to Pool.imap_unordered()
+    (see run_batch()) so that the ZIP members of parse tasks are placed in
+    shared memory just before they're dispatched.  Page range batches read
+    their member themselves.
+
+    The pool consumes its input as fast as it can, so at most `limit`
+    blocks are allowed to exist at once; done(file_name) frees one.
+    limit must be at least the size of the largest batch.
+    """
+    def __init__(self, tasks, limit):
+        self.tasks = tasks
+        self.slots = threading.BoundedSemaphore(limit)
+        self.blocks = {}
+        self.closed = False
+
+    def __iter__(self):
+        for kind, payload in self.tasks:
+            if kind == "pages":
+                yield kind, payload
+                continue
+            batch = payload if kind == "parse" else [payload[0]]
+            shared_batch = []
+            for task in batch:
+                file_name, size, shared_ref = task[0], task[1], task[4]
+                if shared_ref:
+                    self.slots.acquire()
+                    if self.closed:
+                        return
+                    block = share_member(file_name, size)
+                    self.blocks[file_name] = block
+                    shared_ref = (block.name, size)
+                shared_batch.append(task[:4] + (shared_ref,) + task[5:])
+            yield kind, shared_batch if kind == "parse" else (shared_batch[0], payload[1])
+
+    def done(self, file_name):
+        block = self.blocks.pop(file_name, None)
+        if block:
+            release(block)
+            self.slots.release()
+
+    def close(self):
+        """
+        Free every outstanding block and stop creating new ones
+        """
+        self.closed = True
+        for file_name in list(self.blocks):
+            self.done(file_name)
+        # Wake the pool's task handler if it's waiting for a free slot
+        try:
+            self.slots.release()
+        except ValueError:
+            pass
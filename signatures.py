@@ -0,0 +1,98 @@
+"""
+Collect digital signature info (signer, date, page) from PDFs.
+
+Signed PDFs carry a signature field per signature whose value dictionary
+holds the signer's name (/Name) and signing time (/M).  Reading those through
+fitz is much cheaper than scanning every line of text for the
+"Digitally signed by" appearance text, so the text scan is only the fallback
+for PDFs without signature fields (e.g. printed and scanned MOUs).
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+signed_by = "Digitally signed by"
+pdf_date = re.compile(r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?")
+# PDF_WIDGET_TYPE_SIGNATURE in fitz
+signature_widget = 6
+
+# ==============================================================================
+def format_pdf_date(value):
+    """
+    "D:20240105120000-05'00'" -> "2024-01-05 12:00:00"
+    Anything unrecognized is returned as is.
+    """
+    match = pdf_date.match(value or "")
+    if not match:
+        return value or ""
+    year, month, day, hour, minute, second = (x or "00" for x in match.groups())
+    return f"{year}-{month}-{day} {hour}:{minute}:{second}"
+# ==============================================================================
+def dict_string(doc, xref, key):
+    """
+    Return the string value of key in PDF object xref, or ""
+    """
+    value_type, value = doc.xref_get_key(xref, key)
+    return value if value_type == "string" else ""
+# ==============================================================================
+def read_signature_fields(doc):
+    """
+    Return [{"signer":..., "date":..., "page":...}] for every signed signature
+    field in the (open) fitz doc.  Page numbers start at 1.
+    Returns [] straight away, without loading any pages, if the document
+    has no signatures.
+    """
+    signatures = []
+    # SigFlags is in the document catalog, so this check is nearly free
+    if doc.get_sigflags() < 1:
+        return signatures
+
+    for page in doc:
+        for widget in page.widgets(types=[signature_widget]):
+            value_type, value = doc.xref_get_key(widget.xref, "V")
+            if value_type != "xref":
+                # Unsigned signature field
+                continue
+            value_xref = int(value.split()[0])
+            signatures.append({
+                "signer": dict_string(doc, value_xref, "Name") or widget.field_name,
+                "date": format_pdf_date(dict_string(doc, value_xref, "M")),
+                "page": page.number + 1
+            })
+    logger.debug(f"Signature fields: {signatures}")
+    return signatures
+# ==============================================================================
+def find_signed_by_text(page_i, text_segs):
+    """
+    Text fallback: find "Digitally signed by <name>" appearance text on one
+    page, where the name may be on the following line and is usually
+    followed by a "Date: 2024.01.05 12:00:00 -05'00'" line.
+    """
+    signatures = []
+    for seg_i, single_text in enumerate(text_segs):
+        if signed_by not in single_text:
+            continue
+        following = [x.strip() for x in text_segs[seg_i+1:seg_i+4] if x.strip()]
+        signer = single_text.split(signed_by, 1)[1].strip()
+        if not signer and following:
+            signer = following.pop(0)
+        date = ""
+        if following and following[0].startswith("Date:"):
+            date = following[0][len("Date:"):].strip()
+        signatures.append({"signer": signer, "date": date, "page": page_i + 1})
+    return signatures
+# ==============================================================================
+def format_signatures(signatures):
+    """
+    One line per signature, e.g. "Jane Doe (2024-01-05 12:00:00, p.3)"
+    """
+    return "\n".join(f"{x['signer']} ({x['date']}, p.{x['page']})" for x in signatures)
+# ==============================================================================
+def with_signatures(result, signatures):
+    """
+    Add the "Digital Signatures" column to result if any were found
+    """
+    if signatures:
+        result["Digital Signatures"] = format_signatures(signatures)
+    return result
@@ -0,0 +1,139 @@
+"""
+Shared fixtures: a small synthetic corpus written with fitz, and a runner
+for the command line.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, package_dir)
+
+forms_text = [
+    ["SBIR Phase {phase} Proposal",
+     "It has no more than 500 employees, including the employees of its affiliates.", "YES",
+     "funds or private equity", "NO"],
+    ["1. Introduction", "2. Technical Approach", "2.1 Method",
+     "2.7 Safety Related Deliverables", "No hazardous deliverables are expected.",
+     "2.8 Other Deliverables", "report",
+     "Proposed Base Duration (in months) 12"],
+]
+budget_text = [
+    ["Total Direct Labor (TDL)", "$100,000.00",
+     "Total Dollar Amount for this Proposal", "${total:,}.00"],
+]
+mou_text = [
+    ["Primary End-User Organization", "AFRL", "Dayton, OH",
+     "Primary Customer Organization", "AFWERX", "Dayton, OH",
+     "Technical Points of Contact (TPOCs)", "Jane Doe", "jane@example.mil"],
+]
+
+# ==============================================================================
+def write_pdf(path, pages):
+    """
+    Write a PDF with one page per list of lines
+    """
+    import fitz
+
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for line_i, line in enumerate(lines):
+            page.insert_text((40, 40 + 11 * line_i), line, fontsize=8)
+    doc.save(path)
+# ==============================================================================
+def write_form(path):
+    """
+    A fillable all_forms package with a few certification answers
+    """
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((40, 40), "STTR Phase II Proposal", fontsize=8)
+    for question in range(1, 4):
+        widget = fitz.Widget()
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.field_name = f"Firm_Cert_{question}"
+        widget.field_value = "YES" if question % 2 else "NO"
+        widget.rect = fitz.Rect(40, 60 + 20 * question, 200, 75 + 20 * question)
+        page.add_widget(widget)
+    doc.save(path)
+# ==============================================================================
+def proposal_files(prop_number, phase, total):
+    """
+    {file name: pages} of one proposal
+    """
+    files = {
+        f"{prop_number}_All_forms_proposal_package.pdf":
+            [[x.format(phase=phase) for x in page] for page in forms_text],
+        f"{prop_number}_proposalBudget.pdf":
+            [[x.format(total=total) for x in page] for page in budget_text],
+    }
+    if phase != "I":
+        files[f"{prop_number}_mou.pdf"] = mou_text
+    return files
+# ==============================================================================
+@pytest.fixture
+def corpus(tmp_path):
+    """
+    A directory of 6 proposals, alternating Phase I and II
+    """
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    for i in range(6):
+        files = proposal_files(f"F2D-{1000 + i}", "II" if i % 2 else "I", 150000 + i * 1000)
+        for file_name, pages in files.items():
+            write_pdf(str(directory / file_name), pages)
+    return directory
+# ==============================================================================
+@pytest.fixture
+def run_cli(tmp_path):
+    """
+    Run multi_processor.py with these arguments in tmp_path; returns the
+    finished process (output captured)
+    """
+    def run(*argv, check=True):
+        finished = subprocess.run([sys.executable, os.path.join(package_dir, "multi_processor.py"),
+                                   *[str(x) for x in argv]],
+                                  cwd=tmp_path, capture_output=True, text=True)
+        if check and finished.returncode:
+            raise AssertionError(finished.stdout + finished.stderr)
+        return finished
+    return run
+# ==============================================================================
+def write_pptx(path, slides, order=None):
+    """
+    Write a minimal .pptx of [(title or None, [body lines])]: just the parts
+    pptx_index reads.  order lists the slide part numbers in presentation
+    order (default: as given).
+    """
+    import zipfile
+
+    main = "http://schemas.openxmlformats.org/presentationml/2006/main"
+    drawing = "http://schemas.openxmlformats.org/drawingml/2006/main"
+    relationships = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    def shape(text, placeholder=""):
+        paragraphs = "".join(f"<a:p><a:r><a:t>{line}</a:t></a:r></a:p>" for line in text)
+        return (f"<p:sp><p:nvSpPr><p:nvPr>{placeholder}</p:nvPr></p:nvSpPr>"
+                f"<p:txBody>{paragraphs}</p:txBody></p:sp>")
+
+    order = order or list(range(1, len(slides) + 1))
+    with zipfile.ZipFile(path, "w") as deck:
+        deck.writestr("ppt/presentation.xml",
+                      f'<p:presentation xmlns:p="{main}" xmlns:r="{relationships}"><p:sldIdLst>' +
+                      "".join(f'<p:sldId id="{255 + n}" r:id="rId{n}"/>' for n in order) +
+                      "</p:sldIdLst></p:presentation>")
+        deck.writestr("ppt/_rels/presentation.xml.rels",
+                      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+                      "".join(f'<Relationship Id="rId{n}" Target="slides/slide{n}.xml"/>'
+                              for n in range(1, len(slides) + 1)) +
+                      "</Relationships>")
+        for slide_number, (title, body) in enumerate(slides, 1):
+            shapes = shape([title], '<p:ph type="title"/>') if title else ""
+            shapes += shape(body)
+            deck.writestr(f"ppt/slides/slide{slide_number}.xml",
+                          f'<p:sld xmlns:p="{main}" xmlns:a="{drawing}"><p:cSld><p:spTree>'
+                          f"{shapes}</p:spTree></p:cSld></p:sld>")
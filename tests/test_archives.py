@@ -0,0 +1,68 @@
+import zipfile
+
+import multi_processor
+from archives import list_archive, read_member
+from conftest import proposal_files, write_pdf
+from output import read_results
+
+# ==============================================================================
+def make_bundle(tmp_path, zip_name, members):
+    """
+    A ZIP of {member name: pages} in its own directory
+    """
+    directory = tmp_path / "bundles"
+    directory.mkdir()
+    zip_path = directory / zip_name
+    with zipfile.ZipFile(zip_path, "w") as bundle:
+        for member_name, pages in members.items():
+            pdf_path = tmp_path / member_name.replace("/", "_")
+            write_pdf(str(pdf_path), pages)
+            bundle.write(pdf_path, member_name)
+    return directory, zip_path
+# ==============================================================================
+def test_prop_number_of_members():
+    multi_processor.configure(multi_processor.make_config())
+    assert multi_processor.get_prop_number(
+        "/mnt/firmA.zip::F2D-2001_proposalBudget.pdf") == "F2D-2001"
+    assert multi_processor.get_prop_number(
+        "C:\\bundles\\firmA.zip::F2D-2001/F2D-2001_mou.pdf") == "F2D-2001"
+    assert multi_processor.get_prop_number(
+        "/mnt/F2D-2001/F2D-2001_mou.pdf") == "F2D-2001"
+# ==============================================================================
+def test_members_at_archive_root(tmp_path, run_cli):
+    # One proposal at the root of the bundle, one in a folder
+    members = {name: pages for name, pages in proposal_files("F2D-2001", "II", 200000).items()}
+    members.update({f"F2D-2002/{name}": pages
+                    for name, pages in proposal_files("F2D-2002", "I", 300000).items()})
+    directory, zip_path = make_bundle(tmp_path, "firmA.zip", members)
+
+    listed = list_archive(str(zip_path), None, ["pdf"])
+    assert len(listed) == len(members)
+    assert read_member(str(zip_path) + "::F2D-2001_proposalBudget.pdf").startswith(b"%PDF")
+
+    run_cli("-d", directory, "--out", "bundle.csv", "--service", "none")
+    results = read_results(str(tmp_path / "bundle.csv"))
+    assert results.index.tolist() == ["F2D-2001", "F2D-2002"]
+    assert results.loc["F2D-2001", "Total"] == "200000.0"
+    assert results.loc["F2D-2001", "Phase"] == "II"
+    assert results.loc["F2D-2001", "Primary Technical Points of Contact (TPOCs)"] != "NOT FOUND"
+    assert results.loc["F2D-2002", "Total"] == "300000.0"
+# ==============================================================================
+def test_replaced_bundle_is_reread(tmp_path):
+    import os
+
+    config = multi_processor.make_config(journal=None)
+    directory, zip_path = make_bundle(tmp_path, "firmA.zip", proposal_files("F2D-2001", "I", 111000))
+    rows = dict(multi_processor.iter_proposals([str(directory)], config))
+    assert rows["F2D-2001"]["Total"] == 111000.0
+
+    # The same bundle, resubmitted with a new budget
+    with zipfile.ZipFile(zip_path, "w") as bundle:
+        for member_name, pages in proposal_files("F2D-2001", "I", 222000).items():
+            pdf_path = tmp_path / member_name
+            write_pdf(str(pdf_path), pages)
+            bundle.write(pdf_path, member_name)
+    stat = os.stat(zip_path)
+    os.utime(zip_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    rows = dict(multi_processor.iter_proposals([str(directory)], config))
+    assert rows["F2D-2001"]["Total"] == 222000.0
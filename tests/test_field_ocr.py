@@ -0,0 +1,62 @@
+import multi_processor
+from conftest import write_form, write_pdf
+from field_ocr import found_questions, header_pages, question_pages, text_less_pages
+
+# ==============================================================================
+def test_question_pages():
+    # 4 pages of 10 lines; Q1 on page 0, Q3 on page 1, Q6 on page 3
+    page_offsets = [0, 10, 20, 30]
+    found = {1: 2, 3: 15, 6: 31}
+    # Between two found questions: their pages and those between
+    assert question_pages([2], found, page_offsets, 4) == {0, 1}
+    assert question_pages([4, 5], found, page_offsets, 4) == {1, 2, 3}
+    # After the last one: its page and the next, if any
+    assert question_pages([7], found, page_offsets, 4) == {3}
+    assert question_pages([7], {1: 2}, page_offsets, 4) == {0, 1}
+    # Before the first one: the page before it too
+    assert question_pages([1], {3: 15}, page_offsets, 4) == {0, 1}
+    # Nothing found to place it by
+    assert question_pages([1, 2], {}, page_offsets, 4) == set()
+# ==============================================================================
+def test_found_questions():
+    question_lines = {"Firm Certification Q1": 3, "Firm Certification Q12": 40,
+                      "Proposal Certification Q2": 7}
+    assert found_questions(question_lines, "Firm Certification Q{}") == {1: 3, 12: 40}
+    assert found_questions(question_lines, "Proposal Certification Q{}") == {2: 7}
+# ==============================================================================
+def test_header_pages():
+    pages = [["Cover"], ["Primary Customer Organization", "AFWERX"], ["Budget"], ["Technical Points of Contact (TPOCs)"]]
+    assert header_pages(pages, ["Primary Customer Organization"]) == {1, 2}
+    # The last page has no next page
+    assert header_pages(pages, ["Primary Customer Organization", "Technical Points of Contact"]) == {1, 2, 3}
+    assert header_pages(pages, ["Primary End-User Organization"]) == set()
+    assert text_less_pages([["a"], [" ", ""], []]) == {1, 2}
+# ==============================================================================
+def test_every_page_ocrd_for_missing_pocs(tmp_path, monkeypatch):
+    multi_processor.configure(multi_processor.make_config())
+    file_name = str(tmp_path / "F2D-1_mou.pdf")
+    write_pdf(file_name, [["Primary Customer Organization", "AFWERX"], ["Signed"]])
+    ocrd = []
+    def parse_with_ocr(file_name, pages, page_numbers, parser):
+        ocrd.append(sorted(page_numbers))
+        return {"Primary End-User Organization": "AFRL"}
+    monkeypatch.setattr(multi_processor, "parse_with_ocr", parse_with_ocr)
+
+    poc_info = multi_processor.process_pdf_sigs_fitz(file_name)
+    multi_processor.ocr_missing_pocs(file_name, poc_info)
+    # The header's page and the next are every page; they're still OCR'd
+    assert ocrd == [[0, 1]]
+    assert poc_info["Primary End-User Organization"] == "AFRL"
+# ==============================================================================
+def test_form_answers_not_ocrd(tmp_path, monkeypatch):
+    multi_processor.configure(multi_processor.make_config())
+    file_name = str(tmp_path / "F2D-1_All_forms_proposal_package.pdf")
+    write_form(file_name)
+    def fail(*ocr_args):
+        raise AssertionError("Form answers OCR'd")
+    monkeypatch.setattr(multi_processor, "ocr_missing_questions", fail)
+
+    info = multi_processor.parse_file(file_name, "F2D-1", True)
+    assert info["Firm Certification Q1"] == "YES"
+    assert info["Missing Firm Certificate Questions"]
+    assert "_form_fields" not in info
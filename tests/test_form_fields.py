@@ -0,0 +1,44 @@
+from form_fields import map_form_fields, normalize_value, read_form_fields
+
+# ==============================================================================
+def add_widget(page, field_type, name, value, y):
+    import fitz
+
+    widget = fitz.Widget()
+    widget.field_type = field_type
+    widget.field_name = name
+    widget.rect = fitz.Rect(40, y, 200 if field_type == fitz.PDF_WIDGET_TYPE_TEXT else 55, y + 15)
+    widget.field_value = value
+    page.add_widget(widget)
+# ==============================================================================
+def test_only_toggles_become_yes_no(tmp_path):
+    import fitz
+
+    path = str(tmp_path / "form.pdf")
+    doc = fitz.open()
+    page = doc.new_page()
+    add_widget(page, fitz.PDF_WIDGET_TYPE_TEXT, "FirmCert_Q4", "1", 40)
+    add_widget(page, fitz.PDF_WIDGET_TYPE_TEXT, "FirmCert_Q10", "N", 60)
+    add_widget(page, fitz.PDF_WIDGET_TYPE_TEXT, "FirmCert_Q11", " ", 80)
+    add_widget(page, fitz.PDF_WIDGET_TYPE_CHECKBOX, "FirmCert_Q1", True, 100)
+    add_widget(page, fitz.PDF_WIDGET_TYPE_CHECKBOX, "FirmCert_Q2", False, 120)
+    doc.save(path)
+
+    with fitz.open(path) as doc:
+        fields = read_form_fields(doc)
+    assert fields["FirmCert_Q4"] == "1"
+    assert fields["FirmCert_Q10"] == "N"
+    assert fields["FirmCert_Q11"] is None
+    assert fields["FirmCert_Q1"] == "YES"
+    # An unchecked box is no answer rather than NO
+    assert fields["FirmCert_Q2"] is None
+    assert map_form_fields(fields) == {"Firm Certification Q4": "1", "Firm Certification Q10": "N",
+                                       "Firm Certification Q1": "YES"}
+# ==============================================================================
+def test_normalize_value():
+    assert normalize_value("Yes") == "YES"
+    assert normalize_value("0") == "NO"
+    assert normalize_value("Off") is None
+    assert normalize_value(True, toggle=False) == "YES"
+    assert normalize_value(" 12 ", toggle=False) == "12"
+    assert normalize_value("y", toggle=False) == "y"
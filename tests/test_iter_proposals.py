@@ -0,0 +1,60 @@
+import multiprocessing
+
+import pytest
+
+import multi_processor
+
+# ==============================================================================
+def test_pool_stopped_when_scheduling_fails(corpus, monkeypatch):
+    config = multi_processor.make_config(workers=2, journal=None)
+    multi_processor.configure(config)
+
+    def fail(task):
+        raise RuntimeError("can't estimate")
+    # Hold on to the pool, so it isn't stopped by being garbage collected
+    pools = []
+    def start_pool(config):
+        pools.append(start(config))
+        return pools[-1]
+    start = multi_processor.start_pool
+    monkeypatch.setattr(multi_processor, "start_pool", start_pool)
+    monkeypatch.setattr(multi_processor, "estimate_cost", fail)
+    with pytest.raises(RuntimeError):
+        list(multi_processor.iter_proposals([str(corpus)], config))
+    assert pools
+    assert not multiprocessing.active_children()
+# ==============================================================================
+def test_split_pages_run(corpus, run_cli, tmp_path):
+    split = run_cli("-d", corpus, "--out", "split.csv", "--service", "none", "-w", "2",
+                    "--split-pages", "2", "--log-level", "20")
+    assert "6 files split into 12 page ranges" in split.stderr
+    # The run's own start time isn't overwritten by a page range's
+    seconds = float(split.stdout.split(" files in ")[1].split()[0])
+    assert 0 < seconds < 600
+    run_cli("-d", corpus, "--out", "whole.csv", "--service", "none")
+    assert (tmp_path / "split.csv").read_bytes() == (tmp_path / "whole.csv").read_bytes()
+# ==============================================================================
+def test_deadline_stops_slow_file_with_one_worker(corpus, monkeypatch):
+    import time
+
+    from schema import not_attempted
+
+    config = multi_processor.make_config(workers=1, journal=None, deadline=0.02)
+    multi_processor.configure(config)
+    # MOUs take longer than the whole deadline; forked workers inherit this
+    parse_file = multi_processor.parse_file
+    def slow_parse(file_name, prop_number, ocr_flag):
+        if "mou" in file_name:
+            time.sleep(60)
+        return parse_file(file_name, prop_number, ocr_flag)
+    monkeypatch.setattr(multi_processor, "parse_file", slow_parse)
+
+    start = time.time()
+    rows = dict(multi_processor.iter_proposals([str(corpus)], config))
+    assert time.time() - start < 20
+    assert len(rows) == 6
+    # Quick fields were parsed, the MOU's are marked
+    assert rows["F2D-1001"]["Phase"] == "II"
+    assert rows["F2D-1001"]["Total"] == 151000.0
+    assert rows["F2D-1001"]["Primary Technical Points of Contact (TPOCs)"] == not_attempted
+    assert not multiprocessing.active_children()
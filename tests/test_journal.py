@@ -0,0 +1,60 @@
+import json
+import os
+
+from journal import load_journal, open_journal, record_file
+from output import read_results
+
+# ==============================================================================
+def test_torn_last_line_is_skipped_and_terminated(tmp_path):
+    journal_path = str(tmp_path / "proposals.csv.journal")
+    journal_fd = open_journal(journal_path, resume=False)
+    record_file(journal_fd, "a/F2D-1_mou.pdf", 10, "F2D-1", {"Phase": "II"})
+    record_file(journal_fd, "a/F2D-2_mou.pdf", 20, "F2D-2", {"Phase": "I"})
+    # The run dies in the middle of writing the third entry
+    os.write(journal_fd, b'{"file": "a/F2D-3_mou.pdf", "size": 3')
+    os.close(journal_fd)
+
+    completed = load_journal(journal_path)
+    assert completed == {"a/F2D-1_mou.pdf": (10, "F2D-1", {"Phase": "II"}),
+                         "a/F2D-2_mou.pdf": (20, "F2D-2", {"Phase": "I"})}
+
+    # Resuming starts the next entry on a line of its own
+    journal_fd = open_journal(journal_path, resume=True)
+    record_file(journal_fd, "a/F2D-3_mou.pdf", 30, "F2D-3", {})
+    os.close(journal_fd)
+    completed = load_journal(journal_path)
+    assert sorted(completed) == ["a/F2D-1_mou.pdf", "a/F2D-2_mou.pdf", "a/F2D-3_mou.pdf"]
+# ==============================================================================
+def test_fresh_run_truncates_journal(tmp_path):
+    journal_path = str(tmp_path / "proposals.csv.journal")
+    journal_fd = open_journal(journal_path, resume=False)
+    record_file(journal_fd, "a/F2D-1_mou.pdf", 10, "F2D-1", {})
+    os.close(journal_fd)
+    os.close(open_journal(journal_path, resume=False))
+    assert load_journal(journal_path) == {}
+    assert load_journal(str(tmp_path / "missing.journal")) == {}
+# ==============================================================================
+def test_resume_skips_journaled_files(corpus, run_cli, tmp_path):
+    run_cli("-d", corpus, "--out", "full.csv", "--service", "none")
+    journal_path = tmp_path / "full.csv.journal"
+    lines = journal_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == len(os.listdir(corpus))
+
+    # Keep the first half, the last of them torn, and mark a journaled
+    # budget so replayed results can be told from re-parsed ones
+    kept = [json.loads(x) for x in lines[:len(lines) // 2]]
+    budget = next(x for x in kept[:-1] if "Budget" in x["file"])
+    budget["info"]["Total"] = 1.0
+    torn = json.dumps(kept[-1])[:-10]
+    journal_path.write_text("".join(json.dumps(x) + "\n" for x in kept[:-1]) + torn, encoding="utf-8")
+
+    finished = run_cli("-d", corpus, "--out", "full.csv", "--service", "none", "--resume")
+    assert f"Resumed {len(kept) - 1} files" in finished.stdout
+
+    results = read_results(str(tmp_path / "full.csv"))
+    assert results.loc[budget["prop_number"], "Total"] == "1.0"
+    run_cli("-d", corpus, "--out", "fresh.csv", "--service", "none")
+    fresh = read_results(str(tmp_path / "fresh.csv"))
+    others = [x for x in fresh.index if x != budget["prop_number"]]
+    assert results.loc[others].equals(fresh.loc[others])
+    assert len(load_journal(str(journal_path))) == len(lines)
@@ -0,0 +1,46 @@
+import csv
+
+from conftest import write_pptx
+from near_duplicates import choose_bands, find_clusters, minhash, num_perm
+
+base_text = " ".join(f"word{i}" for i in range(400))
+
+# ==============================================================================
+def test_choose_bands():
+    for threshold in [0.3, 0.5, 0.8, 0.95]:
+        bands, rows = choose_bands(threshold)
+        assert bands * rows == num_perm
+        # Erring low: pairs just above the threshold still share a band
+        assert (1 / bands) ** (1 / rows) <= threshold
+    assert choose_bands(0.8)[1] > choose_bands(0.3)[1]
+    # Below every S-curve: one row per band
+    assert choose_bands(0.001) == (num_perm, 1)
+# ==============================================================================
+def test_find_clusters():
+    signatures = {
+        "F2D-1": minhash(base_text),
+        "F2D-2": minhash(base_text + " a few words added at the end"),
+        "F2D-3": minhash(base_text.replace("word1 ", "changed ")),
+        "F2D-4": minhash(" ".join(f"other{i}" for i in range(400))),
+        "F2D-5": minhash(" ".join(f"other{i}" for i in range(400))),
+        "F2D-6": minhash(" ".join(f"unrelated{i}" for i in range(400))),
+    }
+    clusters = find_clusters(signatures, 0.8)
+    assert [[x[0] for x in members] for members in clusters] == \
+        [["F2D-1", "F2D-2", "F2D-3"], ["F2D-4", "F2D-5"]]
+    first, second = clusters[1]
+    assert (first[1], first[2]) == ("F2D-5", 1.0)
+    assert (second[1], second[2]) == ("F2D-4", 1.0)
+    assert all(score >= 0.8 for members in clusters for _, _, score in members)
+    assert find_clusters(signatures, 1.0) == [clusters[1]]
+# ==============================================================================
+def test_duplicate_decks_reported(corpus, run_cli, tmp_path):
+    slides = [("Technical Approach", [base_text[:1000]]), ("Schedule", [base_text[1000:]])]
+    write_pptx(str(corpus / "F2D-1000_Vol2-proposal.pptx"), slides)
+    write_pptx(str(corpus / "F2D-1003_Vol2-proposal.pptx"), slides)
+    write_pptx(str(corpus / "F2D-1004_Vol2-proposal.pptx"), [("Other", ["radar fusion at the edge"])])
+    run_cli("-d", corpus, "--out", "decks.csv", "--service", "none", "--dup-report", "dups.csv")
+    with open(tmp_path / "dups.csv", newline="") as report:
+        rows = list(csv.DictReader(report))
+    assert [(x["Cluster"], x["Proposal ID"], x["Most Similar"]) for x in rows] == \
+        [("1", "F2D-1000", "F2D-1003"), ("1", "F2D-1003", "F2D-1000")]
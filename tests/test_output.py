@@ -0,0 +1,73 @@
+import pandas as pd
+
+from output import apply_schema, infer_format, natural_keys, read_results, write_results
+
+# ==============================================================================
+def results_table():
+    return pd.DataFrame({
+        "Type": ["SBIR", "STTR", "SBIR"],
+        "Phase": ["I", "II", "II"],
+        "Page Count": [12, "7", None],
+        "Duration (Mo.)": ["12", "not a number", None],
+        "Firm Certification Q1": ["YES", "no", None],
+        "Firm Certification Q4": ["12", "YES", "NO"],
+        "Total": [150000.0, "151000.5", None],
+        "Total Direct Labor (TDL)": ["100000", None, 5.0],
+        "Safety-Related Deliverables": ["none", None, "report"],
+    }, index=pd.Index(["F2D-1", "F2D-2", "F2D-10"], name="Proposal ID"))
+# ==============================================================================
+def test_apply_schema_dtypes():
+    typed = apply_schema(results_table())
+    assert typed["Type"].dtype == "category"
+    assert typed["Phase"].dtype == "category"
+    assert str(typed["Page Count"].dtype) == "Int64"
+    assert typed["Page Count"].tolist()[:2] == [12, 7] and pd.isna(typed["Page Count"].iloc[2])
+    # Unreadable numbers become missing
+    assert typed["Duration (Mo.)"].isna().tolist() == [False, True, True]
+    assert typed["Total"].dtype == "float64"
+    assert typed["Total"].tolist()[:2] == [150000.0, 151000.5]
+    assert typed["Total Direct Labor (TDL)"].dtype == "float64"
+    # YES/NO answers are normalized categories; free text answers are left alone
+    assert list(typed["Firm Certification Q1"].cat.categories) == ["YES", "NO"]
+    assert typed["Firm Certification Q1"].tolist()[:2] == ["YES", "NO"]
+    assert not isinstance(typed["Firm Certification Q4"].dtype, pd.CategoricalDtype)
+    assert typed["Safety-Related Deliverables"].tolist()[0] == "none"
+# ==============================================================================
+def test_parquet_and_feather_round_trip(tmp_path):
+    results = results_table()
+    for extension in ["parquet", "feather"]:
+        out_path = str(tmp_path / f"results.{extension}")
+        assert write_results(results, out_path) == extension
+        loaded = read_results(out_path)
+        assert loaded.index.tolist() == ["F2D-1", "F2D-2", "F2D-10"]
+        assert str(loaded["Page Count"].dtype) == "Int64"
+        assert loaded["Phase"].dtype == "category"
+# ==============================================================================
+def test_csv_keeps_strings(tmp_path):
+    results = pd.DataFrame({"Phase": ["I"], "Primary Customer Organization": ["N/A"]},
+                           index=pd.Index(["F2D-1"], name="Proposal ID"))
+    out_path = str(tmp_path / "results.csv")
+    write_results(results, out_path)
+    assert read_results(out_path).loc["F2D-1", "Primary Customer Organization"] == "N/A"
+# ==============================================================================
+def test_formats_and_order():
+    assert infer_format("x.pq") == "parquet"
+    assert infer_format("x.arrow") == "feather"
+    assert infer_format("x.txt") == "csv"
+    assert infer_format("x.parquet", "csv") == "csv"
+    assert sorted(["F2D-10", "F2D-9", "F2D-100"], key=natural_keys) == ["F2D-9", "F2D-10", "F2D-100"]
+# ==============================================================================
+def test_not_attempted_kept(tmp_path):
+    results = pd.DataFrame({
+        "Phase": ["I", "NOT ATTEMPTED"],
+        "Page Count": [12, "NOT ATTEMPTED"],
+        "Total": ["NOT ATTEMPTED", "NOT ATTEMPTED"],
+    }, index=pd.Index(["F2D-1", "F2D-2"], name="Proposal ID"))
+    typed = apply_schema(results)
+    assert typed["Total"].dtype == "float64" and typed["Total"].isna().all()
+    assert typed["Not Attempted"].tolist() == ["Total", "Page Count, Total"]
+
+    out_path = str(tmp_path / "results.parquet")
+    write_results(results, out_path)
+    assert read_results(out_path).loc["F2D-2", "Not Attempted"] == "Page Count, Total"
+    assert "Not Attempted" not in apply_schema(results_table()).columns
@@ -0,0 +1,42 @@
+import io
+
+from conftest import write_pptx
+from pptx_index import index_pptx, slide_columns
+
+slides = [
+    ("Technical Approach", ["Radar fusion", "Edge compute"]),
+    (None, ["Team", "Jane Doe, PI"]),
+    ("Schedule", []),
+]
+
+# ==============================================================================
+def test_index_pptx(tmp_path):
+    path = str(tmp_path / "F2D-1_Vol2-proposal.pptx")
+    # Slide parts in a different order than the presentation's
+    write_pptx(path, slides, order=[3, 1, 2])
+    index = index_pptx(path)
+    assert [x["slide"] for x in index] == [1, 2, 3]
+    assert [x["title"] for x in index] == ["Schedule", "Technical Approach", "Team\nJane Doe, PI"]
+    assert index[1]["text_length"] == len("Technical Approach") + len("Radar fusion") + len("Edge compute")
+    assert index[1]["text"] == "Technical Approach Radar fusion Edge compute"
+
+    # A binary file object (e.g. a ZIP member) works the same
+    with open(path, "rb") as deck:
+        assert index_pptx(io.BytesIO(deck.read())) == index
+# ==============================================================================
+def test_slide_columns(tmp_path):
+    path = str(tmp_path / "deck.pptx")
+    write_pptx(path, slides)
+    columns = slide_columns(index_pptx(path))
+    assert columns["Slide Count"] == 3
+    assert columns["Slide Titles"] == "#1: Technical Approach\n#2: Team Jane Doe, PI\n#3: Schedule"
+    assert columns["Slide Text Lengths"] == "42, 16, 8"
+# ==============================================================================
+def test_deck_columns_in_results(corpus, run_cli, tmp_path):
+    from output import read_results
+
+    write_pptx(str(corpus / "F2D-1001_Vol2-proposal.pptx"), slides)
+    run_cli("-d", corpus, "--out", "decks.csv", "--service", "none")
+    results = read_results(str(tmp_path / "decks.csv"))
+    assert float(results.loc["F2D-1001", "Slide Count"]) == 3
+    assert results.loc["F2D-1000", "Slide Count"] == ""
@@ -0,0 +1,32 @@
+import json
+import time
+
+import progress
+from progress import Progress
+
+# ==============================================================================
+def test_shown_while_a_file_is_parsed(tmp_path, capsys):
+    metrics = tmp_path / "run.metrics.json"
+    run_progress = Progress(2, 2000, interval=0.05, metrics_path=str(metrics))
+    progress.current = run_progress
+    run_progress.start_reporting()
+    try:
+        # A long file: no file_done() for several intervals
+        progress.report(state="parsing", file="F2D-1_Vol2-proposal.pdf")
+        time.sleep(0.3)
+        assert "parsing F2D-1_Vol2-proposal.pdf" in capsys.readouterr().out
+        assert json.loads(metrics.read_text())["files_done"] == 0
+        run_progress.file_done(1000)
+        time.sleep(0.2)
+    finally:
+        run_progress.stop_reporting()
+        progress.current = None
+    assert "1/2 files (50%)" in capsys.readouterr().out
+    assert not run_progress.reporter
+# ==============================================================================
+def test_no_interval_shown_per_file(capsys):
+    run_progress = Progress(2, 2000, interval=0)
+    run_progress.start_reporting()
+    run_progress.file_done(1000)
+    assert "1/2 files (50%)" in capsys.readouterr().out
+    run_progress.stop_reporting()
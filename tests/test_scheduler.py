@@ -0,0 +1,63 @@
+import zipfile
+
+import multi_processor
+from conftest import write_pdf
+from scheduler import batch_cost, max_batch, page_ranges, schedule, schedule_tiers, tiny_cost
+
+# ==============================================================================
+def test_schedule():
+    tasks = ["big", "tiny1", "medium", "tiny2", "tiny3"]
+    costs = [5.0, 0.001, 1.0, 0.002, 0.001]
+    assert schedule(tasks, costs) == [["big"], ["medium"], ["tiny2", "tiny1", "tiny3"]]
+
+    # Tiny tasks are batched up to batch_cost, or max_batch files
+    tasks = [f"t{i}" for i in range(40)]
+    batches = schedule(tasks, [tiny_cost / 2] * 40)
+    assert sorted(x for batch in batches for x in batch) == sorted(tasks)
+    assert all(len(batch) <= max_batch for batch in batches)
+    assert all(len(batch) * tiny_cost / 2 <= batch_cost + tiny_cost for batch in batches)
+# ==============================================================================
+def test_schedule_tiers():
+    tasks = ["deep big", "quick big", "deep tiny", "quick tiny1", "quick tiny2", "quick medium"]
+    costs = [5.0, 2.0, 0.001, 0.002, 0.001, 0.5]
+    tiers = [1, 0, 1, 0, 0, 0]
+    # Tier 0 first, cheapest first; a tier's tiny tasks aren't held back for
+    # the next tier's
+    assert schedule_tiers(tasks, costs, tiers) == \
+        [["quick tiny2", "quick tiny1"], ["quick medium"], ["quick big"], ["deep tiny"], ["deep big"]]
+# ==============================================================================
+def test_page_ranges():
+    assert page_ranges(1000, 100, 4) == [(0, 250), (250, 500), (500, 750), (750, 1000)]
+    # No smaller than split_pages // 2
+    assert page_ranges(120, 100, 8) == [(0, 50), (50, 100), (100, 120)]
+    assert page_ranges(7, 2, 0) == [(0, 7)]
+    ranges = page_ranges(1001, 100, 3)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 1001
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+# ==============================================================================
+def test_small_members_not_opened_to_estimate(tmp_path, monkeypatch):
+    small = tmp_path / "small.pdf"
+    write_pdf(str(small), [["SBIR Phase I Proposal"]])
+    large = tmp_path / "large.pdf"
+    write_pdf(str(large), [[f"Page {i}"] * 40 for i in range(200)])
+    zip_path = tmp_path / "F2D-1.zip"
+    with zipfile.ZipFile(zip_path, "w") as bundle:
+        bundle.write(small, "F2D-1_All_forms_proposal_package.pdf")
+        bundle.write(large, "F2D-1_Vol2-proposal.pdf")
+    multi_processor.configure(multi_processor.make_config(split_pages=100, check_sections=True,
+                                                          title_index=str(tmp_path / "titles.db")))
+    probed = []
+    probe_pdf = multi_processor.probe_pdf
+    def count_probes(file_name):
+        probed.append(file_name)
+        return probe_pdf(file_name)
+    monkeypatch.setattr(multi_processor, "probe_pdf", count_probes)
+
+    for member, size in multi_processor.list_archive(str(zip_path), None, ["pdf"]):
+        cost, ranges = multi_processor.estimate_cost((member, size, "F2D-1", False, None, "full"))
+        assert cost > 0
+        if "Vol2" in member:
+            assert ranges and ranges[-1][1] == 200
+        else:
+            assert ranges is None
+    assert [x.split("::")[1] for x in probed] == ["F2D-1_Vol2-proposal.pdf"]
@@ -0,0 +1,37 @@
+import pytest
+
+from schema import Record, to_frame
+
+# ==============================================================================
+def test_record():
+    row = Record.from_dict({"Total": 150000.0, "Phase": " II ",
+                            "Technical Points of Contact (TPOCs)": "Jane Doe",
+                            "Custom Field": "x", "Type": None})
+    # Schema order, aliases stored under their output name, text stripped
+    assert list(row) == ["Phase", "Primary Technical Points of Contact (TPOCs)", "Total", "Custom Field"]
+    assert row["Phase"] == "II"
+    assert row.get("Technical Points of Contact (TPOCs)") == "Jane Doe"
+    assert "Type" not in row and row.get("Type", "?") == "?"
+    with pytest.raises(KeyError):
+        row["Type"]
+    assert dict(row) == dict(row.items()) and len(row) == 4
+
+    row["Phase"] = None
+    assert "Phase" not in row and len(row) == 3
+# ==============================================================================
+def test_to_frame():
+    rows = {
+        "F2D-2": Record.from_dict({"Total": 2.0, "Phase": "I", "Custom B": "b"}),
+        "F2D-1": Record.from_dict({"Type": "SBIR", "Custom A": "a"}),
+    }
+    results = to_frame(rows)
+    # Rows as given; declared columns in schema order, then the others as seen;
+    # columns no row filled left out
+    assert list(results.index) == ["F2D-2", "F2D-1"]
+    assert list(results.columns) == ["Type", "Phase", "Total", "Custom B", "Custom A"]
+    assert results.loc["F2D-2", "Total"] == 2.0
+    assert results.loc["F2D-1", "Custom A"] == "a"
+    assert results.isna().loc["F2D-1", "Custom B"]
+
+    assert list(to_frame({"F2D-1": Record()}).columns) == []
+    assert to_frame({}).empty
@@ -0,0 +1,56 @@
+import sqlite3
+
+import multi_processor
+from conftest import write_pdf
+from search_index import SearchIndex
+
+# ==============================================================================
+def page_count(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT count(*) FROM pages").fetchone()[0]
+# ==============================================================================
+def test_reindexing_replaces_pages(tmp_path):
+    path = str(tmp_path / "search.db")
+    index = SearchIndex(path)
+    index.record("a|1|1", "F2D-1", "a/F2D-1_Vol2.pdf", [(1, "hypersonic wind tunnel"), (2, "lidar")])
+    index.record("b|1|1", "F2D-2", "a/F2D-2_Vol2.pdf", [(1, "radar"), (2, " ")])
+    assert page_count(path) == 3
+    assert [x["prop_number"] for x in index.search("wind tunnel")] == ["F2D-1"]
+
+    # A new version of the file replaces the old one's pages
+    index.record("a|2|2", "F2D-1", "a/F2D-1_Vol2.pdf", [(1, "swarm autonomy")])
+    assert page_count(path) == 2
+    assert index.search("wind tunnel") == []
+    assert [x["page"] for x in index.search("autonomy")] == [1]
+    assert not index.has_file("a|1|1") and index.has_file("a|2|2")
+    assert [x["prop_number"] for x in index.search("radar")] == ["F2D-2"]
+# ==============================================================================
+def test_deletes_by_rowid(tmp_path):
+    path = str(tmp_path / "search.db")
+    index = SearchIndex(path)
+    index.record("a|1|1", "F2D-1", "a/F2D-1_Vol2.pdf", [(1, "lidar")])
+    statements = []
+    index.connect().set_trace_callback(statements.append)
+    index.record("a|2|2", "F2D-1", "a/F2D-1_Vol2.pdf", [(1, "radar")])
+    deletes = [x for x in statements if x.startswith("DELETE FROM pages")]
+    assert deletes and all("rowid" in x for x in deletes)
+# ==============================================================================
+def test_vol2_text_extracted_once(tmp_path, monkeypatch):
+    multi_processor.configure(multi_processor.make_config(
+        check_sections=True, title_index=str(tmp_path / "titles.db"),
+        search_index=str(tmp_path / "search.db"), dup_report=str(tmp_path / "dups.csv")))
+    file_name = str(tmp_path / "F2D-1_Vol2-proposal.pdf")
+    write_pdf(file_name, [["1. Technical Approach", "wind tunnel"], ["2. Method", "lidar"]])
+    extract_pages = multi_processor.extract_pages
+    extracted = []
+
+    def count_extractions(name):
+        extracted.append(name)
+        return extract_pages(name)
+    monkeypatch.setattr(multi_processor, "extract_pages", count_extractions)
+
+    info = multi_processor.parse_file(file_name, "F2D-1", False)
+    assert extracted == [file_name]
+    assert info["Page Count"] == 1 and "_minhash" in info
+    assert [x["page"] for x in multi_processor.search_index.search("lidar")] == [2]
+    assert not multi_processor.preloaded_pages and not multi_processor.shared_files
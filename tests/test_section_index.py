@@ -0,0 +1,52 @@
+from section_index import SectionIndex, normalize_title
+
+safety = "Safety Related Deliverables"
+
+# ==============================================================================
+def section_text(lines, title=safety):
+    return SectionIndex(lines, [safety]).section_text(title)
+# ==============================================================================
+def test_numbered_sections():
+    lines = ["1. Introduction", "intro", "2. Technical Approach", "2.1 Method", "method",
+             "2.7 Safety Related Deliverables", "No hazardous deliverables.",
+             "2.8 Other Deliverables", "report", "3. Commercialization Strategy", "sell it"]
+    assert section_text(lines) == "2.7 Safety Related Deliverables\nNo hazardous deliverables."
+    index = SectionIndex(lines)
+    assert [x["number"] for x in index.sections] == ["1", "2", "2.1", "2.7", "2.8", "3"]
+    assert index.section_text("Technical Approach").split("\n")[-1] == "report"
+# ==============================================================================
+def test_body_wins_over_table_of_contents():
+    lines = ["1 Introduction ..... 2", "2.7 Safety Related Deliverables ..... 9",
+             "1 Introduction", "intro", "2 Approach", "2.7 Safety Related Deliverables", "none",
+             "2.8 Other Deliverables"]
+    assert section_text(lines) == "2.7 Safety Related Deliverables\nnone"
+# ==============================================================================
+def test_lone_numbered_anchor():
+    lines = ["Some text", "2.7 Safety Related Deliverables", "No hazardous deliverables."]
+    assert section_text(lines) == "2.7 Safety Related Deliverables\nNo hazardous deliverables."
+# ==============================================================================
+def test_anchor_after_numbering_gap():
+    lines = ["2 Technical Approach", "approach", "2.7 Safety Related Deliverables",
+             "No hazardous deliverables.", "2.8 Other Deliverables", "report"]
+    assert section_text(lines) == "2.7 Safety Related Deliverables\nNo hazardous deliverables."
+# ==============================================================================
+def test_unnumbered_anchor():
+    lines = ["Technical Approach", "Safety Related Deliverables", "No hazardous deliverables.",
+             "Commercialization Strategy", "sell it"]
+    assert section_text(lines) == "Safety Related Deliverables\nNo hazardous deliverables."
+# ==============================================================================
+def test_number_and_title_on_separate_lines():
+    lines = ["1", "Introduction", "intro", "1.1", "Safety Related Deliverables (if any)", "none",
+             "1.2", "Other Deliverables"]
+    assert section_text(lines) == "1.1\nSafety Related Deliverables (if any)\nnone"
+# ==============================================================================
+def test_requested_title_becomes_anchor():
+    # Without being given as an anchor up front
+    lines = ["2.7 Safety-Related Deliverables", "none", "2.8 Other Deliverables"]
+    assert SectionIndex(lines).section_text(safety) == "2.7 Safety-Related Deliverables\nnone"
+    assert SectionIndex(lines).section_text("Missing Section") == ""
+# ==============================================================================
+def test_stray_numbers_are_not_headings():
+    lines = ["1 Introduction", "Number of employees", "12", "2020 was a good year", "$100,000.00"]
+    assert len(SectionIndex(lines).sections) == 1
+    assert normalize_title("Safety-Related Deliverables ...... 12") == "safety related deliverables"
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import urllib.request
+
+import pytest
+
+from conftest import package_dir
+from output import read_results
+
+# ==============================================================================
+@pytest.fixture
+def service(tmp_path):
+    """
+    A parse service on a free port; yields its URL
+    """
+    process = subprocess.Popen([sys.executable, "-u", os.path.join(package_dir, "multi_processor.py"),
+                                "serve", "--service", "http://127.0.0.1:0"],
+                               cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in process.stdout:
+            if "listening at" in line:
+                break
+        else:
+            pytest.fail("Parse service didn't start")
+        url = line.split()[-1]
+        yield url
+        request = urllib.request.Request(url + "/shutdown", data=b"{}")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            assert json.loads(response.read()) == {"stopping": True}
+        assert process.wait(timeout=30) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+# ==============================================================================
+def test_parse_with_service(corpus, run_cli, service, tmp_path):
+    file_name = corpus / "F2D-1001_All_forms_proposal_package.pdf"
+    served = run_cli("-f", file_name, "--out", "served.csv", "--service", service)
+    assert f"Parsing with the service at {service}" in served.stdout
+    run_cli("-f", file_name, "--out", "local.csv", "--service", "none")
+    results = read_results(str(tmp_path / "served.csv"))
+    assert results.loc["F2D-1001", "Phase"] == "II"
+    assert results.equals(read_results(str(tmp_path / "local.csv")))
+# ==============================================================================
+def test_config_mismatch_parses_locally(corpus, run_cli, service, tmp_path):
+    local = run_cli("-d", corpus, "--out", "local.csv", "--service", service, "--max-value", "1000")
+    assert "was started with different max_value; parsing locally" in local.stdout
+    assert "Parsing with the service" not in local.stdout
+    assert len(read_results(str(tmp_path / "local.csv"))) == 6
+# ==============================================================================
+def test_other_json_server_parses_locally(tmp_path):
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    import multi_processor
+    from service import request_parse
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"status": "ok"}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *log_args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        assert request_parse(url, [str(tmp_path)], multi_processor.make_config()) is None
+    finally:
+        server.shutdown()
+        server.server_close()
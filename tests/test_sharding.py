@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from output import read_results
+from sharding import in_shard, parse_shard, shard_of, shard_out_path
+
+# ==============================================================================
+def test_shard_of_is_stable():
+    # md5, not hash(): the same on every machine and in every process
+    assert [shard_of(f"F2D-{1000 + i}", 4) for i in range(6)] == [3, 3, 3, 4, 4, 3]
+# ==============================================================================
+def test_every_proposal_in_exactly_one_shard():
+    prop_numbers = [f"F2D-{i}" for i in range(200)]
+    for count in [1, 2, 3, 7]:
+        owners = [[index for index in range(1, count + 1) if in_shard(x, (index, count))]
+                  for x in prop_numbers]
+        assert all(len(x) == 1 for x in owners)
+# ==============================================================================
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ["0/4", "5/4", "2", "a/b"]:
+        with pytest.raises(Exception):
+            parse_shard(bad)
+    assert shard_out_path("proposals.csv", (2, 4)) == "proposals.shard2of4.csv"
+# ==============================================================================
+def test_sharded_run_merges_to_single_run(corpus, run_cli, tmp_path):
+    run_cli("-d", corpus, "--out", "single.csv", "--service", "none")
+    for index in [1, 2]:
+        run_cli("-d", corpus, "--out", "sharded.csv", "--shard", f"{index}/2", "--service", "none")
+    run_cli("merge", "sharded.shard1of2.csv", "sharded.shard2of2.csv", "--out", "merged.csv")
+
+    single = read_results(str(tmp_path / "single.csv"))
+    shards = [read_results(str(tmp_path / f"sharded.shard{index}of2.csv")) for index in [1, 2]]
+    assert all(len(x) for x in shards)
+    merged = read_results(str(tmp_path / "merged.csv"))
+    assert len(single) == 6
+    # Columns a shard found nothing for are absent from it; compare as text
+    pd.testing.assert_frame_equal(merged.fillna("").astype(str), single.fillna("").astype(str))
@@ -0,0 +1,51 @@
+import pytest
+
+import multi_processor
+from conftest import write_form, write_pdf
+
+# ==============================================================================
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    """
+    Configure a --text-store run; returns a function that stops fitz from
+    opening any file
+    """
+    multi_processor.configure(multi_processor.make_config(text_store=str(tmp_path / "store")))
+
+    def no_fitz():
+        def fail(file_name):
+            raise AssertionError(f"{file_name} opened with fitz")
+        monkeypatch.setattr(multi_processor, "open_pdf", fail)
+    return no_fitz
+# ==============================================================================
+def test_text_pdf_not_reopened_on_hit(corpus, stored):
+    file_name = str(corpus / "F2D-1001_All_forms_proposal_package.pdf")
+    first = multi_processor.parse_questions(file_name)
+    assert first["Phase"] == "II"
+    stored()
+    assert multi_processor.parse_questions(file_name) == first
+# ==============================================================================
+def test_form_fields_not_reopened_on_hit(tmp_path, stored):
+    file_name = str(tmp_path / "F2D-1_All_forms_proposal_package.pdf")
+    write_form(file_name)
+    first = multi_processor.parse_questions(file_name)
+    assert first["Firm Certification Q1"] == "YES"
+    assert first["Firm Certification Q2"] == "NO"
+    assert (first["Type"], first["Phase"]) == ("STTR", "II")
+    stored()
+    assert multi_processor.parse_questions(file_name) == first
+# ==============================================================================
+def test_signature_fields_not_reopened_on_hit(corpus, stored):
+    file_name = str(corpus / "F2D-1001_mou.pdf")
+    first = multi_processor.process_pdf_sigs_fitz(file_name)
+    assert "AFWERX" in first["Primary Customer Organization"]
+    assert "Digital Signatures" not in first
+    stored()
+    assert multi_processor.process_pdf_sigs_fitz(file_name) == first
+
+    # Signature fields come from the store, keyed by the file's contents
+    key = multi_processor.store_key(file_name)
+    signature = {"signer": "Jane Doe", "date": "2024-01-05 12:00:00", "page": 1}
+    multi_processor.text_store.save_fact(key, "signature_fields", [signature])
+    assert multi_processor.process_pdf_sigs_fitz(file_name)["Digital Signatures"] == \
+        "Jane Doe (2024-01-05 12:00:00, p.1)"
@@ -0,0 +1,32 @@
+from argparse import Namespace
+
+import pandas as pd
+
+from output import read_results
+from validation import flag_prefix, validate
+
+# ==============================================================================
+def test_flags_only_when_asked_for(corpus, run_cli, tmp_path):
+    plain = run_cli("-d", corpus, "--out", "plain.csv", "--service", "none")
+    assert "Validation of" not in plain.stdout
+    assert not [x for x in read_results(str(tmp_path / "plain.csv")) if x.startswith(flag_prefix)]
+
+    flagged = run_cli("-d", corpus, "--out", "flagged.csv", "--service", "none", "--validate")
+    assert "Validation of 6 proposals:" in flagged.stdout
+    results = read_results(str(tmp_path / "flagged.csv"))
+    assert flag_prefix + "Over Max Value" in results
+# ==============================================================================
+def test_rules():
+    results = pd.DataFrame({
+        "Phase": ["I", "II", "II"],
+        "Total": [100.0, 2000000.0, 300.0],
+        "Total Direct Labor (TDL)": [100.0, None, 200.0],
+        "Primary Technical Points of Contact (TPOCs)": ["N/A", "Jane Doe", "NOT FOUND"],
+        "Duration (Mo.)": ["12", "48", None],
+    }, index=["F2D-1", "F2D-2", "F2D-3"])
+    flagged, summary = validate(results, Namespace(max_value=1250000))
+    assert summary["Over Max Value"] == ["F2D-2"]
+    assert summary["Budget Mismatch"] == ["F2D-3"]
+    assert summary["Missing TPOCs"] == ["F2D-3"]
+    assert summary["Duration Out Of Range"] == ["F2D-2"]
+    assert flagged[flag_prefix + "Missing TPOCs"].tolist() == [False, False, True]
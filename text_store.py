@@ -0,0 +1,148 @@
+"""
+On-disk store of the text fitz extracted from each file.
+
+Extracting text with page.get_text() is the expensive part of a run; the
+parsers themselves are cheap.  With --text-store, every file's text is saved
+once and later runs parse the stored text without opening the PDF, so changes
+to the question strings or parsing rules can be re-run over the whole corpus
+quickly.
+
+Layout of the store directory:
+    text/<key>.json.gz   gzip'd {"page_offsets": [...], "lines": [...]}
+    paths/<digest>       content key for a given (path, size, mtime)
+    facts/<key>.json     other things read from the file with fitz (e.g. its
+                         form fields), so a hit doesn't open the file at all
+
+Entries are keyed by a hash of the file's contents, so a renamed or copied
+file is still a hit.  "lines" holds every page's lines back to back (the same
+text_segs the parsers index into) and page_offsets[i] is the index of page
+i's first line, so the page of any line offset is a bisect away.
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+def content_key(chunks):
+    """
+    Hash an iterable of byte chunks into a store key
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+# ==============================================================================
+def page_of_line(page_offsets, line_index):
+    """
+    Return the (0-based) page holding the line at line_index
+    """
+    return bisect.bisect_right(page_offsets, line_index) - 1
+# ==============================================================================
+def flatten_pages(pages):
+    """
+    [[page 0 lines], [page 1 lines], ...] -> (page_offsets, lines)
+    """
+    page_offsets = []
+    lines = []
+    for page_lines in pages:
+        page_offsets.append(len(lines))
+        lines += page_lines
+    return page_offsets, lines
+# ==============================================================================
+def split_pages(page_offsets, lines):
+    """
+    Inverse of flatten_pages()
+    """
+    ends = page_offsets[1:] + [len(lines)]
+    return [lines[start:end] for start, end in zip(page_offsets, ends)]
+# ==============================================================================
+def atomic_write(path, data):
+    """
+    Write data to path via a temp file + rename, so parallel workers or a
+    crash never leave a half-written entry behind.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+# ==============================================================================
+class TextStore:
+    """
+    See module docstring
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "text"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "paths"), exist_ok=True)
+
+    def text_path(self, key):
+        return os.path.join(self.directory, "text", key + ".json.gz")
+
+    def path_index(self, path_id):
+        digest = hashlib.md5(path_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "paths", digest)
+
+    def lookup_path(self, path_id):
+        """
+        Content key previously recorded for path_id (which should change
+        whenever the file does, e.g. path + size + mtime), or None
+        """
+        try:
+            with open(self.path_index(path_id), encoding="utf-8") as index_file:
+                return index_file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def record_path(self, path_id, key):
+        atomic_write(self.path_index(path_id), key.encode("utf-8"))
+
+    def has(self, key):
+        return os.path.exists(self.text_path(key))
+
+    def load(self, key):
+        """
+        Return (page_offsets, lines) stored under key, or None
+        """
+        try:
+            with gzip.open(self.text_path(key), "rt", encoding="utf-8") as text_file:
+                entry = json.load(text_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring damaged text store entry {key}: {e}")
+            return None
+        return entry["page_offsets"], entry["lines"]
+
+    def facts_path(self, key):
+        return os.path.join(self.directory, "facts", key + ".json")
+
+    def load_facts(self, key):
+        """
+        Return {name: value} saved with save_fact() under key
+        """
+        try:
+            with open(self.facts_path(key), encoding="utf-8") as facts_file:
+                return json.load(facts_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Ignoring damaged text store facts {key}: {e}")
+            return {}
+
+    def save_fact(self, key, name, value):
+        facts = self.load_facts(key)
+        facts[name] = value
+        atomic_write(self.facts_path(key), json.dumps(facts).encode("utf-8"))
+
+    def save(self, key, page_offsets, lines):
+        entry = {"page_offsets": page_offsets, "lines": lines}
+        data = gzip.compress(json.dumps(entry).encode("utf-8"), compresslevel=6)
+        atomic_write(self.text_path(key), data)
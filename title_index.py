@@ -0,0 +1,112 @@
+"""
+Corpus-wide index of slide and page titles, used to check that every
+proposal has its required sections (e.g. "Method", "Approach").
+
+For every deck and Vol2 PDF the index stores slide/page number -> title,
+plus the normalized title used for matching, in a SQLite file.  Files that
+are already indexed (same path, size and mtime) aren't read again, and the
+check itself only queries the index, so required sections can be changed and
+re-checked across thousands of decks with the sections subcommand:
+python multi_processor.py sections title_index.db -r Method -r Approach
+"""
+import difflib
+import logging
+import os
+import sqlite3
+
+from section_index import normalize_title
+
+logger = logging.getLogger(__name__)
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path_id TEXT PRIMARY KEY,
+    prop_number TEXT,
+    file TEXT
+);
+CREATE TABLE IF NOT EXISTS titles (
+    path_id TEXT,
+    prop_number TEXT,
+    number INTEGER,
+    title TEXT,
+    normalized TEXT
+);
+CREATE INDEX IF NOT EXISTS titles_prop_number ON titles (prop_number);
+CREATE INDEX IF NOT EXISTS titles_path_id ON titles (path_id);
+"""
+
+# ==============================================================================
+def section_present(required, titles, cutoff):
+    """
+    Returns True if the required section (normalized) matches any of the
+    normalized titles: exactly, as a whole phrase within a longer title
+    (e.g. "approach" in "2 technical approach"), or fuzzily with a
+    difflib similarity of at least cutoff.
+    """
+    if required in titles:
+        return True
+    padded = f" {required} "
+    if any(padded in f" {title} " for title in titles):
+        return True
+    return bool(difflib.get_close_matches(required, titles, n=1, cutoff=cutoff))
+# ==============================================================================
+class TitleIndex:
+    """
+    See module docstring.  Each process opens its own connection, so one
+    index can be shared by the parent and the pool workers.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.pid = None
+
+    def connect(self):
+        if self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(schema)
+            self.pid = os.getpid()
+        return self.connection
+
+    def has_file(self, path_id):
+        row = self.connect().execute(
+            "SELECT 1 FROM files WHERE path_id = ?", (path_id,)).fetchone()
+        return row is not None
+
+    def record(self, path_id, prop_number, file_name, titles):
+        """
+        Store [(slide/page number, title)] for one file, replacing any entries
+        from an older version of it.
+        """
+        connection = self.connect()
+        with connection:
+            old_ids = [row[0] for row in connection.execute(
+                "SELECT path_id FROM files WHERE file = ?", (file_name,))]
+            for old_id in old_ids + [path_id]:
+                connection.execute("DELETE FROM titles WHERE path_id = ?", (old_id,))
+                connection.execute("DELETE FROM files WHERE path_id = ?", (old_id,))
+            connection.execute("INSERT INTO files VALUES (?, ?, ?)",
+                               (path_id, prop_number, file_name))
+            connection.executemany("INSERT INTO titles VALUES (?, ?, ?, ?, ?)",
+                                   [(path_id, prop_number, number, title, normalize_title(title))
+                                    for number, title in titles if title.strip()])
+
+    def proposal_titles(self, prop_number):
+        """
+        Set of normalized titles across all of a proposal's files
+        """
+        rows = self.connect().execute(
+            "SELECT normalized FROM titles WHERE prop_number = ?", (prop_number,))
+        return {row[0] for row in rows if row[0]}
+
+    def proposals(self):
+        rows = self.connect().execute("SELECT DISTINCT prop_number FROM files ORDER BY prop_number")
+        return [row[0] for row in rows]
+
+    def missing_sections(self, prop_number, required_sections, cutoff=0.8):
+        """
+        Return the required sections with no matching title in this proposal
+        """
+        titles = self.proposal_titles(prop_number)
+        return [section for section in required_sections
+                if not section_present(normalize_title(section), titles, cutoff)]
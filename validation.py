@@ -0,0 +1,138 @@
+"""
+Sanity checks over the aggregated results table.
+
+Each rule is a function of the results DataFrame (and the run's config)
+returning a boolean Series, True for the proposals it flags.  Rules work on
+whole columns at once, so a table of tens of thousands of proposals is
+checked in a fraction of a second, and they only need the table: an existing
+output can be re-checked with the validate subcommand without reparsing.
+
+validate() adds one "Flag: <rule>" column per rule and returns a summary of
+how many proposals each rule flagged.
+"""
+from output import is_yes_no_column
+from schema import budget_headings, not_attempted
+
+flag_prefix = "Flag: "
+
+tpoc_column = "Primary Technical Points of Contact (TPOCs)"
+# Accepted months for "Duration (Mo.)", inclusive
+duration_range = (1, 36)
+# Dollars the budget categories may be off from the Total by (rounding)
+budget_tolerance = 1.0
+yes_no_answers = ["YES", "NO", "N/A", "Yes", "No", "yes", "no", "n/a", not_attempted]
+# Certification questions answered with free text (numbers, [X] checkboxes,
+# percentages...), by proposal Type; their answers aren't YES/NO
+free_text_questions = {
+    "Firm Certification Q4": ["SBIR", "STTR"],
+    "Firm Certification Q10": ["SBIR", "STTR"],
+    "Firm Certification Q11": ["SBIR", "STTR"],
+    "Firm Certification Q12": ["SBIR", "STTR"],
+    "Firm Certification Q16": ["SBIR", "STTR"],
+    "Proposal Certification Q16": ["SBIR"],
+    "Proposal Certification Q17": ["STTR"],
+    "Proposal Certification Q18": ["STTR"],
+    "Proposal Certification Q19": ["STTR"],
+    "Proposal Certification Q20": ["STTR"],
+}
+
+# ==============================================================================
+def column(results, name):
+    """
+    results[name] with empty strings (as read back from csv) as missing;
+    all missing if there's no such column
+    """
+    import pandas as pd
+
+    if name not in results:
+        return pd.Series(None, index=results.index, dtype=object)
+    values = results[name]
+    if values.dtype == object or str(values.dtype) in ["string", "str"]:
+        values = values.mask(values == "")
+    return values
+# ==============================================================================
+def number(results, name):
+    """
+    results[name] as floats; missing or unreadable values are NaN
+    """
+    import pandas as pd
+
+    values = column(results, name)
+    if values.dtype == object:
+        values = values.astype(str).str.lstrip("$").str.replace(",", "")
+    return pd.to_numeric(values, errors="coerce")
+# ==============================================================================
+def over_max_value(results, config):
+    return number(results, "Total") > config.max_value
+# ==============================================================================
+def budget_mismatch(results, config):
+    """
+    The budget categories (TDL, TDM, TDT, TSC, TDS, TDE, TODC) don't add up
+    to the Total
+    """
+    total = number(results, "Total")
+    categories = [number(results, heading) for heading in budget_headings]
+    found = sum(x.notna() for x in categories)
+    summed = sum(x.fillna(0) for x in categories)
+    return total.notna() & (found > 0) & ((summed - total).abs() > budget_tolerance)
+# ==============================================================================
+def missing_tpocs(results, config):
+    """
+    TPOCs are required for all but Phase I proposals
+    """
+    phase = column(results, "Phase")
+    tpocs = column(results, tpoc_column)
+    return phase.notna() & (phase != "I") & (tpocs.isna() | (tpocs == "NOT FOUND"))
+# ==============================================================================
+def bad_certification(results, config):
+    """
+    A YES/NO certification or regulatory question answered otherwise
+    """
+    names = [name for name in results.columns if is_yes_no_column(name)]
+    answers = results[names].astype(object)
+    flagged = answers.notna() & (answers != "") & ~answers.isin(yes_no_answers)
+    # Free text questions are only checked for the other proposal Types
+    proposal_type = column(results, "Type")
+    for name, types in free_text_questions.items():
+        if name in flagged:
+            flagged[name] &= ~proposal_type.isin(types)
+    return flagged.any(axis=1)
+# ==============================================================================
+def duration_out_of_range(results, config):
+    low, high = duration_range
+    duration = column(results, "Duration (Mo.)")
+    given = duration.notna() & (duration != not_attempted)
+    months = number(results, "Duration (Mo.)")
+    return given & ~months.between(low, high)
+# ==============================================================================
+rules = {
+    "Over Max Value": over_max_value,
+    "Budget Mismatch": budget_mismatch,
+    "Missing TPOCs": missing_tpocs,
+    "Bad Certification Answer": bad_certification,
+    "Duration Out Of Range": duration_out_of_range,
+}
+
+# ==============================================================================
+def validate(results, config):
+    """
+    Return (results with a flag column per rule, {rule: [flagged proposals]}).
+    config needs max_value (the --max-value option).
+    """
+    results = results.copy()
+    summary = {}
+    for name, rule in rules.items():
+        flags = rule(results, config).fillna(False).astype(bool)
+        results[flag_prefix + name] = flags
+        summary[name] = results.index[flags].tolist()
+    return results, summary
+# ==============================================================================
+def print_summary(summary, total, shown=10):
+    """
+    One line per rule: how many proposals it flagged, and the first few
+    """
+    print(f"Validation of {total} proposals:")
+    for name, flagged in summary.items():
+        listed = ", ".join(str(x) for x in flagged[:shown])
+        more = f", ... {len(flagged) - shown} more" if len(flagged) > shown else ""
+        print(f"    {name}: {len(flagged)}" + (f" ({listed}{more})" if flagged else ""))